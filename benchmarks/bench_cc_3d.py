@@ -0,0 +1,90 @@
+"""
+Compare the time and the peak memory of the mask connected components:
+`connected_components_3d` at full resolution, with `downsample_first=True`,
+and `streaming_connected_components_3d` on a memory-mapped .npy file.
+
+Each measurement runs in a fresh process. The traced peak counts the numpy
+allocations only (not the VTK filters of the full resolution mode, nor the
+pages of the mapped file).
+
+Usage:
+    python benchmarks/bench_cc_3d.py [--size 256] [--depth 1024] [--objects 400]
+"""
+import argparse
+import contextlib
+import io
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = str(Path(__file__).resolve().parents[1])
+sys.path.insert(0, ROOT)
+
+METHODS = ("full resolution", "downsample_first", "streaming")
+
+
+def measure(method, path):
+    """ Label the mask with the given method and print the elapsed time, the traced peak and the peak RSS. """
+    import numpy as np
+    from ctviewer.io import Reader
+    from ctviewer.utils import connected_components_3d, streaming_connected_components_3d
+
+    data = np.load(path, mmap_mode='r')
+    tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if method == "streaming":
+            properties = streaming_connected_components_3d(data, connectivity=26, reshape_factor=4)
+        else:
+            volume = Reader.array_to_volume(data)
+            properties = connected_components_3d(volume, connectivity=26, reshape_factor=4,
+                                                 downsample_first=method == "downsample_first")
+    elapsed = time.perf_counter() - start
+    traced_mb = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{elapsed:.3f} {traced_mb:.0f} {peak_mb:.0f} {len(properties['labels'])}")
+
+
+def make_mask(size, depth, objects, seed=0):
+    """ Build a uint8 mask of random boxes with classes between 1 and 15. """
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    mask = np.zeros((size, size, depth), dtype=np.uint8)
+    for _ in range(objects):
+        corner = rng.integers(0, [size - 32, size - 32, depth - 32])
+        extent = rng.integers(4, 32, 3)
+        mask[corner[0]:corner[0] + extent[0], corner[1]:corner[1] + extent[1], corner[2]:corner[2] + extent[2]] = rng.integers(1, 16)
+    return mask
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=256, help="edge length of the mask along x and y")
+    parser.add_argument("--depth", type=int, default=1024, help="length of the mask along z")
+    parser.add_argument("--objects", type=int, default=400, help="number of random boxes in the mask")
+    parser.add_argument("--measure", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        return measure(*args.measure)
+
+    import numpy as np
+    mask = make_mask(args.size, args.depth, args.objects)
+    print(f"mask: {mask.shape} uint8, {mask.nbytes / 1024 ** 2:.0f} MB, {args.objects} boxes")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "mask.npy")
+        np.save(path, np.asfortranarray(mask))
+        del mask
+        print(f"{'method':<18} {'time (s)':>9} {'traced peak (MB)':>17} {'peak RSS (MB)':>14} {'objects':>8}")
+        for method in METHODS:
+            out = subprocess.run([sys.executable, __file__, "--measure", method, path],
+                                 capture_output=True, text=True, check=True).stdout.split()
+            print(f"{method:<18} {float(out[-4]):>9.3f} {float(out[-3]):>17.0f} {float(out[-2]):>14.0f} {out[-1]:>8}")
+
+
+if __name__ == "__main__":
+    main()
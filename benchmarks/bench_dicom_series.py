@@ -0,0 +1,69 @@
+"""
+Measure the assembly of a folder of per-slice DICOM files into a volume with
+`ctviewer.io.series`, reading the slices on one thread and on a thread pool,
+and compare it with the directory reader of VTK when it can read the files.
+
+A synthetic CT series is written in a temporary folder, unless a folder is
+given, and the page cache is dropped before each read when possible.
+
+Usage:
+    python benchmarks/bench_dicom_series.py [--folder DIR] [--slices 300] [--size 512] [--workers 1 8]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = str(Path(__file__).resolve().parents[1])
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "tests"))
+
+
+def drop_caches():
+    """ Drop the page cache, so that the slices are read from the disk, if the user may. """
+    subprocess.run("sync; echo 3 > /proc/sys/vm/drop_caches", shell=True, stderr=subprocess.DEVNULL)
+
+
+def main():
+    from dicom_utils import write_dicom_slice
+    from ctviewer.io.series import find_series, load_series
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--folder", default=None)
+    parser.add_argument("--slices", type=int, default=300)
+    parser.add_argument("--size", type=int, default=512)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8])
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = args.folder
+        if folder is None:
+            folder = tmp
+            rng = np.random.default_rng(0)
+            for z in rng.permutation(args.slices):
+                pixels = rng.integers(0, 4000, (args.size, args.size), dtype=np.uint16)
+                write_dicom_slice(os.path.join(folder, f"IM{z:05d}.dcm"), pixels, "1.2.3", (0, 0, z * 1.25), intercept=-1024)
+        first = os.path.join(folder, sorted(name for name in os.listdir(folder) if name.endswith(".dcm"))[0])
+        for workers in args.workers:
+            drop_caches()
+            start = time.perf_counter()
+            headers = find_series(first, workers)
+            grouped = time.perf_counter()
+            voxels, spacing, _ = load_series(headers, workers)
+            end = time.perf_counter()
+            print(f"{workers} workers: {len(headers)} slices grouped and sorted in {(grouped - start) * 1000:.0f} ms, "
+                  f"decoded and rescaled in {(end - grouped) * 1000:.0f} ms, {voxels.shape} {voxels.dtype} {spacing}")
+        from vtkmodules.vtkIOImage import vtkDICOMImageReader
+        drop_caches()
+        start = time.perf_counter()
+        reader = vtkDICOMImageReader()
+        reader.SetDirectoryName(folder)
+        reader.Update()
+        print(f"vtkDICOMImageReader: {(time.perf_counter() - start) * 1000:.0f} ms, dims {reader.GetOutput().GetDimensions()}")
+
+
+if __name__ == "__main__":
+    main()
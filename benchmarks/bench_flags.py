@@ -0,0 +1,91 @@
+"""
+Compare the cost of displaying the flags of a TDR file when every object gets
+its own `Box` and `Flagpost` actors and when `Renderer.add_flags` batches all
+the boxes into one line actor and all the texts into one label actor.
+
+For each number of objects the time to build and add the actors and the mean
+offscreen render time are given, with the number of actors.
+
+Usage:
+    python benchmarks/bench_flags.py [--objects 10 50 200] [--renders 20]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT = str(Path(__file__).resolve().parents[1])
+sys.path.insert(0, ROOT)
+
+
+def per_actor(plotter, renderer, volume_properties, offset=(0, 0, 60)):
+    """ The flags before the batching: a Box and a Flagpost per object. """
+    import numpy as np
+    from vedo import Box, Flagpost
+    actors = []
+    for pos, flag_pos, label in zip(volume_properties["poses"], volume_properties["flag_poses"], volume_properties["labels"]):
+        actors.append(Box(pos=pos, c="black", alpha=0.9).wireframe().lw(2).lighting("off"))
+        actors.append(Flagpost(base=flag_pos, top=flag_pos + np.array(offset), txt=renderer.mask_flags.get(label),
+                               s=0.7, c="gray", bc="k9", alpha=1, lw=3, font="SmartCouric"))
+    plotter.add(actors)
+    return actors
+
+
+def batched(plotter, renderer, volume_properties):
+    """ The flags of the Renderer: one line actor and one label actor. """
+    renderer.add_flags(volume_properties)
+    actors = renderer.fss + renderer.bboxes
+    plotter.add(actors)
+    return actors
+
+
+def run(add, plotter, renderer, volume_properties, renders):
+    """ Return the add time, the mean render time and the number of actors. """
+    start = time.perf_counter()
+    actors = add(plotter, renderer, volume_properties)
+    plotter.render()
+    add_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for i in range(renders):
+        plotter.camera.Azimuth(360 / renders)
+        plotter.render()
+    render_time = (time.perf_counter() - start) / renders
+    plotter.remove(actors)
+    return add_time, render_time, len(actors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--objects", type=int, nargs="+", default=[10, 50, 200], help="numbers of flagged objects")
+    parser.add_argument("--renders", type=int, default=20, help="number of renders per measure")
+    args = parser.parse_args()
+
+    import numpy as np
+    from types import SimpleNamespace
+    from vedo import Plotter
+    from ctviewer.rendering import Renderer
+
+    plotter = Plotter(offscreen=True, size=(800, 600))
+    plotter.show()
+    # the flags only need the class maps of the renderer, and it adds to its own plotter
+    renderer = SimpleNamespace(mask_flags={1: "Gun", 2: "Knife", 3: "Battery"}, mask_colors={1: "red", 2: "blue", 3: "green"},
+                               BOX_EDGES=Renderer.BOX_EDGES, flag_labels=Renderer.flag_labels,
+                               add=lambda actors: None, render=lambda: None)
+    renderer.add_flags = lambda volume_properties: Renderer.add_flags(renderer, volume_properties)
+    rng = np.random.default_rng(0)
+    print(f"{'objects':>8} {'method':<10} {'actors':>7} {'add (ms)':>9} {'render (ms)':>12}")
+    for n in args.objects:
+        lower = rng.uniform(0, 500, (n, 3))
+        upper = lower + rng.uniform(10, 60, (n, 3))
+        volume_properties = {
+            "poses": [tuple(np.column_stack([l, u]).ravel()) for l, u in zip(lower, upper)],
+            "flag_poses": list(upper),
+            "labels": list(rng.integers(1, 4, n)),
+        }
+        for name, add in (("per actor", per_actor), ("batched", batched)):
+            add_time, render_time, actors = run(add, plotter, renderer, volume_properties, args.renders)
+            print(f"{n:>8} {name:<10} {actors:>7} {add_time * 1000:>9.1f} {render_time * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Compare the peak memory and the time-to-volume of loading a .npy volume
+with `np.load` + `Volume(data)` and with the memory-mapped `Reader` path.
+
+Each measurement runs in a fresh process so that the peak RSS is not shared.
+
+Usage:
+    python benchmarks/bench_npy_loading.py [--size 512]
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = str(Path(__file__).resolve().parents[1])
+sys.path.insert(0, ROOT)
+
+
+def measure(method, path):
+    """ Load the volume with the given method and print the elapsed time and the peak RSS. """
+    import numpy as np
+    from vedo import Volume
+    from ctviewer.io import Reader
+
+    start = time.perf_counter()
+    if method == "np.load":
+        volume = Volume(np.load(path))
+    else:
+        volume = Reader(cache_size_mb=0)(path)[0]
+    volume.dataset.GetScalarRange()
+    elapsed = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{elapsed:.3f} {peak_mb:.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=512, help="edge length of the cubic uint16 volume")
+    parser.add_argument("--measure", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        return measure(*args.measure)
+
+    import numpy as np
+    data = np.random.randint(0, 4096, (args.size,) * 3, dtype=np.uint16)
+    print(f"volume: {data.shape} uint16, {data.nbytes / 1024 ** 2:.0f} MB")
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {"C order": os.path.join(tmp, "c.npy"), "Fortran order": os.path.join(tmp, "f.npy")}
+        np.save(paths["C order"], data)
+        np.save(paths["Fortran order"], np.asfortranarray(data))
+        del data
+        baseline = subprocess.run([sys.executable, "-c", "import numpy, vedo, resource; "
+                                   "print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)"],
+                                  capture_output=True, text=True).stdout.split()[-1]
+        print(f"interpreter + imports peak RSS: {float(baseline):.0f} MB")
+        print(f"{'file':<14} {'method':<8} {'time (s)':>9} {'peak RSS (MB)':>14}")
+        for name, path in paths.items():
+            for method in ("np.load", "Reader"):
+                out = subprocess.run([sys.executable, __file__, "--measure", method, path],
+                                     capture_output=True, text=True, check=True).stdout.split()
+                print(f"{name:<14} {method:<8} {float(out[-2]):>9.3f} {float(out[-1]):>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
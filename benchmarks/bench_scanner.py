@@ -0,0 +1,71 @@
+"""
+Compare the cost of listing the volume files of a folder tree with one `Path.rglob`
+walk per extension, as the folder dialog did, and with a single `FolderScanner`
+walk for all the extensions, sequential and on a thread pool. The time of the
+existence check is given too.
+
+A synthetic tree of empty files is created in a temporary folder, unless a folder
+is given.
+
+Usage:
+    python benchmarks/bench_scanner.py [--folder DIR] [--dirs 2000] [--files 20] [--workers 1 8]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = str(Path(__file__).resolve().parents[1])
+sys.path.insert(0, ROOT)
+
+EXTS = ["dcs", "dcm", "nii.gz", "mhd"]
+
+
+def make_tree(root, dirs, files):
+    """ Create bags of empty slice files, with a few volumes of the other extensions and other files. """
+    for i in range(dirs):
+        bag = os.path.join(root, f"day{i % 20}", f"bag{i}")
+        os.makedirs(bag)
+        for j in range(files):
+            open(os.path.join(bag, f"slice{j}.dcs"), "w").close()
+        for name in ("volume.nii.gz", "volume.mhd", "volume.zraw", "report.txt"):
+            open(os.path.join(bag, name), "w").close()
+
+
+def timed(function, repeats=3):
+    """ The best time of a few calls and the result of the last one. """
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    from ctviewer.io.scanner import FolderScanner
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--folder", default=None)
+    parser.add_argument("--dirs", type=int, default=2000)
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8])
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = args.folder
+        if folder is None:
+            folder = tmp
+            make_tree(folder, args.dirs, args.files)
+        seconds, found = timed(lambda: [p for ext in EXTS for p in Path(folder).rglob("*." + ext)])
+        print(f"rglob per extension: {seconds * 1000:8.1f} ms, {len(found)} files")
+        for workers in args.workers:
+            scanner = FolderScanner(EXTS, workers)
+            seconds, found = timed(lambda: scanner.scan(folder))
+            print(f"scandir, {workers} workers: {seconds * 1000:8.1f} ms, {len(found)} files")
+            seconds, _ = timed(lambda: scanner.has_volumes(folder))
+            print(f"  existence check:   {seconds * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Compare the slice update rate of dragging a slicer slider when each event
+builds a new slice mesh (`volume.xslice` + `cmap` + remove/add) and when the
+persistent slice actor of the `Slicer` only moves its slice index.
+
+Each event is followed by an offscreen render, as the slider callbacks do,
+and the update rate is also given without the render.
+
+Usage:
+    python benchmarks/bench_slicer.py [--size 256] [--events 200]
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = str(Path(__file__).resolve().parents[1])
+sys.path.insert(0, ROOT)
+
+
+def rebuild(plotter, volume, slicer, index):
+    """ The slider callback before the persistent actors: a new mesh per event. """
+    xslice = volume.xslice(index).lighting("", slicer.la, slicer.ld, 0)
+    xslice.cmap(slicer.cmap_slicer, vmin=slicer.rmin, vmax=slicer.rmax)
+    xslice.name = "XSlice"
+    plotter.remove("XSlice")
+    plotter.add(xslice)
+
+
+def in_place(plotter, volume, slicer, index):
+    """ The slider callback of the Slicer: the slice index of the persistent actor. """
+    slicer.set_slice(0, index)
+
+
+def run(update, plotter, volume, slicer, events):
+    """
+    Sweep the x slider and return the updates per second with and without the render,
+    and the traced bytes allocated per update.
+    """
+    dims = volume.dimensions()
+    indices = [1 + i % (dims[0] - 2) for i in range(events)]
+    update(plotter, volume, slicer, indices[-1])
+    plotter.render()
+    update_time, render_time = 0.0, 0.0
+    tracemalloc.start()
+    for index in indices:
+        start = time.perf_counter()
+        update(plotter, volume, slicer, index)
+        update_time += time.perf_counter() - start
+        start = time.perf_counter()
+        plotter.render()
+        render_time += time.perf_counter() - start
+    allocated = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return events / (update_time + render_time), events / update_time, allocated / events
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=256, help="edge length of the cubic uint16 volume")
+    parser.add_argument("--events", type=int, default=200, help="number of slider events")
+    args = parser.parse_args()
+
+    import numpy as np
+    from vedo import Plotter, Volume
+    from ctviewer.rendering import RendererCallbacks, Slicer
+    from ctviewer.utils import Histogram
+
+    data = np.random.randint(0, 4096, (args.size,) * 3, dtype=np.uint16)
+    volume = Volume(data)
+    plotter = Plotter(offscreen=True, size=(800, 600))
+    plotter.show(volume.box())
+    callbacks = RendererCallbacks(plotter)
+    histogram = Histogram(data)
+    callbacks.histogram = lambda: histogram
+    slicer = Slicer(volume, [(1024, "orange"), (4096, "green"), (16384, "blue")], callbacks)
+    slicer.build()
+    print(f"volume: {data.shape} uint16, {args.events} slider events")
+    print(f"{'method':<10} {'updates/s':>10} {'without render':>15} {'traced bytes/update':>20}")
+    for name, update in (("rebuild", rebuild), ("in place", in_place)):
+        rate, update_rate, allocated = run(update, plotter, volume, slicer, args.events)
+        print(f"{name:<10} {rate:>10.1f} {update_rate:>15.1f} {allocated:>20.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Render snapshots of every volume of a folder without the GUI, e.g. to pre-render the thumbnails of a screening archive.
+
+Each worker process owns an offscreen `Renderer`, built once from config.json, and renders the volumes it is handed
+in the maximum projection, composite and isosurface modes of the viewer. The snapshots are written as PNG files
+mirroring the folder tree, and the decode and render times of every volume are written to a CSV file.
+
+Usage:
+    python -m ctviewer.batch FOLDER --out DIR [--workers N] [--modes mip composite iso] [--size 512 512]
+"""
+import argparse
+import csv
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Dict, List, Optional, Tuple
+
+# the snapshot modes, activated on the renderer of the worker
+MODES = {
+    "mip": lambda renderer: renderer.ray_cast_mode(1),
+    "composite": lambda renderer: renderer.ray_cast_mode(0),
+    "iso": lambda renderer: renderer.iso_surface_mode(),
+}
+
+# the renderer of the worker process, built by init_worker
+_renderer = None
+_grabber = None
+
+
+def init_worker(config: Dict, size: Tuple[int, int]):
+    """
+    Build the offscreen renderer of a worker process.
+
+    Args:
+    - config: The keyword arguments of the renderer.
+    - size: The (width, height) of the snapshots.
+
+    """
+    global _renderer, _grabber
+    from vtkmodules.vtkRenderingCore import vtkWindowToImageFilter
+    from vtkmodules.vtkIOImage import vtkPNGWriter
+    from ctviewer.rendering import Renderer
+    _renderer = Renderer(**config, offscreen=True, size=size, bg="white", bg2="white", axes=0)
+    # the snapshots read the frame rendered by the mode switch instead of rendering it again
+    grabber = vtkWindowToImageFilter()
+    grabber.SetInput(_renderer.window)
+    grabber.ShouldRerenderOff()
+    grabber.ReadFrontBufferOff()
+    writer = vtkPNGWriter()
+    writer.SetInputConnection(grabber.GetOutputPort())
+    _grabber = (grabber, writer)
+
+
+def hide_overlays(renderer):
+    """ Hide the sliders and the corner histogram of the active mode, which have no use in a snapshot. """
+    for mode in (renderer.ray_caster, renderer.iso_surfer):
+        if mode.is_active():
+            for slider in mode.get_sliders():
+                slider.off()
+    if renderer.ray_caster.is_active():
+        renderer.remove(renderer.ray_caster.get_addons())
+
+
+def snapshot(path: str):
+    """ Write the last frame of the worker renderer to a PNG file. """
+    grabber, writer = _grabber
+    grabber.Modified()
+    writer.SetFileName(path)
+    writer.Write()
+
+
+def snapshot_path(path: str, folder: str, out: str, mode: str, exts: List[str]) -> str:
+    """
+    Get the path of the snapshot of a volume, in the same subfolder of the output folder as the volume.
+
+    Args:
+    - path: The path of the volume.
+    - folder: The root folder of the volumes.
+    - out: The output folder.
+    - mode: The snapshot mode.
+    - exts: The volume extensions, stripped from the file name.
+
+    Returns:
+    - path: The path of the PNG file, e.g. out/bag1/scan_mip.png for folder/bag1/scan.nii.gz.
+
+    """
+    relative = os.path.relpath(path, folder)
+    for ext in sorted(exts, key=len, reverse=True):
+        if relative.endswith("." + ext):
+            relative = relative[:-len(ext) - 1]
+            break
+    return os.path.join(out, f"{relative}_{mode}.png")
+
+
+def render_volume(path: str, folder: str, out: str, modes: List[str], exts: List[str]) -> Dict:
+    """
+    Decode a volume and write its snapshots, on the renderer of the worker.
+
+    Args:
+    - path: The path of the volume.
+    - folder: The root folder of the volumes.
+    - out: The output folder.
+    - modes: The snapshot modes, keys of MODES.
+    - exts: The volume extensions.
+
+    Returns:
+    - row: The CSV row of the volume, with its status, voxel count, decode time and the time of every mode.
+
+    """
+    renderer = _renderer
+    row = {"path": path, "status": "ok", "worker": os.getpid(), "voxels": 0, "decode_s": "",
+           **{f"{mode}_s": "" for mode in modes}, "error": ""}
+    try:
+        start = time.perf_counter()
+        renderer.reader.reset_properties()
+        vol, properties = renderer.reader(path)
+        row["decode_s"] = round(time.perf_counter() - start, 4)
+        if properties["is_mask"] or properties["is_proj"]:
+            row["status"] = "skipped"
+            return row
+        row["voxels"] = int(vol.dataset.GetNumberOfPoints())
+        for i, mode in enumerate(modes):
+            start = time.perf_counter()
+            with renderer.render_batch():
+                if i == 0:
+                    renderer.display_volume(vol, properties)
+                MODES[mode](renderer)
+                if renderer.iso_surfer.is_active() and renderer.iso_surfer.refinement is not None:
+                    # the full resolution mesh rather than the preview
+                    renderer.iso_surfer.refinement.result()
+                    renderer.iso_surfer.swap_refined()
+                hide_overlays(renderer)
+                renderer.reset_camera()
+            target = snapshot_path(path, folder, out, mode, exts)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            snapshot(target)
+            row[f"{mode}_s"] = round(time.perf_counter() - start, 4)
+    except Exception as e:
+        row["status"], row["error"] = "failed", str(e)
+    return row
+
+
+def run(folder: str, out: str, modes: List[str], workers: int, size: Tuple[int, int], config: Dict,
+        exts: List[str], csv_path: str) -> Tuple[int, int]:
+    """
+    Render the snapshots of every volume of a folder on a pool of worker processes.
+
+    Args:
+    - folder: The folder of the volumes, walked recursively.
+    - out: The output folder of the snapshots.
+    - modes: The snapshot modes, keys of MODES.
+    - workers: The number of worker processes, each with its own renderer.
+    - size: The (width, height) of the snapshots.
+    - config: The keyword arguments of the renderers.
+    - exts: The volume extensions.
+    - csv_path: The path of the timing CSV file.
+
+    Returns:
+    - counts: The number of rendered volumes and the number of volumes that failed.
+
+    """
+    from ctviewer.io.scanner import find_volumes
+    from ctviewer.io.series import first_slices
+    # a DICOM series is rendered once, from its first slice
+    paths = first_slices(find_volumes(folder, exts))
+    os.makedirs(out, exist_ok=True)
+    fields = ["path", "status", "worker", "voxels", "decode_s", *[f"{mode}_s" for mode in modes], "error"]
+    rendered, failed, start = 0, 0, time.perf_counter()
+    # spawned workers, so that no process inherits the OpenGL state of another
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=init_worker, initargs=(config, size)) as executor, \
+         open(csv_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for row in executor.map(render_volume, paths, repeat(folder), repeat(out), repeat(modes), repeat(exts)):
+            writer.writerow(row)
+            f.flush()
+            rendered += row["status"] == "ok"
+            failed += row["status"] == "failed"
+            print(f"{row['path']}: {row['status']} {row['error']}".rstrip(), file=sys.stderr if row["error"] else sys.stdout)
+    elapsed = time.perf_counter() - start
+    print(f"{rendered} volumes rendered, {failed} failed in {elapsed:.1f} s ({len(paths) / max(elapsed, 1e-9) * 3600:.0f} volumes/hour)")
+    return rendered, failed
+
+
+def main(argv: Optional[List[str]] = None):
+    """ Render the snapshots of a folder from the command line. """
+    from ctviewer.utils import ConfigManager
+    config_manager = ConfigManager()
+    user_config = config_manager.get_user_config()
+    parser = argparse.ArgumentParser(description="Render snapshots of the volumes of a folder without the GUI.")
+    parser.add_argument("folder", help="the folder whose volume files are rendered, walked recursively")
+    parser.add_argument("--out", required=True, help="the output folder of the PNG snapshots")
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES), help="the snapshot modes")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="the number of worker processes")
+    parser.add_argument("--size", type=int, nargs=2, default=(512, 512), metavar=("WIDTH", "HEIGHT"), help="the size of the snapshots")
+    parser.add_argument("--exts", nargs="+", default=user_config.get("exts", ["dcs", "dcm", "nii.gz", "mhd"]),
+                        help="the volume extensions, exts of config.json by default")
+    parser.add_argument("--csv", default=None, help="the timing CSV file, timings.csv in the output folder by default")
+    args = parser.parse_args(argv)
+    # a single pass over each volume: no decoded volume is kept for later
+    config = {**config_manager.get_renderer_config(), "cache_size_mb": 0, "prefetch_size_mb": 0}
+    _, failed = run(args.folder, args.out, args.modes, args.workers, tuple(args.size), config, args.exts,
+                    args.csv or os.path.join(args.out, "timings.csv"))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
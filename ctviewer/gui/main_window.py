@@ -1,14 +1,18 @@
 from pathlib import Path
 
-from PyQt6.QtWidgets import QApplication, QFileDialog, QMessageBox, QMenu, QLayout, QMainWindow, QStatusBar, QMenuBar, QTabWidget, QWidget, QVBoxLayout, QHBoxLayout, QPushButton
+from PyQt6.QtWidgets import QApplication, QFileDialog, QMessageBox, QMenu, QLayout, QMainWindow, QStatusBar, QMenuBar, QTabWidget, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QProgressBar
 from PyQt6.QtGui import QIcon, QAction, QDesktopServices
-from PyQt6.QtCore import QMetaObject, QRect, pyqtSlot, QUrl
+from PyQt6.QtCore import QMetaObject, QRect, pyqtSignal, pyqtSlot, QUrl, QTimer
 from PyQt6.QtCore import pyqtSlot
 from vtkmodules.qt.QVTKRenderWindowInteractor import QVTKRenderWindowInteractor
 
 from ctviewer.rendering import Renderer
+from ctviewer.io.scanner import FolderScanner
 from .setting_dialog import SettingDialog
 from .tree_view import TreeView
+from .volume_loader import VolumeLoader
+from .prefetcher import Prefetcher
+from .thumbnailer import Thumbnailer
 from ctviewer.utils import SHORCUTS_TEXT, ABOUT_TEXT
 
 ROOT = Path(__file__).resolve().parents[2]
@@ -32,6 +36,9 @@ class MainWindow(QMainWindow):
 
     """
 
+    # emitted from the iso surface worker thread when a full resolution mesh is ready
+    isoSurfaceRefined = pyqtSignal()
+
     def __init__(self):
         """ Initialize the main window of the CTViewer application. """
         super(MainWindow, self).__init__()
@@ -50,6 +57,24 @@ class MainWindow(QMainWindow):
         # Create a renderer
         self.renderer = Renderer(**user_config, qt_widget=self.vtkWidget1, bg='white', bg2='white', axes=8)
 
+        # Decode the volumes in the background and display them on the GUI thread
+        self.loader = VolumeLoader(self.renderer.reader, self, self.renderer.pyramid_min_voxels)
+        self.loader.progress.connect(self.onLoadProgress)
+        self.loader.loaded.connect(self.onVolumeLoaded)
+        self.loader.failed.connect(self.onLoadFailed)
+        self.prefetcher = Prefetcher(self.loader, self)
+        self.prefetcher.failed.connect(self.onPrefetchFailed)
+        # checks that an opened folder holds a volume, the tree view lists and watches the folder itself
+        self.folderScanner = FolderScanner(self.settingDialog.get_exts())
+        # swap in the finer levels of a large volume one per event loop iteration, so that the interaction goes on
+        self.refineTimer = QTimer(self)
+        self.refineTimer.setSingleShot(True)
+        self.refineTimer.setInterval(0)
+        self.refineTimer.timeout.connect(self.refineVolume)
+        # swap in the full resolution iso surface extracted after a slider release
+        self.renderer.iso_surfer.on_refined = self.isoSurfaceRefined.emit
+        self.isoSurfaceRefined.connect(self.refineIsoSurface)
+
         # Create a central widget
         self.centralwidget = QWidget(self)
         self.centralwidget.setObjectName("centralwidget")
@@ -76,8 +101,13 @@ class MainWindow(QMainWindow):
         self.left_layout = QVBoxLayout()
 
         # Add a QTreeView to the left side of the main window
-        self.treeView = TreeView(self.centralwidget, self.left_layout, self.settingDialog.get_exts(), self.renderer.update_volume)
-        self.add_Push_button("Refresh", "Refresh the tree view", self.treeView.refreshTreeView, self.left_layout, size=(270, 60))
+        thumbnail_index, thumbnail_size = self.settingDialog.get_thumbnail_settings()
+        self.thumbnailer = Thumbnailer(thumbnail_index, thumbnail_size, parent=self) if thumbnail_index else None
+        if self.thumbnailer is not None:
+            self.thumbnailer.failed.connect(self.onThumbnailFailed)
+        self.treeView = TreeView(self.centralwidget, self.left_layout, self.settingDialog.get_exts(), self.loader.load,
+                                 self.prefetcher.prefetch, self.settingDialog.get_prefetch_depth(), self.thumbnailer)
+        self.add_Push_button("Refresh", "List the folder again", self.treeView.reloadTreeView, self.left_layout, size=(270, 60))
     
         self.hLayout.addLayout(self.left_layout)
 
@@ -108,8 +138,13 @@ class MainWindow(QMainWindow):
         self.add_Action_button("About", self.openAboutDialog, self.help_menu)
         self.add_Action_button("Website", self.openWebsite, self.help_menu)
 
-        # Create a status bar
+        # Create a status bar with a progress bar for the volume loading
         self.setStatusBar(QStatusBar(self))
+        self.progressBar = QProgressBar(self)
+        self.progressBar.setMaximumWidth(200)
+        self.progressBar.setRange(0, 100)
+        self.progressBar.hide()
+        self.statusBar().addPermanentWidget(self.progressBar)
 
         # Créer un layout horizontal pour les boutons
         self.buttonsLayout = QHBoxLayout()
@@ -165,8 +200,7 @@ class MainWindow(QMainWindow):
         self.data_path = QFileDialog.getExistingDirectory(
             self, f"Select {exts} data Folder")
         if hasattr(self, 'data_path') and self.data_path:
-            self.volume_files = [path for ext in exts for path in Path(self.data_path).rglob('*.' + ext)]
-            if len(self.volume_files) > 0:
+            if self.folderScanner.has_volumes(self.data_path):
                 self.treeView.set_folder(self.data_path)
             else:
                 self.showPopup("warning", "Empty Folder Path", f"No .{exts} volumes in {self.data_path}")
@@ -176,9 +210,54 @@ class MainWindow(QMainWindow):
         exts = self.settingDialog.get_exts() # 'nii', 'nii.gz', 'mha', 'mhd'
         self.file_path, _ = QFileDialog.getOpenFileName(self, "Open volume or mask file", "", f"Volume Files (*.{' *.'.join(exts)})")
         if self.file_path:
-            self.renderer.update_volume(self.file_path)
-            self.treeView.refreshTreeView()
+            self.loader.load(self.file_path)
+
+    @pyqtSlot(str, int)
+    def onLoadProgress(self, path:str, value:int):
+        if value < 100:
+            self.progressBar.setValue(value)
+            self.progressBar.show()
+            self.statusBar().showMessage(f"Loading {Path(path).name}...")
+        else:
+            self.progressBar.hide()
+
+    @pyqtSlot(str, object, object)
+    def onVolumeLoaded(self, path:str, volume, properties:dict):
+        self.renderer.display_volume(volume, properties)
+        latency = self.treeView.volumeDisplayed(path)
+        displayed = f" in {latency * 1000:.0f} ms" if latency is not None else ""
+        self.statusBar().showMessage(f"Loaded {Path(path).name}{displayed} (prefetch hit rate {self.prefetcher.hit_rate():.0%})", 5000)
+        if self.renderer.pending_levels:
+            self.refineTimer.start()
+
+    @pyqtSlot()
+    def refineVolume(self):
+        if self.renderer.refine_volume():
+            self.refineTimer.start()
+            return
+        timings = ", ".join(f"{factor}x {seconds * 1000:.0f} ms" for factor, seconds in self.renderer.level_timings)
+        self.statusBar().showMessage(f"Time to display: {timings}", 5000)
+
+    @pyqtSlot()
+    def refineIsoSurface(self):
+        if self.renderer.iso_surfer.swap_refined():
+            self.renderer.render()
+
+    @pyqtSlot(str, str)
+    def onLoadFailed(self, path:str, message:str):
+        self.progressBar.hide()
+        self.statusBar().clearMessage()
+        self.showPopup("warning", "Loading Error", f"Cannot load {path}:\n{message}")
     
+    @pyqtSlot(str, str)
+    def onPrefetchFailed(self, path:str, message:str):
+        # the volume is only decoded ahead of time, its load reports the error if it is requested
+        self.statusBar().showMessage(f"Cannot prefetch {Path(path).name}: {message}", 5000)
+
+    @pyqtSlot(str, str)
+    def onThumbnailFailed(self, path:str, message:str):
+        self.statusBar().showMessage(f"Cannot make the thumbnail of {Path(path).name}: {message}", 5000)
+
     @pyqtSlot()
     def showPopup(self, type, title, message):
         getattr(QMessageBox, type)(self, title, message)
@@ -212,6 +291,14 @@ class MainWindow(QMainWindow):
 
     @pyqtSlot()
     def onClose(self):
+        if self.thumbnailer is not None:
+            self.thumbnailer.cancel()
+            self.thumbnailer.wait()
+        self.prefetcher.cancel()
+        self.loader.cancel()
+        self.loader.wait()
+        if self.renderer.reader.disk_cache is not None:
+            self.renderer.reader.disk_cache.flush()
         self.renderer.onClose()
         self.close()
     
@@ -0,0 +1,85 @@
+from typing import List
+
+from PyQt6.QtCore import QObject, QRunnable, pyqtSignal
+
+from .volume_loader import VolumeLoader
+
+
+class PrefetchTask(QRunnable):
+    def __init__(self, prefetcher:'Prefetcher', generation:int, path:str):
+        """
+        A runnable that decodes a volume file ahead of time on the loader's worker thread.
+
+        Args:
+            prefetcher (Prefetcher): The prefetcher that scheduled the task.
+            generation (int): The generation of the prefetch request, used to drop stale requests.
+            path (str): The path to the volume file.
+
+        """
+        super().__init__()
+        self.prefetcher = prefetcher
+        self.generation = generation
+        self.path = path
+
+    def run(self):
+        """Decode the volume into the prefetch cache of the reader."""
+        if self.generation != self.prefetcher.generation:
+            return
+        try:
+            self.prefetcher.loader.reader.prefetch(self.path)
+        except Exception as e:
+            self.prefetcher.failed.emit(self.path, str(e))
+
+
+class Prefetcher(QObject):
+    """
+    Decode the neighbouring volume files of the selected one ahead of time.
+
+    The prefetch tasks run on the worker thread of the volume loader with a lower
+    priority than the loads, so they never delay a volume requested by the user for
+    longer than one decode. The decoded volumes are kept in the prefetch cache of the
+    reader, whose budget bounds the memory used by the prefetching.
+
+    Signals:
+        failed (str, str): Emitted with the path and the error message of a volume that cannot be prefetched.
+    """
+
+    failed = pyqtSignal(str, str)
+
+    PRIORITY = -1
+
+    def __init__(self, loader:VolumeLoader, parent:QObject=None):
+        """
+        Initialize the prefetcher.
+
+        Args:
+            loader (VolumeLoader): The loader whose reader and worker thread are used.
+            parent (QObject): The parent object, if applicable.
+        """
+        super().__init__(parent)
+        self.loader = loader
+        self.generation = 0
+
+    def prefetch(self, paths:List[str]):
+        """
+        Decode the given volume files in the background, dropping the previous requests.
+
+        Args:
+            paths (List[str]): The paths to the volume files, the most likely next one first.
+        """
+        self.generation += 1
+        for path in paths:
+            self.loader.pool.start(PrefetchTask(self, self.generation, path), self.PRIORITY)
+
+    def cancel(self):
+        """Drop the pending prefetch requests."""
+        self.generation += 1
+
+    def hit_rate(self) -> float:
+        """
+        Get the fraction of the loads that missed the reader cache and were served by a prefetched volume.
+
+        Returns:
+            float: The hit rate between 0 and 1.
+        """
+        return self.loader.reader.prefetch_cache.hit_rate()
@@ -1,3 +1,5 @@
+import os
+
 from PyQt6 import QtWidgets
 
 from ctviewer.utils import ConfigManager
@@ -23,6 +25,7 @@ class SettingDialog(QtWidgets.QDialog):
         get_ogb_cmap(): Get the list of ogb_cmap values.
         get_alpha_weights(): Get the list of alpha weights.
         get_exts(): Get the list of extensions.
+        get_thumbnail_settings(): Get the thumbnail index and the thumbnail size.
         get_mask_classes(): Get the list of mask classes.
         get_user_config(): Get the user configuration settings.
         get_config_manager(): Get the configuration manager.
@@ -259,6 +262,25 @@ class SettingDialog(QtWidgets.QDialog):
         """
         return self.alpha
     
+    def get_prefetch_depth(self) -> tuple:
+        """
+        Get the number of next and previous files to prefetch.
+
+        Returns:
+            tuple: The number of next and previous files.
+        """
+        return self.user_config.get('prefetch_next', 2), self.user_config.get('prefetch_previous', 1)
+
+    def get_thumbnail_settings(self) -> tuple:
+        """
+        Get the thumbnail index and the thumbnail size.
+
+        Returns:
+            tuple: The path to the SQLite thumbnail index, None if the thumbnails are disabled, and the size in pixels.
+        """
+        index = self.user_config.get('thumbnail_index', "")
+        return (os.path.expanduser(index) if index else None), self.user_config.get('thumbnail_size', 64)
+
     def get_current_config(self) -> dict:
         """
         Get the current configuration settings.
@@ -266,12 +288,9 @@ class SettingDialog(QtWidgets.QDialog):
         Returns:
             dict: The current configuration settings.
         """
-        return {
-            'ogb': self.ogb,
-            'alpha': self.alpha,
-            'mask_classes': self.get_mask_classes(),
-            'isovalue': self.isovalue,
-        }
+        # the settings edited in the dialog override those saved in the configuration file
+        return {**self.config_manager.get_renderer_config(), 'ogb': self.ogb, 'alpha': self.alpha,
+                'mask_classes': self.get_mask_classes(), 'isovalue': self.isovalue}
 
     def update_brand(self, min_max:int=16000) -> None:
         """
@@ -0,0 +1,130 @@
+from typing import Dict, Optional
+
+import numpy as np
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+from PyQt6.QtGui import QIcon, QImage, QPixmap
+
+from ctviewer.io.thumbnails import ThumbnailIndex
+
+
+class ThumbnailTask(QRunnable):
+    def __init__(self, thumbnailer:'Thumbnailer', generation:int, path:str):
+        """
+        A runnable that gets the thumbnail of a volume file from the index, or computes it, on a pool thread.
+
+        Args:
+            thumbnailer (Thumbnailer): The thumbnailer that scheduled the task.
+            generation (int): The generation of the request, used to drop the requests of a previous folder.
+            path (str): The path to the volume file.
+
+        """
+        super().__init__()
+        self.thumbnailer = thumbnailer
+        self.generation = generation
+        self.path = path
+
+    def run(self):
+        """Get or compute the thumbnail and hand it to the GUI thread."""
+        if self.generation != self.thumbnailer.generation:
+            return
+        try:
+            thumbnail = self.thumbnailer.index.get_or_make(self.path, self.thumbnailer.size)
+        except Exception as e:
+            self.thumbnailer.failed.emit(self.path, str(e))
+            thumbnail = None
+        self.thumbnailer._finished.emit(self.path, thumbnail)
+
+
+class Thumbnailer(QObject):
+    """
+    Provide the maximum intensity projection thumbnails of volume files, computed in the background.
+
+    The thumbnails are read from a `ThumbnailIndex`, or computed from a strided read of the file
+    and stored in it, on a pool of worker threads separate from the volume loader's, so that they
+    never delay a load. The icons of the thumbnails are kept in memory once made.
+
+    Signals:
+        ready (str): Emitted with the path of a volume file whose thumbnail became available.
+        failed (str, str): Emitted with the path and the error message of a volume file whose thumbnail cannot be made.
+    """
+
+    ready = pyqtSignal(str)
+    failed = pyqtSignal(str, str)
+
+    # Internal signal emitted from the pool threads with the path and the thumbnail, None on failure
+    _finished = pyqtSignal(str, object)
+
+    def __init__(self, index_path:str, size:int=64, workers:int=2, parent:QObject=None):
+        """
+        Initialize the thumbnailer.
+
+        Args:
+            index_path (str): The path to the SQLite thumbnail index.
+            size (int): The number of pixels of the longest side of the thumbnails.
+            workers (int): The number of threads computing the thumbnails.
+            parent (QObject): The parent object, if applicable.
+        """
+        super().__init__(parent)
+        self.index = ThumbnailIndex(index_path)
+        self.size = size
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(workers)
+        self.generation = 0
+        self.icons: Dict[str, Optional[QIcon]] = {}
+        self._finished.connect(self._on_finished)
+
+    def icon(self, path:str) -> Optional[QIcon]:
+        """
+        Get the icon of the thumbnail of a volume file, requesting it if it was never requested.
+
+        Args:
+            path (str): The path to the volume file.
+
+        Returns:
+            QIcon: The icon, None until the thumbnail is available or if it cannot be made.
+        """
+        if path not in self.icons:
+            self.icons[path] = None
+            self.pool.start(ThumbnailTask(self, self.generation, path))
+        return self.icons[path]
+
+    def cancel(self):
+        """Drop the pending requests, e.g. when another folder is opened."""
+        self.generation += 1
+        self.pool.clear()
+        # the dropped requests are requested again when their items are displayed
+        self.icons = {path: icon for path, icon in self.icons.items() if icon is not None}
+
+    def wait(self, msecs:int=-1) -> bool:
+        """
+        Wait for the pool threads to finish their current tasks.
+
+        Args:
+            msecs (int): The timeout in milliseconds, -1 to wait forever.
+
+        Returns:
+            bool: True if the pool is idle.
+        """
+        return self.pool.waitForDone(msecs)
+
+    @staticmethod
+    def to_icon(thumbnail:np.ndarray) -> QIcon:
+        """
+        Convert a grayscale thumbnail to an icon.
+
+        Args:
+            thumbnail (np.ndarray): The uint8 thumbnail indexed as [row, column].
+
+        Returns:
+            QIcon: The icon of the thumbnail.
+        """
+        height, width = thumbnail.shape
+        image = QImage(np.ascontiguousarray(thumbnail).tobytes(), width, height, width, QImage.Format.Format_Grayscale8)
+        return QIcon(QPixmap.fromImage(image.copy()))
+
+    @pyqtSlot(str, object)
+    def _on_finished(self, path:str, thumbnail:Optional[np.ndarray]):
+        if thumbnail is None or path not in self.icons:
+            return
+        self.icons[path] = self.to_icon(thumbnail)
+        self.ready.emit(path)
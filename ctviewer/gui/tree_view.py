@@ -1,11 +1,57 @@
 import os
+import time
+from typing import List, Optional
 
 from PyQt6.QtWidgets import QTreeView, QWidget, QVBoxLayout, QSizePolicy
-from PyQt6.QtCore import QModelIndex
+from PyQt6.QtCore import QModelIndex, QSize, Qt
 from PyQt6.QtGui import QFileSystemModel
 
+from .thumbnailer import Thumbnailer
+
+class ThumbnailFileSystemModel(QFileSystemModel):
+    def __init__(self, exts:list, thumbnailer:Thumbnailer=None):
+        """
+        A file system model decorating the volume files with their thumbnail.
+
+        Args:
+            exts (list): The extensions of the volume files.
+            thumbnailer (Thumbnailer): The provider of the thumbnails, None for the default file icons.
+
+        """
+        super().__init__()
+        self.exts = tuple(f".{ext}" for ext in exts)
+        self.thumbnailer = thumbnailer
+        if thumbnailer is not None:
+            thumbnailer.ready.connect(self.thumbnailReady)
+
+    def data(self, index:QModelIndex, role:int=Qt.ItemDataRole.DisplayRole):
+        """Get the thumbnail as the decoration of the volume files once available, the file system data otherwise."""
+        if role == Qt.ItemDataRole.DecorationRole and index.column() == 0 and self.thumbnailer is not None:
+            path = self.filePath(index)
+            if path.endswith(self.exts) and not self.isDir(index):
+                icon = self.thumbnailer.icon(path)
+                if icon is not None:
+                    return icon
+        return super().data(index, role)
+
+    def thumbnailReady(self, path:str):
+        """
+        Redraw the item of a volume file whose thumbnail became available.
+
+        Args:
+            path (str): The path to the volume file.
+
+        """
+        index = self.index(path)
+        if index.isValid():
+            self.dataChanged.emit(index, index, [Qt.ItemDataRole.DecorationRole])
+
 class TreeView(QTreeView):
-    def __init__(self, centralwidget:QWidget, left_layout:QVBoxLayout, exts:list, update_volume_callback:callable):
+    # the size of the thumbnails displayed in front of the volume files
+    ICON_SIZE = 48
+
+    def __init__(self, centralwidget:QWidget, left_layout:QVBoxLayout, exts:list, update_volume_callback:callable,
+                 prefetch_callback:callable=None, prefetch_depth:tuple=(2, 1), thumbnailer:Thumbnailer=None):
         """
         A custom QTreeView widget for displaying a file system view with specific file extensions.
 
@@ -14,28 +60,63 @@ class TreeView(QTreeView):
             left_layout (QVBoxLayout): The layout in which the TreeView will be placed.
             exts (list): A list of file extensions to filter the file system view.
             update_volume_callback (callable): A callback function to be called when a tree item is clicked.
+            prefetch_callback (callable): A callback function called with the paths of the neighbouring
+                volume files of the clicked item, if applicable.
+            prefetch_depth (tuple): The number of next and previous volume files to prefetch.
+            thumbnailer (Thumbnailer): The provider of the thumbnails of the volume files, None to show the file icons.
 
         """
         super().__init__(centralwidget)
         self.exts = exts
         self.update_volume_callback = update_volume_callback
+        self.prefetch_callback = prefetch_callback
+        self.prefetch_depth = prefetch_depth
         self.setObjectName(f"TreeView of {exts} volume files")
         self.setSizePolicy(QSizePolicy.Policy.Minimum, QSizePolicy.Policy.Expanding)
         self.setMaximumWidth(300)
-        self.fileSystemModel = QFileSystemModel()
+        self.thumbnailer = thumbnailer
+        self.fileSystemModel = self.make_model()
         self.setModel(self.fileSystemModel)
+        # the rows of a folder of thousands of slices are laid out without measuring each of them
+        self.setUniformRowHeights(True)
+        if thumbnailer is not None:
+            self.setIconSize(QSize(self.ICON_SIZE, self.ICON_SIZE))
         self.clicked.connect(self.treeItemClicked)
+        # the clicked volume file and the time of the click, and the click to display latencies in seconds
+        self.last_click = None
+        self.click_latencies = []
         left_layout.addWidget(self)
         self.data_path = os.path.expanduser("~")
         self.refreshTreeView()
     
+    def make_model(self) -> ThumbnailFileSystemModel:
+        """Create the file system model of the volume files."""
+        model = ThumbnailFileSystemModel(self.exts, self.thumbnailer)
+        # the filters are applied once, the model then follows the file system changes and lists the
+        # children of a folder only when it is expanded
+        model.setNameFilters([f"*.{ext}" for ext in self.exts])
+        model.setNameFilterDisables(False)
+        return model
+
+    def reloadTreeView(self):
+        """
+        List the current directory again from the file system, e.g. for the changes the model was not notified of,
+        such as those of a network share. The model and its cached listings are replaced by a new one.
+        """
+        model, self.fileSystemModel = self.fileSystemModel, self.make_model()
+        if self.thumbnailer is not None:
+            model.thumbnailer.ready.disconnect(model.thumbnailReady)
+        self.setModel(self.fileSystemModel)
+        model.deleteLater()
+        self.refreshTreeView()
+
     def refreshTreeView(self):
-        """Refresh the file system view based on the current directory and file extension."""
-        self.fileSystemModel.setRootPath(self.data_path)
-        self.fileSystemModel.setNameFilters([f"*.{ext}" for ext in self.exts])
-        self.fileSystemModel.setNameFilterDisables(False)
-        self.setRootIndex(self.fileSystemModel.index(self.data_path))
-        self.dataChanged(QModelIndex(), QModelIndex())
+        """Show the current directory, if it is not the displayed one."""
+        if self.fileSystemModel.rootPath() != self.data_path:
+            self.fileSystemModel.setRootPath(self.data_path)
+        root_index = self.fileSystemModel.index(self.data_path)
+        if self.rootIndex() != root_index:
+            self.setRootIndex(root_index)
 
     def treeItemClicked(self, index:QModelIndex):
         """
@@ -45,10 +126,59 @@ class TreeView(QTreeView):
             index (QModelIndex): The index of the clicked tree item.
 
         """
+        if self.fileSystemModel.isDir(index):
+            return
         volume_path = self.fileSystemModel.filePath(index)
-        if os.path.isfile(volume_path):
-            self.update_volume_callback(volume_path)
-        self.refreshTreeView()
+        self.last_click = (volume_path, time.perf_counter())
+        self.update_volume_callback(volume_path)
+        if self.prefetch_callback is not None:
+            self.prefetch_callback(self.neighbour_files(index, *self.prefetch_depth))
+
+    def volumeDisplayed(self, path:str) -> Optional[float]:
+        """
+        Record the latency between the click on a volume file and its display.
+
+        Args:
+            path (str): The path to the displayed volume file.
+
+        Returns:
+            float: The latency in seconds, None if the volume was not opened from the tree view.
+        """
+        if self.last_click is None or self.last_click[0] != path:
+            return None
+        latency = time.perf_counter() - self.last_click[1]
+        self.last_click = None
+        self.click_latencies.append(latency)
+        return latency
+
+    def neighbour_files(self, index:QModelIndex, next_count:int, previous_count:int) -> List[str]:
+        """
+        Get the volume files next to an item, in the order of the file system model.
+
+        Args:
+            index (QModelIndex): The index of the tree item.
+            next_count (int): The number of following volume files.
+            previous_count (int): The number of preceding volume files.
+
+        Returns:
+            List[str]: The paths of the neighbouring volume files, interleaved from the closest
+            to the farthest and starting with the next one.
+        """
+        parent = index.parent()
+        rows = self.fileSystemModel.rowCount(parent)
+        following, preceding = [], []
+        for step, count, found in ((1, next_count, following), (-1, previous_count, preceding)):
+            row = index.row() + step
+            while 0 <= row < rows and len(found) < count:
+                sibling = self.fileSystemModel.index(row, 0, parent)
+                path = self.fileSystemModel.filePath(sibling)
+                if not self.fileSystemModel.isDir(sibling) and path.endswith(tuple(f".{ext}" for ext in self.exts)):
+                    found.append(path)
+                row += step
+        neighbours = []
+        for i in range(max(next_count, previous_count)):
+            neighbours += following[i:i + 1] + preceding[i:i + 1]
+        return neighbours
 
     def set_folder(self, folder:str):
         """
@@ -59,4 +189,6 @@ class TreeView(QTreeView):
 
         """
         self.data_path = folder
+        if self.thumbnailer is not None:
+            self.thumbnailer.cancel()
         self.refreshTreeView()
\ No newline at end of file
@@ -0,0 +1,166 @@
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+
+from ctviewer.io import Reader
+from ctviewer.io.pyramid import VolumePyramid
+from ctviewer.utils import Histogram
+
+
+class LoadTask(QRunnable):
+    def __init__(self, loader:'VolumeLoader', generation:int, path:str):
+        """
+        A runnable that decodes a single volume file on a worker thread.
+
+        Args:
+            loader (VolumeLoader): The loader that scheduled the task.
+            generation (int): The generation of the load request, used to detect superseded requests.
+            path (str): The path to the volume file.
+
+        """
+        super().__init__()
+        self.loader = loader
+        self.generation = generation
+        self.path = path
+
+    def run(self):
+        """Decode the volume, unless a newer load request superseded this one."""
+        if not self.loader.is_current(self.generation):
+            return
+        self.loader._progress.emit(self.generation, self.path, 10)
+        try:
+            self.loader.reader.reset_properties()
+            volume, properties = self.loader.reader(self.path)
+        except Exception as e:
+            self.loader._failed.emit(self.generation, self.path, str(e))
+            return
+        # the histogram and the pyramid are kept with the cache entry of the volume, so that a cache hit reuses them
+        derived = self.loader.reader.derived
+        if not properties["is_mask"] and not properties["is_proj"]:
+            if "histogram" not in derived:
+                histogram = Histogram(volume.tonumpy())
+                self.loader.reader.add_derived("histogram", histogram, histogram.nbytes)
+            properties = {**properties, "histogram": derived["histogram"]}
+        if VolumePyramid.needed(volume, properties, self.loader.pyramid_min_voxels):
+            if "pyramid" not in derived:
+                self.loader._progress.emit(self.generation, self.path, 70)
+                pyramid = VolumePyramid(volume)
+                self.loader.reader.add_derived("pyramid", pyramid, pyramid.nbytes)
+            properties = {**properties, "pyramid": derived["pyramid"]}
+        self.loader._progress.emit(self.generation, self.path, 90)
+        self.loader._finished.emit(self.generation, self.path, volume, properties)
+
+
+class VolumeLoader(QObject):
+    """
+    Decode volume files on a background thread so that the Qt event loop never blocks.
+
+    The decode (`Reader.__call__`, including the TDR rasterization and the connected
+    components of masks), the scalar histogram of the intensity volumes and the downsampled
+    levels of large volumes, handed over as the "histogram" and "pyramid" properties, run on
+    a single worker thread. The histogram and the pyramid are built once per cached volume. The decoded volume is handed
+    back to the GUI thread through the `loaded` signal. Starting a new load supersedes
+    the pending one: queued requests are dropped and the result of a request that is
+    already decoding is discarded.
+
+    Signals:
+        started (str): Emitted with the path when a load is requested.
+        progress (str, int): Emitted with the path and the progress in percent.
+        loaded (str, object, dict): Emitted with the path, the decoded volume and its properties.
+        failed (str, str): Emitted with the path and the error message.
+    """
+
+    started = pyqtSignal(str)
+    progress = pyqtSignal(str, int)
+    loaded = pyqtSignal(str, object, object)
+    failed = pyqtSignal(str, str)
+
+    # Internal signals emitted from the worker thread, tagged with the request generation
+    _progress = pyqtSignal(int, str, int)
+    _finished = pyqtSignal(int, str, object, object)
+    _failed = pyqtSignal(int, str, str)
+
+    def __init__(self, reader:Reader, parent:QObject=None, pyramid_min_voxels:int=0):
+        """
+        Initialize the loader.
+
+        Args:
+            reader (Reader): The reader used to decode the volumes. Only the worker thread uses it.
+            parent (QObject): The parent object, if applicable.
+            pyramid_min_voxels (int): The number of voxels from which a VolumePyramid is built, 0 to never build one.
+        """
+        super().__init__(parent)
+        self.reader = reader
+        self.pyramid_min_voxels = pyramid_min_voxels
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.generation = 0
+        self.current_path = None
+        self._progress.connect(self._on_progress)
+        self._finished.connect(self._on_finished)
+        self._failed.connect(self._on_failed)
+
+    def load(self, path:str):
+        """
+        Decode a volume file in the background, superseding any pending load.
+
+        Args:
+            path (str): The path to the volume file.
+        """
+        self.cancel()
+        self.current_path = path
+        self.started.emit(path)
+        self.progress.emit(path, 0)
+        self.pool.start(LoadTask(self, self.generation, path))
+
+    def cancel(self):
+        """Cancel the pending load. A decode that already started is discarded when it finishes."""
+        self.generation += 1
+        self.current_path = None
+        self.pool.clear()
+
+    def is_current(self, generation:int) -> bool:
+        """
+        Check whether a load request is still the latest one.
+
+        Args:
+            generation (int): The generation of the load request.
+
+        Returns:
+            bool: True if the request was not superseded or cancelled.
+        """
+        return generation == self.generation
+
+    def is_loading(self) -> bool:
+        """Check whether a load is pending."""
+        return self.current_path is not None
+
+    def wait(self, msecs:int=-1) -> bool:
+        """
+        Wait for the worker thread to finish its current task.
+
+        Args:
+            msecs (int): The timeout in milliseconds, -1 to wait forever.
+
+        Returns:
+            bool: True if the worker is idle.
+        """
+        return self.pool.waitForDone(msecs)
+
+    @pyqtSlot(int, str, int)
+    def _on_progress(self, generation:int, path:str, value:int):
+        if self.is_current(generation):
+            self.progress.emit(path, value)
+
+    @pyqtSlot(int, str, object, object)
+    def _on_finished(self, generation:int, path:str, volume, properties):
+        if not self.is_current(generation):
+            return
+        self.current_path = None
+        self.loaded.emit(path, volume, properties)
+        self.progress.emit(path, 100)
+
+    @pyqtSlot(int, str, str)
+    def _on_failed(self, generation:int, path:str, message:str):
+        if not self.is_current(generation):
+            return
+        self.current_path = None
+        self.failed.emit(path, message)
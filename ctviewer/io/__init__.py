@@ -1,3 +1,5 @@
+from .cache import VolumeCache
+from .disk_cache import DiskCache
 from .reader import Reader
 
-__all__ = ["Reader"]
\ No newline at end of file
+__all__ = ["Reader", "VolumeCache", "DiskCache"]
\ No newline at end of file
@@ -0,0 +1,177 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+
+class VolumeCache:
+    """
+    A bounded, memory-budgeted LRU cache for decoded volumes.
+
+    Entries are evicted in least-recently-used order as soon as the total size
+    of the cached entries exceeds the byte budget. The cache is thread-safe so
+    that it can be shared between the GUI thread and background loaders.
+
+    Attributes:
+    - max_bytes: The byte budget of the cache.
+    - nbytes: The current size in bytes of the cached entries.
+    - hits: The number of successful lookups.
+    - misses: The number of failed lookups.
+    - evictions: The number of entries evicted to respect the byte budget.
+
+    """
+
+    def __init__(self, max_bytes: int):
+        """
+        Initializes an empty cache.
+
+        Args:
+        - max_bytes: The byte budget of the cache. A budget of 0 disables the cache.
+
+        """
+        self.max_bytes = max(int(max_bytes), 0)
+        self.nbytes = 0
+        self.hits, self.misses, self.evictions = 0, 0, 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(path: str) -> Tuple[str, int, int]:
+        """
+        Build the cache key of a file from its absolute path, modification time and size.
+
+        Args:
+        - path: A string representing the path to the volume file.
+
+        Returns:
+        - key: A (path, mtime_ns, size) tuple. Touching or rewriting the file invalidates the key.
+
+        """
+        stat = os.stat(path)
+        return os.path.abspath(path), stat.st_mtime_ns, stat.st_size
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Look up an entry and mark it as the most recently used.
+
+        Args:
+        - key: The key of the entry.
+
+        Returns:
+        - value: The cached value, or None if the key is not cached.
+
+        """
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key][0]
+
+    def put(self, key: Hashable, value: Any, nbytes: int) -> bool:
+        """
+        Insert an entry, evicting the least recently used entries if needed.
+
+        Args:
+        - key: The key of the entry.
+        - value: The value to cache.
+        - nbytes: The size in bytes of the value.
+
+        Returns:
+        - cached: True if the value was cached, False if it is larger than the whole budget.
+
+        """
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self._entries.pop(key)[1]
+            if nbytes > self.max_bytes:
+                return False
+            self._entries[key] = (value, nbytes)
+            self.nbytes += nbytes
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted_nbytes) = self._entries.popitem(last=False)
+                self.nbytes -= evicted_nbytes
+                self.evictions += 1
+            return True
+
+    def charge(self, key: Hashable, nbytes: int) -> bool:
+        """
+        Add to the size of an entry, e.g. for data attached to its value, evicting the least recently used entries if needed.
+
+        Args:
+        - key: The key of the entry.
+        - nbytes: The number of bytes to add to the size of the entry.
+
+        Returns:
+        - cached: True if the entry is still cached, False if it is not cached or was evicted to respect the budget.
+
+        """
+        with self._lock:
+            if key not in self._entries:
+                return False
+            value, size = self._entries[key]
+            self._entries[key] = (value, size + nbytes)
+            self._entries.move_to_end(key)
+            self.nbytes += nbytes
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted_nbytes) = self._entries.popitem(last=False)
+                self.nbytes -= evicted_nbytes
+                self.evictions += 1
+            return key in self._entries
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        """
+        Remove an entry from the cache without counting a hit or a miss.
+
+        Args:
+        - key: The key of the entry.
+
+        Returns:
+        - value: The removed value, or None if the key is not cached.
+
+        """
+        with self._lock:
+            if key not in self._entries:
+                return None
+            value, nbytes = self._entries.pop(key)
+            self.nbytes -= nbytes
+            return value
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def clear(self):
+        """ Remove all the entries from the cache. """
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def hit_rate(self) -> float:
+        """
+        Get the fraction of the lookups that were served from the cache.
+
+        Returns:
+        - hit_rate: The hit rate between 0 and 1, 0 if there was no lookup yet.
+
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict:
+        """
+        Get the counters of the cache.
+
+        Returns:
+        - stats: A dictionary with the hits, misses, evictions, entries, nbytes and max_bytes of the cache.
+
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "entries": len(self._entries), "nbytes": self.nbytes, "max_bytes": self.max_bytes}
@@ -0,0 +1,200 @@
+import struct
+from typing import Any, BinaryIO, Dict, Iterable, Optional, Tuple
+
+Tag = Tuple[int, int]
+
+PIXEL_DATA = (0x7FE0, 0x0010)
+TRANSFER_SYNTAX_UID = (0x0002, 0x0010)
+
+IMPLICIT_VR_LITTLE_ENDIAN = "1.2.840.10008.1.2"
+EXPLICIT_VR_BIG_ENDIAN = "1.2.840.10008.1.2.2"
+DEFLATED_EXPLICIT_VR_LITTLE_ENDIAN = "1.2.840.10008.1.2.1.99"
+
+UNDEFINED_LENGTH = 0xFFFFFFFF
+
+# value representations encoded with a 4-byte length in the explicit VR transfer syntaxes
+LONG_VRS = {"OB", "OD", "OF", "OL", "OV", "OW", "SQ", "SV", "UC", "UN", "UR", "UT", "UV"}
+TEXT_VRS = {"AE", "AS", "CS", "DA", "DS", "DT", "IS", "LO", "LT", "PN", "SH", "ST", "TM", "UC", "UI", "UR", "UT"}
+NUMBER_VRS = {"US": "H", "SS": "h", "UL": "I", "SL": "i", "FL": "f", "FD": "d", "UV": "Q", "SV": "q"}
+
+# the value representation of the tags read by the probe and the series loader, for the implicit VR transfer syntax
+IMPLICIT_VRS = {
+    (0x0008, 0x0016): "UI", (0x0008, 0x0060): "CS", (0x0008, 0x0070): "LO",
+    (0x0018, 0x0050): "DS", (0x0018, 0x0088): "DS",
+    (0x0020, 0x000E): "UI", (0x0020, 0x0013): "IS", (0x0020, 0x0032): "DS", (0x0020, 0x0037): "DS",
+    (0x0028, 0x0002): "US", (0x0028, 0x0008): "IS", (0x0028, 0x0010): "US", (0x0028, 0x0011): "US",
+    (0x0028, 0x0030): "DS", (0x0028, 0x0100): "US", (0x0028, 0x0101): "US", (0x0028, 0x0103): "US",
+    (0x0028, 0x1052): "DS", (0x0028, 0x1053): "DS",
+    (0x0028, 0x9110): "SQ", (0x5200, 0x9229): "SQ", (0x5200, 0x9230): "SQ",
+    (0x4010, 0x1004): "FL", (0x4010, 0x1005): "FL",
+}
+
+
+def decode_value(raw: bytes, vr: str, endian: str = "<") -> Any:
+    """
+    Decodes the value of a data element.
+
+    Args:
+    - raw: The bytes of the value.
+    - vr: The value representation of the element.
+    - endian: The struct byte order of the transfer syntax, '<' or '>'.
+
+    Returns:
+    - value: A string for the text VRs, a number or a tuple of numbers for the binary numbers, the bytes otherwise.
+
+    """
+    if vr in TEXT_VRS:
+        return raw.decode("latin-1").rstrip("\x00 ").lstrip(" ")
+    if vr in NUMBER_VRS:
+        count = len(raw) // struct.calcsize(NUMBER_VRS[vr])
+        values = struct.unpack(f"{endian}{count}{NUMBER_VRS[vr]}", raw[:count * struct.calcsize(NUMBER_VRS[vr])])
+        return values[0] if count == 1 else values
+    return raw
+
+
+def _read_elements(file: BinaryIO, endian: str, explicit: bool, tags: Optional[set], repeated: set,
+                   values: Dict[Tag, Any], stop: Tag, end: Optional[int] = None) -> bool:
+    """
+    Reads the data elements until the end offset, a delimitation item or the stop tag.
+    The elements of the sequences are read recursively, the other values are skipped unless requested.
+
+    Returns:
+    - stopped: True if the stop tag was reached.
+
+    """
+    while end is None or file.tell() < end:
+        header = file.read(8)
+        if len(header) < 8:
+            return False
+        group, element = struct.unpack(endian + "HH", header[:4])
+        if group == 0xFFFE:
+            # items and delimitation items have no value representation
+            length = struct.unpack(endian + "I", header[4:])[0]
+            if element != 0xE000:
+                return False
+            item_end = None if length == UNDEFINED_LENGTH else file.tell() + length
+            if _read_elements(file, endian, explicit, tags, repeated, values, stop, item_end):
+                return True
+            continue
+        tag = (group, element)
+        if tag == stop:
+            return True
+        if explicit:
+            vr = header[4:6].decode("latin-1")
+            if vr in LONG_VRS:
+                length = struct.unpack(endian + "I", file.read(4))[0]
+            else:
+                length = struct.unpack(endian + "H", header[6:])[0]
+        else:
+            vr = IMPLICIT_VRS.get(tag, "UN")
+            length = struct.unpack(endian + "I", header[4:])[0]
+        if length == UNDEFINED_LENGTH or vr == "SQ":
+            # a sequence, or encapsulated data made of items
+            sequence_end = None if length == UNDEFINED_LENGTH else file.tell() + length
+            if _read_elements(file, endian, explicit, tags, repeated, values, stop, sequence_end):
+                return True
+        elif tag in repeated:
+            values.setdefault(tag, []).append(decode_value(file.read(length), vr, endian))
+        elif (tags is None or tag in tags) and tag not in values:
+            values[tag] = decode_value(file.read(length), vr, endian)
+        else:
+            file.seek(length, 1)
+    return False
+
+
+def _read_header(file: BinaryIO, path: str, tags: Optional[Iterable[Tag]], repeated: Iterable[Tag],
+                 stop: Tag) -> Tuple[Dict[Tag, Any], bool, str]:
+    """
+    Reads the data elements of an open DICOM file up to the stop tag, see read_tags.
+
+    Returns:
+    - values: The decoded values.
+    - stopped: True if the stop tag was reached, the file is then positioned after the first 8 bytes of its element.
+    - transfer_syntax: The transfer syntax UID of the file.
+
+    """
+    tags = None if tags is None else set(tags)
+    repeated = set(repeated)
+    values = {}
+    file.seek(128)
+    if file.read(4) != b"DICM":
+        raise ValueError(f"{path} is not a DICOM file")
+    # the file meta information is always encoded in explicit VR little endian
+    meta = {}
+    while True:
+        position = file.tell()
+        group = file.read(2)
+        file.seek(position)
+        if len(group) < 2 or struct.unpack("<H", group)[0] != 0x0002:
+            break
+        header = file.read(8)
+        vr = header[4:6].decode("latin-1")
+        length = struct.unpack("<I", file.read(4))[0] if vr in LONG_VRS else struct.unpack("<H", header[6:])[0]
+        meta[struct.unpack("<HH", header[:4])] = decode_value(file.read(length), vr)
+    transfer_syntax = meta.get(TRANSFER_SYNTAX_UID, "")
+    if transfer_syntax == DEFLATED_EXPLICIT_VR_LITTLE_ENDIAN:
+        raise ValueError(f"{path} uses the unsupported deflated transfer syntax")
+    values.update(meta if tags is None else {tag: value for tag, value in meta.items() if tag in tags})
+    endian = ">" if transfer_syntax == EXPLICIT_VR_BIG_ENDIAN else "<"
+    explicit = transfer_syntax != IMPLICIT_VR_LITTLE_ENDIAN
+    stopped = _read_elements(file, endian, explicit, tags, repeated, values, stop)
+    return values, stopped, transfer_syntax
+
+
+def read_tags(path: str, tags: Optional[Iterable[Tag]] = None, repeated: Iterable[Tag] = (),
+              stop: Tag = PIXEL_DATA) -> Dict[Tag, Any]:
+    """
+    Reads the data elements of a DICOM (or DICOS) file without reading its pixel data.
+
+    The elements are walked in file order, including the elements nested in sequences, and the
+    walk stops at the stop tag, so that the cost does not depend on the size of the image.
+
+    Args:
+    - path: A string representing the path to the DICOM file.
+    - tags: The (group, element) tags to decode, all the tags if None.
+    - repeated: The tags whose values are collected from every occurrence, e.g. in the items of a sequence.
+    - stop: The tag at which the walk stops, the pixel data by default.
+
+    Returns:
+    - values: A dictionary mapping the tags to their decoded values. The first occurrence of a tag wins,
+      the repeated tags map to the list of their values.
+
+    """
+    with open(path, "rb") as file:
+        return _read_header(file, path, tags, repeated, stop)[0]
+
+
+def locate_pixel_data(path: str, tags: Optional[Iterable[Tag]] = None) -> Tuple[Dict[Tag, Any], int, int, str]:
+    """
+    Reads the data elements of a DICOM file like `read_tags`, and the position of its native pixel data.
+
+    Args:
+    - path: A string representing the path to the DICOM file.
+    - tags: The (group, element) tags to decode, all the tags if None.
+
+    Returns:
+    - values: A dictionary mapping the tags to their decoded values.
+    - offset: The byte offset of the pixel data in the file.
+    - length: The byte length of the pixel data.
+    - endian: The byte order of the pixels, '<' or '>'.
+
+    Raises:
+    - ValueError: If the file has no pixel data or if it is encapsulated, i.e. compressed.
+
+    """
+    with open(path, "rb") as file:
+        values, stopped, transfer_syntax = _read_header(file, path, tags, (), PIXEL_DATA)
+        if not stopped:
+            raise ValueError(f"No pixel data in {path}")
+        endian = ">" if transfer_syntax == EXPLICIT_VR_BIG_ENDIAN else "<"
+        file.seek(-8, 1)
+        header = file.read(8)
+        if transfer_syntax != IMPLICIT_VR_LITTLE_ENDIAN and header[4:6].decode("latin-1") in LONG_VRS:
+            length = struct.unpack(endian + "I", file.read(4))[0]
+        elif transfer_syntax != IMPLICIT_VR_LITTLE_ENDIAN:
+            length = struct.unpack(endian + "H", header[6:])[0]
+        else:
+            length = struct.unpack(endian + "I", header[4:])[0]
+        if length == UNDEFINED_LENGTH:
+            raise ValueError(f"{path} has encapsulated pixel data, transfer syntax {transfer_syntax}")
+        return values, file.tell(), length, endian
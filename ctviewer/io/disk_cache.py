@@ -0,0 +1,378 @@
+import argparse
+import atexit
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import weakref
+from typing import List, Optional, Tuple
+
+from vedo import Volume, np
+
+from .cache import VolumeCache
+
+
+def _encode(value):
+    """ Convert the properties of a volume to JSON types, tagging the arrays and tuples to restore them exactly. """
+    if isinstance(value, np.ndarray):
+        return {"__ndarray__": value.tolist(), "dtype": value.dtype.str}
+    if isinstance(value, tuple):
+        return {"__tuple__": [_encode(item) for item in value]}
+    if isinstance(value, list):
+        return [_encode(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _encode(item) for key, item in value.items()}
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _decode(value):
+    """ Restore the properties encoded by `_encode`. """
+    if isinstance(value, dict):
+        if "__ndarray__" in value:
+            return np.array(value["__ndarray__"], dtype=value["dtype"])
+        if "__tuple__" in value:
+            return tuple(_decode(item) for item in value["__tuple__"])
+        return {key: _decode(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    return value
+
+
+# the open caches, whose memoized hashes are flushed once at exit, without keeping them alive
+_open_caches = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_open_caches():
+    for cache in list(_open_caches):
+        cache.flush()
+
+
+class DiskCache:
+    """
+    A persistent, size-bounded cache of decoded volumes on disk.
+
+    Each entry is an uncompressed Fortran-ordered .npy copy of the voxels, memory-mapped
+    when it is read back, and a JSON file with the properties of the volume. Entries are keyed
+    by a hash of the file content, so that a copied or renamed file reuses its entry, and the
+    hash of each path is memoized with the (mtime, size) of its content files, so that only new
+    or modified files are hashed. The memoized hashes are written at most every few seconds, and
+    those of the deleted or modified files are dropped when the cache is opened.
+    Entries are written atomically and evicted in least-recently-used order, the access time
+    being the modification time of the entry.
+
+    Attributes:
+    - directory: The directory of the cache.
+    - max_bytes: The byte budget of the cache.
+    - hits: The number of successful lookups.
+    - misses: The number of failed lookups.
+
+    """
+
+    INDEX = "index.json"
+    HASH_CHUNK = 1024 ** 2
+    # the minimum delay in seconds between two writes of the memoized hashes
+    INDEX_WRITE_INTERVAL = 5.0
+
+    def __init__(self, directory: str, max_bytes: int):
+        """
+        Opens or creates a cache directory.
+
+        Args:
+        - directory: The directory of the cache, created if needed.
+        - max_bytes: The byte budget of the cache.
+
+        """
+        self.directory = os.path.abspath(os.path.expanduser(directory))
+        self.max_bytes = max(int(max_bytes), 0)
+        self.hits, self.misses = 0, 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self._index = self._load_index()
+        self._dirty, self._written_at = False, 0.0
+        # the hashes memoized since the last write are not lost at exit
+        _open_caches.add(self)
+
+    @staticmethod
+    def _stamp(paths: List[str]) -> str:
+        """ Get the JSON list of the (path, mtime, size) keys of the content files of a volume. """
+        return json.dumps([VolumeCache.make_key(p) for p in paths])
+
+    def _load_index(self) -> dict:
+        """ Read the memoized hashes, without those of the deleted or modified files. """
+        try:
+            with open(os.path.join(self.directory, self.INDEX), "r") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        fresh = {}
+        for path, entry in index.items():
+            try:
+                stamp, digest = entry
+                if self._stamp([key[0] for key in json.loads(stamp)]) == stamp:
+                    fresh[path] = entry
+            except (OSError, ValueError, TypeError, IndexError):
+                continue
+        return fresh
+
+    def flush(self, force: bool = True):
+        """
+        Write the memoized hashes if some changed since the last write.
+
+        Args:
+        - force: Whether to write them now, rather than only if the last write is older than INDEX_WRITE_INTERVAL.
+
+        """
+        with self._lock:
+            if not self._dirty or (not force and time.monotonic() - self._written_at < self.INDEX_WRITE_INTERVAL):
+                return
+            index = json.dumps(self._index).encode()
+            self._dirty, self._written_at = False, time.monotonic()
+        try:
+            self._write_atomic(os.path.join(self.directory, self.INDEX), lambda f: f.write(index))
+        except OSError:
+            with self._lock:
+                self._dirty = True
+
+    def _write_atomic(self, path: str, write):
+        """ Write a file through a temporary file in the cache directory, renamed once complete. """
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @staticmethod
+    def content_files(path: str) -> List[str]:
+        """
+        Get the files holding the content of a volume: the file itself and, for a MetaImage header, its data file.
+
+        Args:
+        - path: A string representing the path to the volume file.
+
+        Returns:
+        - paths: The list of the content files.
+
+        """
+        paths = [path]
+        if path.endswith(".mhd"):
+            with open(path, "r", errors="replace") as f:
+                for line in f:
+                    key, _, value = line.partition("=")
+                    if key.strip() == "ElementDataFile" and value.strip() not in ("LOCAL", "LIST"):
+                        paths.append(os.path.join(os.path.dirname(path), value.strip()))
+        return paths
+
+    def digest(self, path: str, files: Optional[List[str]] = None) -> str:
+        """
+        Get the content hash of a volume file, memoized by the path, modification time and size of its content files.
+
+        Args:
+        - path: A string representing the path to the volume file.
+        - files: The content files of the volume, e.g. the slices of a DICOM series, those of `content_files` if None.
+
+        Returns:
+        - digest: The hexadecimal BLAKE2b digest of the content.
+
+        """
+        paths = files or self.content_files(path)
+        stamp = self._stamp(paths)
+        memo_key = os.path.abspath(path)
+        with self._lock:
+            entry = self._index.get(memo_key)
+            if entry is not None and entry[0] == stamp:
+                return entry[1]
+        hasher = hashlib.blake2b(digest_size=16)
+        for p in paths:
+            with open(p, "rb") as f:
+                for chunk in iter(lambda: f.read(self.HASH_CHUNK), b""):
+                    hasher.update(chunk)
+        digest = hasher.hexdigest()
+        with self._lock:
+            # a modified file replaces its previous hash
+            self._index[memo_key] = [stamp, digest]
+            self._dirty = True
+        self.flush(force=False)
+        return digest
+
+    def _entry_paths(self, digest: str) -> Tuple[str, str]:
+        return os.path.join(self.directory, digest + ".npy"), os.path.join(self.directory, digest + ".json")
+
+    def get(self, path: str, files: Optional[List[str]] = None) -> Optional[Tuple[Volume, dict]]:
+        """
+        Look up the decoded copy of a volume file and mark it as the most recently used.
+
+        Args:
+        - path: A string representing the path to the volume file.
+        - files: The content files of the volume, see `digest`.
+
+        Returns:
+        - cached: A (volume, properties) tuple whose voxels are memory-mapped from the cache, or None on a miss.
+
+        """
+        data_path, meta_path = self._entry_paths(self.digest(path, files))
+        try:
+            with open(meta_path, "r") as f:
+                meta = _decode(json.load(f))
+            data = np.load(data_path, mmap_mode='c')
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        now = time.time()
+        for p in (data_path, meta_path):
+            os.utime(p, (now, now))
+        # local import, the reader module depends on this one
+        from .reader import Reader
+        volume = Reader.array_to_volume(data)
+        volume.dataset.SetSpacing(meta["spacing"])
+        volume.dataset.SetOrigin(meta["origin"])
+        self.hits += 1
+        return volume, meta["properties"]
+
+    def put(self, path: str, volume: Volume, properties: dict, files: Optional[List[str]] = None) -> bool:
+        """
+        Store the decoded copy of a volume file, evicting the least recently used entries if needed.
+
+        Args:
+        - path: A string representing the path to the volume file.
+        - volume: The decoded volume.
+        - properties: The properties of the volume.
+        - files: The content files of the volume, see `digest`.
+
+        Returns:
+        - cached: True if the volume was stored, False if it is larger than the whole budget.
+
+        """
+        data = volume.tonumpy()
+        if data.nbytes > self.max_bytes:
+            return False
+        data_path, meta_path = self._entry_paths(self.digest(path, files))
+        meta = json.dumps(_encode({"spacing": tuple(volume.dataset.GetSpacing()),
+                                   "origin": tuple(volume.dataset.GetOrigin()),
+                                   "properties": properties})).encode()
+        # the voxels first, an entry is only visible once its properties are written
+        self._write_atomic(data_path, lambda f: np.save(f, data))
+        self._write_atomic(meta_path, lambda f: f.write(meta))
+        self.evict()
+        return True
+
+    def entries(self) -> List[Tuple[float, int, str]]:
+        """
+        List the entries of the cache.
+
+        Returns:
+        - entries: A list of (access time, size in bytes, digest) tuples, the least recently used first.
+
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".npy"):
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name[:-len(".npy")]))
+        return sorted(entries)
+
+    def nbytes(self) -> int:
+        """ Get the size in bytes of the cached voxels. """
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self) -> int:
+        """
+        Remove the least recently used entries until the cache fits in its budget.
+
+        Returns:
+        - evicted: The number of removed entries.
+
+        """
+        entries = self.entries()
+        total, evicted = sum(size for _, size, _ in entries), 0
+        for _, size, digest in entries:
+            if total <= self.max_bytes:
+                break
+            for p in reversed(self._entry_paths(digest)):
+                try:
+                    os.unlink(p)
+                except OSError:
+                    # already removed, or still mapped by a reader on Windows: skipped until a later eviction
+                    pass
+            total -= size
+            evicted += 1
+        return evicted
+
+    def clear(self):
+        """ Remove all the entries and the memoized hashes. """
+        for name in os.listdir(self.directory):
+            if name.endswith((".npy", ".json", ".tmp")):
+                os.unlink(os.path.join(self.directory, name))
+        with self._lock:
+            self._index = {}
+            self._dirty = False
+
+
+def warm(folder: str, directory: str, max_bytes: int, exts: Optional[List[str]] = None) -> Tuple[int, int]:
+    """
+    Decode every volume file of a folder into the disk cache.
+
+    Args:
+    - folder: The folder to walk recursively.
+    - directory: The directory of the disk cache.
+    - max_bytes: The byte budget of the disk cache.
+    - exts: The extensions of the volume files, those supported by the reader if None.
+
+    Returns:
+    - counts: The number of decoded files and the number of files that failed to decode.
+
+    """
+    from .reader import Reader
+    reader = Reader(cache_size_mb=0, prefetch_size_mb=0, disk_cache_dir=directory, disk_cache_size_mb=max_bytes // 1024 ** 2)
+    exts = tuple("." + ext for ext in (exts or Reader.DISK_CACHED_EXTS))
+    decoded, failed = 0, 0
+    for root, _, files in os.walk(folder):
+        for name in sorted(files):
+            if not name.endswith(exts):
+                continue
+            path = os.path.join(root, name)
+            start = time.perf_counter()
+            try:
+                reader.reset_properties()
+                reader(path)
+            except Exception as e:
+                failed += 1
+                print(f"{path}: {e}", file=sys.stderr)
+                continue
+            decoded += 1
+            print(f"{path}: {time.perf_counter() - start:.2f} s")
+    reader.disk_cache.flush()
+    return decoded, failed
+
+
+def main(argv: Optional[List[str]] = None):
+    """ Warm the disk cache from the command line. """
+    from ctviewer.utils import ConfigManager
+    config = ConfigManager().get_user_config()
+    parser = argparse.ArgumentParser(description="Decode the volume files of a folder into the disk cache of the reader.")
+    parser.add_argument("--warm", required=True, metavar="FOLDER", help="the folder whose volume files are decoded")
+    parser.add_argument("--cache-dir", default=config.get("disk_cache_dir") or None,
+                        help="the cache directory, disk_cache_dir of config.json by default")
+    parser.add_argument("--size-mb", type=int, default=config.get("disk_cache_size_mb", 10240),
+                        help="the budget of the cache in megabytes, disk_cache_size_mb of config.json by default")
+    args = parser.parse_args(argv)
+    if not args.cache_dir:
+        parser.error("no cache directory: set disk_cache_dir in config.json or pass --cache-dir")
+    decoded, failed = warm(args.warm, args.cache_dir, args.size_mb * 1024 ** 2)
+    print(f"{decoded} volumes cached in {args.cache_dir}, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+import gzip
+import os
+import struct
+
+import numpy as np
+
+from .dicom import read_tags
+
+MODALITY = (0x0008, 0x0060)
+SOP_CLASS_UID = (0x0008, 0x0016)
+SAMPLES_PER_PIXEL = (0x0028, 0x0002)
+NUMBER_OF_FRAMES = (0x0028, 0x0008)
+ROWS = (0x0028, 0x0010)
+COLUMNS = (0x0028, 0x0011)
+PIXEL_SPACING = (0x0028, 0x0030)
+SLICE_THICKNESS = (0x0018, 0x0050)
+SPACING_BETWEEN_SLICES = (0x0018, 0x0088)
+BITS_ALLOCATED = (0x0028, 0x0100)
+PIXEL_REPRESENTATION = (0x0028, 0x0103)
+THREAT_ROI_BASE = (0x4010, 0x1004)
+THREAT_ROI_EXTENT = (0x4010, 0x1005)
+
+TDR_SOP_CLASS_UID = "1.2.840.10008.5.1.4.1.1.501.3"
+
+MET_TYPES = {
+    "MET_CHAR": np.int8, "MET_UCHAR": np.uint8, "MET_SHORT": np.int16, "MET_USHORT": np.uint16,
+    "MET_INT": np.int32, "MET_UINT": np.uint32, "MET_LONG": np.int32, "MET_ULONG": np.uint32,
+    "MET_LONG_LONG": np.int64, "MET_ULONG_LONG": np.uint64, "MET_FLOAT": np.float32, "MET_DOUBLE": np.float64,
+}
+
+NIFTI_TYPES = {
+    2: np.uint8, 4: np.int16, 8: np.int32, 16: np.float32, 64: np.float64,
+    256: np.int8, 512: np.uint16, 768: np.uint32, 1024: np.int64, 1280: np.uint64,
+}
+
+# the integer types narrow enough to hold a mask, see the scalar range check of the reader
+MASK_TYPES = {np.dtype(np.bool_), np.dtype(np.uint8), np.dtype(np.int8)}
+
+
+def default_probe() -> dict:
+    """ Get the metadata of a file whose header does not tell anything. """
+    return {"dims": None, "spacing": (1, 1, 1), "dtype": None, "modality": None,
+            "is_mask": False, "is_proj": False, "is_tdr": False, "nbytes": None}
+
+
+def _finish(info: dict) -> dict:
+    """ Fill the mask guess and the decoded size from the dims and the dtype. """
+    if info["dtype"] is not None:
+        dtype = np.dtype(info["dtype"])
+        info["is_mask"] = info["is_mask"] or dtype in MASK_TYPES
+        if info["dims"] is not None:
+            info["nbytes"] = int(np.prod(info["dims"], dtype=np.int64)) * dtype.itemsize * info.pop("channels", 1)
+        info["dtype"] = dtype.name
+    info.pop("channels", None)
+    return info
+
+
+def probe_npy(path: str) -> dict:
+    """ Reads the dims and the dtype of a .npy file from its header. """
+    info = default_probe()
+    with open(path, "rb") as file:
+        version = np.lib.format.read_magic(file)
+        read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+        shape, _, dtype = read_header(file)
+    info["dims"], info["dtype"] = tuple(int(n) for n in shape), dtype
+    return _finish(info)
+
+
+def read_mhd_header(path: str) -> dict:
+    """ Reads the fields of a MetaImage text header, up to the ElementDataFile one, and the byte offset where it ends. """
+    header = {}
+    with open(path, "rb") as file:
+        for line in file:
+            key, _, value = line.decode(errors="replace").partition("=")
+            header[key.strip()] = value.strip()
+            if key.strip() == "ElementDataFile":
+                break
+        header["HeaderEnd"] = file.tell()
+    return header
+
+
+def probe_mhd(path: str) -> dict:
+    """ Reads the dims, the spacing and the element type of a MetaImage file from its text header. """
+    info = default_probe()
+    header = read_mhd_header(path)
+    if "DimSize" not in header or header.get("ElementType") not in MET_TYPES:
+        raise ValueError(f"Invalid MetaImage header in {path}")
+    dims = [int(n) for n in header["DimSize"].split()]
+    spacing = [float(s) for s in header.get("ElementSpacing", header.get("ElementSize", "1 1 1")).split()]
+    info["dims"] = tuple(dims + [1] * (3 - len(dims)))
+    info["spacing"] = tuple(spacing + [1.0] * (3 - len(spacing)))
+    info["dtype"] = MET_TYPES[header["ElementType"]]
+    info["channels"] = int(header.get("ElementNumberOfChannels", 1))
+    return _finish(info)
+
+
+def probe_nifti(path: str) -> dict:
+    """ Reads the dims, the spacing and the datatype of a gzipped NIfTI-1 or NIfTI-2 file, decompressing only its header. """
+    info = default_probe()
+    with gzip.open(path, "rb") as file:
+        header = file.read(540)
+    for endian in "<>":
+        sizeof_hdr = struct.unpack(endian + "i", header[:4])[0]
+        if sizeof_hdr == 348:
+            dim = struct.unpack(endian + "8h", header[40:56])
+            datatype = struct.unpack(endian + "h", header[70:72])[0]
+            pixdim = struct.unpack(endian + "8f", header[76:108])
+            break
+        if sizeof_hdr == 540:
+            datatype = struct.unpack(endian + "h", header[12:14])[0]
+            dim = struct.unpack(endian + "8q", header[16:80])
+            pixdim = struct.unpack(endian + "8d", header[104:168])
+            break
+    else:
+        raise ValueError(f"Invalid NIfTI header in {path}")
+    if datatype not in NIFTI_TYPES:
+        raise ValueError(f"Unsupported NIfTI datatype {datatype} in {path}")
+    ndim = min(max(dim[0], 1), 3)
+    info["dims"] = tuple(int(n) for n in dim[1:1 + ndim]) + (1,) * (3 - ndim)
+    info["spacing"] = tuple(float(s) for s in pixdim[1:1 + ndim]) + (1.0,) * (3 - ndim)
+    info["dtype"] = NIFTI_TYPES[datatype]
+    return _finish(info)
+
+
+def probe_dicom(path: str) -> dict:
+    """ Reads the dims, the spacing, the pixel type and the modality of a DICOM or DICOS file, stopping at the pixel data. """
+    info = default_probe()
+    tags = read_tags(path, tags=(MODALITY, SOP_CLASS_UID, SAMPLES_PER_PIXEL, NUMBER_OF_FRAMES, ROWS, COLUMNS,
+                                 PIXEL_SPACING, SLICE_THICKNESS, SPACING_BETWEEN_SLICES, BITS_ALLOCATED, PIXEL_REPRESENTATION),
+                     repeated=(THREAT_ROI_BASE, THREAT_ROI_EXTENT))
+    info["modality"] = tags.get(MODALITY) or None
+    info["is_tdr"] = info["modality"] == "TDR" or tags.get(SOP_CLASS_UID) == TDR_SOP_CLASS_UID
+    if info["is_tdr"]:
+        # the label volume spans the threat regions of interest, rasterized in (z, y, x) order
+        bases, extents = tags.get(THREAT_ROI_BASE, []), tags.get(THREAT_ROI_EXTENT, [])
+        ends = np.array([[int(b) + int(e) for b, e in zip(base, extent)] for base, extent in zip(bases, extents)]).reshape(-1, 3)
+        info["is_mask"] = True
+        info["dims"] = tuple(int(n) for n in ends.max(axis=0)[::-1]) if len(ends) else (1, 1, 1)
+        info["dtype"] = np.uint8 if len(ends) <= np.iinfo(np.uint8).max else np.uint16
+        return _finish(info)
+    if ROWS not in tags or COLUMNS not in tags:
+        raise ValueError(f"No image found in {path}")
+    frames = int(tags.get(NUMBER_OF_FRAMES) or 1)
+    info["is_proj"] = frames == 1
+    info["dims"] = (int(tags[COLUMNS]), int(tags[ROWS]), frames)
+    row_spacing, column_spacing = (float(s) for s in (tags.get(PIXEL_SPACING) or "1\\1").split("\\")[:2])
+    slice_spacing = float(tags.get(SPACING_BETWEEN_SLICES) or tags.get(SLICE_THICKNESS) or 1)
+    info["spacing"] = (column_spacing, row_spacing, slice_spacing)
+    signed = tags.get(PIXEL_REPRESENTATION, 0) == 1
+    info["dtype"] = np.dtype(f"{'i' if signed else 'u'}{max(int(tags.get(BITS_ALLOCATED, 16)) // 8, 1)}")
+    info["channels"] = int(tags.get(SAMPLES_PER_PIXEL, 1))
+    return _finish(info)
+
+
+def probe_dicom_series(path: str) -> dict:
+    """
+    Reads the metadata of the volume assembled from the DICOM series of a .dcm slice, from the headers of its slices.
+
+    The dtype and the size are those of the widest rescaled voxels. A .dcm file is always read as a volume,
+    a single slice being one voxel deep, so it is never a projection.
+    """
+    # local import, the series module depends on this one
+    from .series import find_series, rescaled_dtype, slice_spacing
+    info = probe_dicom(path)
+    info["is_proj"] = False
+    try:
+        headers = find_series(path)
+    except (ValueError, OSError):
+        return info
+    first = headers[0]
+    if len(headers) * first["frames"] < 2:
+        return info
+    info["dims"] = (first["columns"], first["rows"], len(headers) * first["frames"])
+    info["spacing"] = (*first["spacing"], slice_spacing(headers))
+    stored = first["dtype"].newbyteorder("=")
+    dtype = rescaled_dtype(stored, np.array([header["slope"] for header in headers]),
+                           np.array([header["intercept"] for header in headers]))
+    info["dtype"] = dtype.name
+    info["is_mask"] = dtype in MASK_TYPES
+    info["nbytes"] = int(np.prod(info["dims"], dtype=np.int64)) * dtype.itemsize
+    return info
+
+
+def probe(path: str) -> dict:
+    """
+    Reads the metadata of a volume file from its header only, without decoding the voxels.
+
+    Args:
+    - path: A string representing the path to the volume file (.npy, .mhd, .nii.gz, .dcm or .dcs).
+
+    Returns:
+    - info: A dictionary with the dims (x, y, z), the spacing, the voxel dtype name, the modality
+      (DICOM/DICOS only), the is_mask, is_proj and is_tdr flags and the size in bytes of the decoded voxels.
+      The metadata of a .dcm slice is that of its assembled series.
+      The mask flag is a guess from the voxel type, the reader checks the scalar range after the decode.
+
+    Raises:
+    - ValueError: If the format is not supported or the header is invalid.
+
+    """
+    ext = "nii.gz" if path.endswith(".nii.gz") else path.split(".")[-1]
+    probes = {"npy": probe_npy, "mhd": probe_mhd, "nii.gz": probe_nifti, "dcm": probe_dicom_series, "dcs": probe_dicom}
+    if ext not in probes:
+        raise ValueError(f"Unsupported file format: {os.path.basename(path)}")
+    try:
+        return probes[ext](path)
+    except (struct.error, EOFError, UnicodeDecodeError, IndexError) as e:
+        raise ValueError(f"Invalid header in {path}: {e}") from e
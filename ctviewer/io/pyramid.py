@@ -0,0 +1,123 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+from vedo import Volume, np
+
+from .reader import Reader
+
+
+def _axis_slice(axis: int, start=None, stop=None, step=None) -> tuple:
+    """ Build an index selecting a slice along a single axis of a 3D array. """
+    index = [slice(None)] * 3
+    index[axis] = slice(start, stop, step)
+    return tuple(index)
+
+
+def _mean_pool_2(data: np.ndarray) -> np.ndarray:
+    """ Average the 2x2x2 blocks of a 3D array, the last block of an odd axis being a single voxel wide. """
+    pooled = data
+    for axis in range(3):
+        out = pooled[_axis_slice(axis, 0, None, 2)].astype(np.float32, order='K')
+        odd = pooled[_axis_slice(axis, 1, None, 2)]
+        target = out[_axis_slice(axis, 0, odd.shape[axis])]
+        target += odd
+        target *= 0.5
+        pooled = out
+    return pooled
+
+
+def mean_pool_3d(data: np.ndarray, workers: int = None, chunk: int = 32) -> np.ndarray:
+    """
+    Downsample a 3D array by 2 along each axis by averaging the 2x2x2 blocks.
+
+    The array is processed in slabs of `chunk` planes along z on a thread pool, numpy releasing
+    the GIL in the arithmetic, and each slab is written into the preallocated Fortran-ordered output.
+
+    Args:
+    - data: A 3D ndarray indexed as [x, y, z].
+    - workers: The number of threads, the number of CPUs if None.
+    - chunk: The number of z planes of a slab, rounded to an even number.
+
+    Returns:
+    - pooled: The downsampled array, of shape ceil(shape / 2) and of the dtype of the input.
+
+    """
+    chunk = max(chunk // 2, 1) * 2
+    pooled = np.empty(tuple((n + 1) // 2 for n in data.shape), dtype=data.dtype, order='F')
+    is_integer = np.issubdtype(data.dtype, np.integer)
+
+    def pool_slab(z):
+        slab = _mean_pool_2(data[:, :, z:z + chunk])
+        if is_integer:
+            np.rint(slab, out=slab)
+        pooled[:, :, z // 2:z // 2 + slab.shape[2]] = slab
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        list(executor.map(pool_slab, range(0, data.shape[2], chunk)))
+    return pooled
+
+
+class VolumePyramid:
+    """
+    Downsampled copies of a volume, to display a coarse level at once and the finer ones progressively.
+
+    Each level halves the previous one by averaging its 2x2x2 blocks, so that building the whole
+    pyramid costs about one pass over the full resolution voxels. The levels keep the world bounds
+    of the volume: the spacing is scaled by the factor and the origin moved to the block centres.
+
+    Attributes:
+    - levels: A list of (factor, volume) tuples from the coarsest level to the full resolution volume (factor 1).
+    - build_times: A dictionary mapping the factors to the time in seconds spent building the level.
+
+    """
+
+    def __init__(self, volume: Volume, factors: Tuple[int] = (2, 4, 8), workers: int = None):
+        """
+        Builds the downsampled levels of a volume.
+
+        Args:
+        - volume: The full resolution volume.
+        - factors: The downsampling factors of the levels, powers of 2.
+        - workers: The number of threads used to downsample, the number of CPUs if None.
+
+        """
+        self.levels: List[Tuple[int, Volume]] = [(1, volume)]
+        self.build_times: Dict[int, float] = {}
+        spacing, origin = np.array(volume.dataset.GetSpacing()), np.array(volume.dataset.GetOrigin())
+        data, factor = volume.tonumpy(), 1
+        for target in sorted(factors):
+            start = time.perf_counter()
+            while factor < target:
+                data, factor = mean_pool_3d(data, workers), factor * 2
+            level = Reader.array_to_volume(data)
+            level.dataset.SetSpacing(spacing * factor)
+            level.dataset.SetOrigin(origin + spacing * (factor - 1) / 2)
+            self.levels.insert(0, (factor, level))
+            self.build_times[factor] = time.perf_counter() - start
+
+    @property
+    def nbytes(self) -> int:
+        """ The memory size in bytes of the downsampled levels, the full resolution volume excluded. """
+        return sum(Reader.get_nbytes(level) for factor, level in self.levels if factor != 1)
+
+    @staticmethod
+    def needed(volume, volume_properties: dict, min_voxels: int) -> bool:
+        """
+        Check whether a decoded volume is worth a pyramid.
+
+        Args:
+        - volume: The decoded volume or image.
+        - volume_properties: The properties of the volume.
+        - min_voxels: The number of voxels from which a pyramid is built, 0 to never build one.
+
+        Returns:
+        - needed: True for the intensity volumes of at least min_voxels voxels.
+
+        """
+        if not min_voxels or not isinstance(volume, Volume):
+            return False
+        if volume_properties["is_mask"] or volume_properties["is_proj"]:
+            return False
+        return int(np.prod(volume.dimensions(), dtype=np.int64)) >= min_voxels
@@ -1,9 +1,16 @@
-from typing import Tuple, List
+import copy
+from typing import Tuple, List, Optional
 
 from vedo import Volume, Image, np
+from vtkmodules.vtkCommonDataModel import vtkImageData
+from vtkmodules.util.numpy_support import numpy_to_vtk
 from pydicos import dcsread
 
-from ctviewer.utils import connected_components_3d
+from ctviewer.utils import connected_components_3d, streaming_connected_components_3d
+from .cache import VolumeCache
+from .disk_cache import DiskCache
+from .probe import probe
+from .series import find_series, load_series
 
 # create a new reader class
 class Reader:
@@ -12,19 +19,47 @@ class Reader:
 
     Attributes:
     - properties: A dictionary containing various properties of the volume.
+    - cache: An LRU cache of the decoded volumes keyed by (path, mtime, size).
+    - prefetch_cache: An LRU cache of the volumes decoded ahead of time by `prefetch`.
+    - disk_cache: A persistent cache of the decoded volumes on disk, None if disabled.
+    - series_paths: The first slice of the DICOM series of each assembled slice.
+    - series_files: The slices of each assembled DICOM series by its first slice. The caches key a series on all of them.
+    - derived: The data derived from the last volume read, e.g. its histogram, kept with its cache entry
+      so that it is computed once per cached volume. It is not copied, unlike the properties. See `add_derived`.
 
     """
 
-    def __init__(self):
+    # the formats that are compressed or slow to decode, .npy files are already memory-mapped as is
+    DISK_CACHED_EXTS = ["nii.gz", "mhd", "dcm", "dcs"]
+
+    def __init__(self, cache_size_mb: int = 1024, prefetch_size_mb: int = 1024,
+                 disk_cache_dir: str = None, disk_cache_size_mb: int = 10240):
         """
         Initializes the reader with default properties.
 
+        Args:
+        - cache_size_mb: The memory budget in megabytes of the decoded-volume cache. 0 disables the cache.
+        - prefetch_size_mb: The memory budget in megabytes of the prefetched volumes. 0 disables the prefetching.
+        - disk_cache_dir: The directory of the persistent decoded-volume cache. None or empty disables it.
+        - disk_cache_size_mb: The disk budget in megabytes of the persistent cache.
+
         """
-        self.properties = {"spacing": (1, 1, 1), "origin": (0, 0, 0), "is_proj": False, "is_mask": False, "poses": [], "flag_poses": [], "labels": []}
+        self.properties = self.default_properties()
+        self.cache = VolumeCache(cache_size_mb * 1024 ** 2)
+        self.prefetch_cache = VolumeCache(prefetch_size_mb * 1024 ** 2)
+        self.disk_cache = DiskCache(disk_cache_dir, disk_cache_size_mb * 1024 ** 2) if disk_cache_dir else None
+        self.series_paths, self.series_files = {}, {}
+        self.derived, self.derived_key = {}, None
+
+    @staticmethod
+    def default_properties() -> dict:
+        """ Get the default properties of a volume. """
+        return {"spacing": (1, 1, 1), "origin": (0, 0, 0), "is_proj": False, "is_mask": False, "poses": [], "flag_poses": [], "labels": []}
 
     def __call__(self, path: str) -> Tuple[Volume, dict]:
         """
         Reads the volume data from the specified path and returns the volume and properties.
+        Volumes that were already decoded are served from the cache as long as the file is unchanged.
 
         Args:
         - path: A string representing the path to the volume file.
@@ -33,19 +68,209 @@ class Reader:
         - volume: An instance of the Volume class representing the volume data.
         - properties: A dictionary containing various properties of the volume.
 
+        """
+        key = self.cache_key(path)
+        cached = self.cache.get(key)
+        if cached is None and self.prefetch_cache.get(key) is not None:
+            # promote the prefetched volume to the cache of the opened volumes
+            cached = self.prefetch_cache.pop(key)
+            self.cache.put(key, cached, self.get_nbytes(cached[0]))
+        if cached is not None:
+            volume, properties, self.derived = cached
+            self.derived_key = key
+            self.properties = copy.deepcopy(properties)
+            return volume, self.properties
+
+        volume = self.read_through(path)
+        key = self.cache_key(path)
+        self.derived, self.derived_key = {}, key
+        self.cache.put(key, (volume, copy.deepcopy(self.properties), self.derived), self.get_nbytes(volume))
+        return volume, self.properties
+
+    def add_derived(self, name: str, value, nbytes: int):
+        """
+        Keeps data derived from the last volume read with its cache entry, charging its size to the cache budget.
+
+        Args:
+        - name: The name of the data in `derived`.
+        - value: The derived data.
+        - nbytes: The size in bytes of the derived data.
+
+        """
+        self.derived[name] = value
+        if self.derived_key is not None:
+            self.cache.charge(self.derived_key, nbytes)
+
+    def cache_key(self, path: str) -> tuple:
+        """
+        Build the key of a volume file in the caches. The slices of an assembled DICOM series share the key of the
+        series, made of the keys of all its slices so that modifying any of them invalidates the series.
+
+        Args:
+        - path: A string representing the path to the volume file.
+
+        Returns:
+        - key: The (path, mtime_ns, size) key of the file, or the tuple of those of the slices of its series.
+
+        """
+        first = self.series_paths.get(path)
+        if first in self.series_files:
+            try:
+                return tuple(VolumeCache.make_key(p) for p in self.series_files[first])
+            except OSError:
+                # a slice was removed, the series is found again when the file is read
+                del self.series_files[first]
+        return VolumeCache.make_key(path)
+
+    def prefetch(self, path: str) -> bool:
+        """
+        Decodes a volume ahead of time into the prefetch cache, so that opening it later skips the decode.
+        The properties of the reader are left untouched.
+
+        Args:
+        - path: A string representing the path to the volume file.
+
+        Returns:
+        - prefetched: True if the volume was decoded, False if it was already cached or is larger than the prefetch budget.
+
+        """
+        key = self.cache_key(path)
+        if key in self.cache or key in self.prefetch_cache:
+            return False
+        try:
+            nbytes = self.probe(path)["nbytes"]
+        except ValueError:
+            nbytes = None
+        if nbytes is not None and nbytes > self.prefetch_cache.max_bytes:
+            # the decoded volume would be rejected by the prefetch cache anyway
+            return False
+        properties = self.properties
+        self.reset_properties()
+        try:
+            volume = self.read_through(path)
+            key = self.cache_key(path)
+            self.prefetch_cache.put(key, (volume, self.properties, {}), self.get_nbytes(volume))
+        finally:
+            self.properties = properties
+        return True
+
+    @staticmethod
+    def probe(path: str) -> dict:
+        """
+        Reads the metadata of a volume file from its header only, in a fraction of the decode time.
+
+        Args:
+        - path: A string representing the path to the volume file.
+
+        Returns:
+        - info: A dictionary with the dims, spacing, dtype, modality, is_mask, is_proj, is_tdr and nbytes of the volume.
+
+        """
+        return probe(path)
+
+    @staticmethod
+    def array_to_volume(data: np.ndarray) -> Volume:
+        """
+        Wraps a 3D array as a Volume without an intermediate copy.
+
+        VTK stores the voxels in Fortran order (x fastest). The buffer of a Fortran-contiguous
+        array, e.g. a memory-mapped .npy saved in Fortran order, is shared with VTK as is.
+        Other arrays are copied once, straight into the buffer used by VTK.
+
+        Args:
+        - data: A 3D ndarray indexed as [x, y, z].
+
+        Returns:
+        - volume: An instance of the Volume class sharing or owning the voxels.
+
+        """
+        if data.dtype == np.bool_ or data.dtype == np.float16:
+            data = data.astype(np.uint8 if data.dtype == np.bool_ else np.float32, order='F')
+        scalars = numpy_to_vtk(data.ravel(order='F'), deep=False)
+        scalars.SetName("input_scalars")
+        image = vtkImageData()
+        image.SetDimensions(data.shape)
+        image.GetPointData().SetScalars(scalars)
+        return Volume(image)
+
+    @staticmethod
+    def as_label_map(volume: Volume) -> Volume:
+        """
+        Casts the labels of a mask to uint8, the labels of the masks detected by their scalar range being below 100.
+
+        Args:
+        - volume: An instance of the Volume class holding the labels.
+
+        Returns:
+        - volume: The same Volume, its scalars cast to uint8 if they were of another type.
+
+        """
+        if volume.tonumpy().dtype != np.uint8:
+            volume.astype("uint8")
+        return volume
+
+    @staticmethod
+    def get_nbytes(volume: Volume) -> int:
+        """ Get the memory size in bytes of a volume or an image. """
+        # the memory size of vtk data objects is reported in kibibytes
+        return volume.dataset.GetActualMemorySize() * 1024
+
+    def read_through(self, path: str) -> Volume:
+        """
+        Decodes the volume data like `read`, serving and filling the disk cache if it is enabled.
+
+        Args:
+        - path: A string representing the path to the volume file.
+
+        Returns:
+        - volume: An instance of the Volume class, memory-mapped from the disk cache on a hit.
+
+        """
+        ext = "nii.gz" if path.endswith(".nii.gz") else path.split(".")[-1]
+        if self.disk_cache is None or ext not in self.DISK_CACHED_EXTS:
+            return self.read(path)
+        # a series is found first, so that its entry is keyed by its first slice and hashed from all its slices
+        series = self.find_dicom_series(path) if ext == 'dcm' else None
+        entry_path, files = (series[0]["path"], [header["path"] for header in series]) if series else (path, None)
+        cached = self.disk_cache.get(entry_path, files)
+        if cached is not None:
+            volume, self.properties = cached
+            return volume
+        volume = self.read(path, series)
+        if isinstance(volume, Volume) and not self.properties["is_proj"]:
+            self.disk_cache.put(entry_path, volume, self.properties, files)
+        return volume
+
+    def read(self, path: str, series: Optional[List[dict]] = None) -> Volume:
+        """
+        Decodes the volume data from the specified path and fills the properties, bypassing the cache.
+
+        Args:
+        - path: A string representing the path to the volume file.
+        - series: The slice headers of the DICOM series of a .dcm file if it was already found, see `find_dicom_series`.
+
+        Returns:
+        - volume: An instance of the Volume class representing the volume data.
+
         """
         ext = "nii.gz" if path.endswith(".nii.gz") else path.split(".")[-1]
         if ext == 'npy':
-            data = np.load(path)
-            volume = Volume(data)
+            # copy-on-write mapping: the pages are read from the file on demand and never written back
+            data = np.load(path, mmap_mode='c')
+            volume = self.array_to_volume(data)
             smin, smax = volume.dataset.GetScalarRange()
             if smin == 0 and smax < 100: # check if the volume is a mask.
-                self.properties = connected_components_3d(volume, connectivity = 26, reshape_factor = 4)
+                # stream the mapped file in slabs instead of pooling the whole mask at once
+                self.properties = streaming_connected_components_3d(data, connectivity = 26, reshape_factor = 4)
+                volume = self.as_label_map(volume)
         elif ext == 'nii.gz' or ext == 'mhd' or ext == 'dcm':
-            volume = Volume(path)
+            volume = self.read_dicom_series(path, series) if ext == 'dcm' else None
+            if volume is None:
+                volume = Volume(path)
             smin, smax = volume.dataset.GetScalarRange()
             if smin == 0 and smax < 100: # check if the volume is a mask.
-                self.properties = connected_components_3d(volume, connectivity = 26, reshape_factor = 4)
+                self.properties = connected_components_3d(volume, connectivity = 26, reshape_factor = 4, downsample_first = True)
+                volume = self.as_label_map(volume)
             else:
                 self.properties["spacing"] = volume.spacing()
                 self.properties["origin"] = volume.origin()
@@ -53,67 +278,121 @@ class Reader:
             ct = dcsread(path)
             data = ct.get_data()
             if isinstance(data, np.ndarray):
-                volume = Volume(data)
+                volume = self.array_to_volume(data)
             elif isinstance(data, List):
                 if data[0].shape[0] == 1: # check if the volume is a projection
                     self.properties["is_proj"] = True
                     volume = Image(data[0][0]/ np.max(data[0][0]) * 255, channels=1)
                 else:
-                    volume = Volume(data[0])
+                    volume = self.array_to_volume(data[0])
                     if ct.GetDeviceManufacturer().Get() == "Analogic":
                         volume = volume.threshold(above=0, below=350, replace=0).operation("+", 1300)
             elif isinstance(data, dict):
                 volume = self.Read_TDR_data(data) 
-                volume = Volume(volume)
+                volume = self.array_to_volume(volume)
             else:
                 raise ValueError("Invalid data type")
-        return volume, self.properties
+        return volume
     
+    def find_dicom_series(self, path: str) -> Optional[List[dict]]:
+        """
+        Finds the DICOM series of a slice among the .dcm files of its folder, and records its slices.
+
+        Args:
+        - path: A string representing the path to a slice of the series.
+
+        Returns:
+        - headers: The sorted slice headers of the series, see `find_series`, None for the single slices and
+          the files that cannot be assembled, e.g. compressed ones.
+
+        """
+        try:
+            headers = find_series(path)
+        except (ValueError, OSError):
+            return None
+        if len(headers) * headers[0]["frames"] < 2:
+            return None
+        first = headers[0]["path"]
+        self.series_paths.update({header["path"]: first for header in headers})
+        self.series_files[first] = [header["path"] for header in headers]
+        return headers
+
+    def read_dicom_series(self, path: str, series: Optional[List[dict]] = None) -> Optional[Volume]:
+        """
+        Assembles the DICOM series of a slice from the .dcm files of its folder, decoding the slices in parallel.
+
+        Args:
+        - path: A string representing the path to a slice of the series.
+        - series: The slice headers of the series if it was already found, see `find_dicom_series`.
+
+        Returns:
+        - volume: An instance of the Volume class with the rescaled voxels, the spacing and the origin of the
+          series, None for the single slices and the files that cannot be assembled, e.g. compressed ones.
+
+        """
+        headers = series or self.find_dicom_series(path)
+        if headers is None:
+            return None
+        try:
+            data, spacing, origin = load_series(headers)
+        except (ValueError, OSError):
+            return None
+        volume = self.array_to_volume(data)
+        volume.spacing(spacing)
+        volume.origin(origin)
+        return volume
+
     def Read_TDR_data(self, metadata_dict: dict) -> np.ndarray:
         """
-        Reads a TDR file and returns the list of PTOs.
+        Reads a TDR file and rasterizes its PTOs into a label volume.
+
+        The i-th PTO is written with the label id i + 1, so that `properties["labels"][id - 1]`
+        gives the description of the voxels labelled `id`. The bitmaps are written in place into
+        the preallocated label volume, the last PTO (highest id) wins where PTOs overlap.
 
         Args:
         - metadata_dict: A dictionary containing the metadata of the TDR file.
 
         Returns:
-        - mask: An ndarray representing the binary mask.
-        - properties: A dictionary containing various properties of the mask.
+        - mask: An ndarray representing the label volume, uint8 for up to 255 PTOs and uint16 above.
 
         """
         PTOs = metadata_dict["PTOs"]
-        max_dims = [0, 0, 0]
         self.properties["is_mask"] = True
 
-        for pto in PTOs:
+        boxes = np.zeros((len(PTOs), 2, 3), dtype=int) # (base, end) in (z, y, x) order
+        for box, pto in zip(boxes, PTOs):
             assert "Base" in pto and "Extent" in pto, "Base or Extent not found in PTO"
-            base = [int(pto["Base"]["z"]), int(pto["Base"]["y"]), int(pto["Base"]["x"])]
-            extent = [int(pto["Extent"]["z"]), int(pto["Extent"]["y"]), int(pto["Extent"]["x"])]
-            pos =  [base[0], base[0] + extent[0], base[1], base[1] + extent[1], base[2], base[2] + extent[2]]
-            max_dims = [max(max_dims[0], pos[1]), max(max_dims[1], pos[3]), max(max_dims[2], pos[5])]
-            self.properties["poses"].append(np.array(pos))
+            base = np.array([int(pto["Base"]["z"]), int(pto["Base"]["y"]), int(pto["Base"]["x"])])
+            extent = np.array([int(pto["Extent"]["z"]), int(pto["Extent"]["y"]), int(pto["Extent"]["x"])])
+            box[:] = base, base + extent
+            self.properties["poses"].append(box.T.ravel())
             self.properties["flag_poses"].append(np.array([base[0] + extent[0]//2, base[1] + extent[1]//2, base[2] + extent[2]]))
             if "Assessment" in pto and "description" in pto["Assessment"]:
                 self.properties["labels"].append(str(pto["Assessment"]["description"]))
             else:
                 self.properties["labels"].append("Threat")
 
-        mask = np.zeros(max_dims, dtype=np.uint8)
-        for pto in PTOs:
-            assert "Base" in pto and "Extent" in pto, "Base or Extent not found in PTO"
-            if "Bitmap" in pto and len(pto["Bitmap"].shape) > 0:
-                base = [int(pto["Base"]["z"]), int(pto["Base"]["y"]), int(pto["Base"]["x"])]
-                extent = [int(pto["Extent"]["z"]), int(pto["Extent"]["y"]), int(pto["Extent"]["x"])]
-                temp_mask = mask[base[0]:base[0]+extent[0], base[1]:base[1]+extent[1], base[2]:base[2]+extent[2]]
-                temp_mask = np.logical_or(temp_mask, pto["Bitmap"].astype(np.uint8))
-                mask[base[0]:base[0] + extent[0], base[1]:base[1] + extent[1], base[2]:base[2] + extent[2]] = temp_mask
-        
-        if mask.sum() == 0:
+        max_dims = boxes[:, 1].max(axis=0) if len(PTOs) else [0, 0, 0]
+        mask = np.zeros(max_dims, dtype=np.uint8 if len(PTOs) <= np.iinfo(np.uint8).max else np.uint16)
+        # scratch buffers sized for the largest PTO, reused for every PTO
+        max_voxels = np.prod(boxes[:, 1] - boxes[:, 0], axis=1).max() if len(PTOs) else 0
+        flags, values = np.empty(max_voxels, dtype=np.bool_), np.empty(max_voxels, dtype=mask.dtype)
+        for label_id, (box, pto) in enumerate(zip(boxes, PTOs), start=1):
+            bitmap = pto.get("Bitmap")
+            if bitmap is None or bitmap.ndim == 0:
+                continue
+            region = mask[box[0, 0]:box[1, 0], box[0, 1]:box[1, 1], box[0, 2]:box[1, 2]]
+            pto_flags = np.not_equal(bitmap, 0, out=flags[:bitmap.size].reshape(bitmap.shape))
+            pto_values = np.multiply(pto_flags, label_id, out=values[:bitmap.size].reshape(bitmap.shape), dtype=mask.dtype)
+            np.maximum(region, pto_values, out=region)
+
+        if not mask.any():
             print("Warning: No mask found in PTOs")
             mask = np.zeros((1, 1, 1), dtype=np.uint8)
 
         return mask
         
     def reset_properties(self):
-        """ Reset the properties to default values. """
-        self.__init__()
\ No newline at end of file
+        """ Reset the properties to default values. The cache is kept. """
+        self.properties = self.default_properties()
\ No newline at end of file
@@ -0,0 +1,106 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# an indexed directory: its volume files and its subdirectories
+DirectoryEntry = Tuple[List[str], List[str]]
+
+
+class FolderScanner:
+    """
+    An index of the volume files of a folder tree, walked once with os.scandir for all the extensions.
+
+    The subdirectories are listed in parallel, which hides the latency of network and cold disks.
+    """
+
+    def __init__(self, exts: Iterable[str], workers: int = 8):
+        """
+        Creates an empty index.
+
+        Args:
+        - exts: The extensions of the volume files, compound ones such as nii.gz included.
+        - workers: The number of threads listing the directories.
+
+        """
+        self.suffixes = tuple("." + ext for ext in exts)
+        self.workers = workers
+        self.root: Optional[str] = None
+        self.directories: Dict[str, DirectoryEntry] = {}
+
+    def _list(self, path: str) -> Optional[DirectoryEntry]:
+        """ List the volume files and the subdirectories of a directory, None if it cannot be read. """
+        files, subdirs = [], []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        # the symbolic links to directories are not followed, so that no cycle is walked
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif entry.name.endswith(self.suffixes) and entry.is_file():
+                            files.append(entry.path)
+                    except OSError:
+                        continue
+        except OSError:
+            return None
+        return files, subdirs
+
+    def _walk(self, roots: Iterable[str], first_only: bool = False) -> Dict[str, DirectoryEntry]:
+        """
+        List the directories of the trees under some roots, on the thread pool.
+
+        Args:
+        - roots: The root directories.
+        - first_only: Whether to stop at the first directory holding a volume file.
+
+        Returns:
+        - directories: The entries of the listed directories.
+
+        """
+        directories = {}
+        with ThreadPoolExecutor(self.workers) as executor:
+            pending = {executor.submit(self._list, root): root for root in roots}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path = pending.pop(future)
+                    entry = future.result()
+                    if entry is None:
+                        continue
+                    directories[path] = entry
+                    if first_only and entry[0]:
+                        for other in pending:
+                            other.cancel()
+                        return directories
+                    for subdir in entry[1]:
+                        pending[executor.submit(self._list, subdir)] = subdir
+        return directories
+
+    def has_volumes(self, folder: str) -> bool:
+        """ Check whether a folder tree holds a volume file, stopping at the first one found. """
+        return any(entry[0] for entry in self._walk([folder], first_only=True).values())
+
+    def scan(self, folder: str) -> List[str]:
+        """
+        Index the volume files of a folder tree, replacing the previous index.
+
+        Args:
+        - folder: The root folder.
+
+        Returns:
+        - volumes: The paths of the volume files, in path order.
+
+        """
+        self.root = os.path.abspath(folder)
+        self.directories = self._walk([self.root])
+        return self.volumes
+
+    @property
+    def volumes(self) -> List[str]:
+        """ The indexed volume files, in path order. """
+        return sorted(path for entry in self.directories.values() for path in entry[0])
+
+
+def find_volumes(folder: str, exts: Iterable[str], workers: int = 8) -> List[str]:
+    """ List the volume files of a folder and its subfolders, in path order. """
+    return FolderScanner(exts, workers).scan(folder)
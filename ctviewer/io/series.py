@@ -0,0 +1,308 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .dicom import locate_pixel_data
+from .probe import BITS_ALLOCATED, COLUMNS, NUMBER_OF_FRAMES, PIXEL_REPRESENTATION, PIXEL_SPACING, ROWS, SAMPLES_PER_PIXEL
+
+SERIES_INSTANCE_UID = (0x0020, 0x000E)
+INSTANCE_NUMBER = (0x0020, 0x0013)
+IMAGE_POSITION_PATIENT = (0x0020, 0x0032)
+IMAGE_ORIENTATION_PATIENT = (0x0020, 0x0037)
+RESCALE_INTERCEPT = (0x0028, 0x1052)
+RESCALE_SLOPE = (0x0028, 0x1053)
+
+SLICE_TAGS = (SERIES_INSTANCE_UID, INSTANCE_NUMBER, IMAGE_POSITION_PATIENT, IMAGE_ORIENTATION_PATIENT, RESCALE_INTERCEPT,
+              RESCALE_SLOPE, ROWS, COLUMNS, PIXEL_SPACING, BITS_ALLOCATED, PIXEL_REPRESENTATION, SAMPLES_PER_PIXEL,
+              NUMBER_OF_FRAMES)
+
+
+def _numbers(value, default: Tuple[float, ...]) -> Tuple[float, ...]:
+    """ Parse a multi-valued decimal string, e.g. '0\\0\\-120.5'. """
+    return tuple(float(n) for n in value.split("\\")) if value else default
+
+
+def read_slice_header(path: str) -> Dict:
+    """
+    Reads the tags of a DICOM slice needed to assemble its series, and the position of its pixels.
+
+    Args:
+    - path: The path to the DICOM file.
+
+    Returns:
+    - header: A dictionary with the path, the series UID, the instance number, the position and the
+      orientation of the slice, its rows, columns and frames, the pixel spacing, the dtype of the
+      stored pixels, the rescale slope and intercept and the offset of the pixel data.
+
+    Raises:
+    - ValueError: If the file is not an uncompressed single channel DICOM image.
+
+    """
+    tags, offset, length, endian = locate_pixel_data(path, SLICE_TAGS)
+    if ROWS not in tags or COLUMNS not in tags:
+        raise ValueError(f"No image found in {path}")
+    if int(tags.get(SAMPLES_PER_PIXEL, 1)) != 1:
+        raise ValueError(f"{path} is not a grayscale image")
+    signed = tags.get(PIXEL_REPRESENTATION, 0) == 1
+    dtype = np.dtype(f"{endian}{'i' if signed else 'u'}{max(int(tags.get(BITS_ALLOCATED, 16)) // 8, 1)}")
+    rows, columns, frames = int(tags[ROWS]), int(tags[COLUMNS]), int(tags.get(NUMBER_OF_FRAMES) or 1)
+    if length < rows * columns * frames * dtype.itemsize:
+        raise ValueError(f"Truncated pixel data in {path}")
+    row_spacing, column_spacing = _numbers(tags.get(PIXEL_SPACING), (1.0, 1.0))[:2]
+    return {
+        "path": path, "uid": tags.get(SERIES_INSTANCE_UID, ""), "instance": int(tags.get(INSTANCE_NUMBER) or 0),
+        "position": _numbers(tags.get(IMAGE_POSITION_PATIENT), None),
+        "orientation": _numbers(tags.get(IMAGE_ORIENTATION_PATIENT), (1.0, 0.0, 0.0, 0.0, 1.0, 0.0)),
+        "rows": rows, "columns": columns, "frames": frames, "spacing": (column_spacing, row_spacing),
+        "dtype": dtype, "slope": float(tags.get(RESCALE_SLOPE) or 1), "intercept": float(tags.get(RESCALE_INTERCEPT) or 0),
+        "offset": offset,
+    }
+
+
+def _try_read_slice_header(path: str):
+    """ Reads the header of a slice, None if it cannot be assembled. """
+    try:
+        return read_slice_header(path)
+    except (ValueError, OSError):
+        return None
+
+
+# the headers of the .dcm files of the last folders listed by folder_slice_headers, by folder and by path,
+# with the (mtime_ns, size) of the file they were read from
+_folder_headers = OrderedDict()
+_folder_headers_lock = threading.Lock()
+MAX_MEMOIZED_FOLDERS = 16
+
+
+def folder_slice_headers(folder: str, workers: int = 8) -> Dict[str, Optional[Dict]]:
+    """
+    Reads the headers of the .dcm files of a folder, on a thread pool.
+
+    The headers are memoized with the modification time and the size of their file, so that listing the
+    folder again only reads the headers of the new and modified files.
+
+    Args:
+    - folder: The path to the folder.
+    - workers: The number of threads reading the headers.
+
+    Returns:
+    - headers: A dictionary mapping the paths of the .dcm files to their header, see read_slice_header,
+      None for the files that cannot be assembled.
+
+    """
+    folder = os.path.abspath(folder)
+    stamps = {}
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.name.endswith(".dcm"):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                stamps[entry.path] = (stat.st_mtime_ns, stat.st_size)
+    with _folder_headers_lock:
+        known = _folder_headers.get(folder, {})
+    stale = [path for path, stamp in stamps.items() if path not in known or known[path][0] != stamp]
+    with ThreadPoolExecutor(workers) as executor:
+        read = dict(zip(stale, executor.map(_try_read_slice_header, stale)))
+    memo = {path: (stamp, read[path] if path in read else known[path][1]) for path, stamp in stamps.items()}
+    with _folder_headers_lock:
+        _folder_headers[folder] = memo
+        _folder_headers.move_to_end(folder)
+        while len(_folder_headers) > MAX_MEMOIZED_FOLDERS:
+            _folder_headers.popitem(last=False)
+    return {path: header for path, (_, header) in memo.items()}
+
+
+def group_series(paths: Iterable[str], workers: int = 8) -> Dict[str, List[Dict]]:
+    """
+    Groups DICOM slices by SeriesInstanceUID, reading their headers on a thread pool.
+
+    Args:
+    - paths: The paths to the DICOM files. The files that cannot be assembled are left out.
+    - workers: The number of threads reading the headers.
+
+    Returns:
+    - series: A dictionary mapping the series UIDs to the headers of their slices, see sort_slices.
+
+    """
+    series = {}
+    with ThreadPoolExecutor(workers) as executor:
+        for header in executor.map(_try_read_slice_header, paths):
+            if header is not None:
+                series.setdefault(header["uid"], []).append(header)
+    return {uid: sort_slices(headers) for uid, headers in series.items()}
+
+
+def sort_slices(headers: List[Dict]) -> List[Dict]:
+    """
+    Sorts the slices of a series along the normal of their plane, by ImagePositionPatient.
+
+    The slices without a position are sorted by instance number.
+
+    Args:
+    - headers: The headers of the slices, see read_slice_header.
+
+    Returns:
+    - headers: The sorted headers.
+
+    """
+    if any(header["position"] is None for header in headers):
+        return sorted(headers, key=lambda header: (header["instance"], header["path"]))
+    orientation = np.array(headers[0]["orientation"][:6]).reshape(2, 3)
+    normal = np.cross(orientation[0], orientation[1])
+    return sorted(headers, key=lambda header: (float(np.dot(normal, header["position"])), header["path"]))
+
+
+def find_series(path: str, workers: int = 8) -> List[Dict]:
+    """
+    Finds the slices of the series of a DICOM file among the .dcm files of its folder, see folder_slice_headers.
+
+    Args:
+    - path: The path to a DICOM slice.
+    - workers: The number of threads reading the headers.
+
+    Returns:
+    - headers: The sorted headers of the slices of the series, the file itself included.
+
+    Raises:
+    - ValueError: If the file cannot be assembled into a series.
+
+    """
+    header = read_slice_header(path)
+    series = []
+    if header["uid"]:
+        headers = folder_slice_headers(os.path.dirname(os.path.abspath(path)), workers)
+        series = [other for other_path, other in headers.items()
+                  if other is not None and other["uid"] == header["uid"] and other_path != os.path.abspath(path)]
+    shape = (header["rows"], header["columns"], header["frames"], header["dtype"])
+    # the slices of another size or type cannot be stacked with the file
+    return sort_slices([header] + [other for other in series
+                                   if (other["rows"], other["columns"], other["frames"], other["dtype"]) == shape])
+
+
+def rescaled_dtype(dtype: np.dtype, slopes: np.ndarray, intercepts: np.ndarray, stored_range=None) -> np.dtype:
+    """
+    Gets the type of the rescaled voxels, see rescale.
+
+    Args:
+    - dtype: The type of the stored pixels.
+    - slopes: The rescale slope of each slice along z.
+    - intercepts: The rescale intercept of each slice along z.
+    - stored_range: A function returning the (min, max) of the stored pixels, the range of their type if None.
+
+    Returns:
+    - dtype: The type of the rescaled voxels, the widest one they may need if stored_range is None.
+
+    """
+    if np.all(slopes == 1) and np.all(intercepts == 0):
+        return np.dtype(dtype)
+    if not (np.all(slopes == np.round(slopes)) and np.all(intercepts == np.round(intercepts))):
+        return np.dtype(np.float32)
+    low, high = stored_range() if stored_range is not None else (float(np.iinfo(dtype).min), float(np.iinfo(dtype).max))
+    ends = np.concatenate([low * slopes + intercepts, high * slopes + intercepts])
+    return np.dtype(np.int16 if np.iinfo(np.int16).min <= ends.min() and ends.max() <= np.iinfo(np.int16).max else np.int32)
+
+
+def slice_spacing(headers: List[Dict]) -> float:
+    """ Gets the spacing between the slices of a series, the median distance between their positions, 1 if unknown. """
+    positions = [header["position"] for header in headers]
+    if len(headers) > 1 and all(position is not None for position in positions):
+        return float(np.median(np.linalg.norm(np.diff(np.array(positions), axis=0), axis=1))) or 1.0
+    return 1.0
+
+
+def rescale(raw: np.ndarray, slopes: np.ndarray, intercepts: np.ndarray) -> np.ndarray:
+    """
+    Applies the rescale slope and intercept of each slice to the stored pixels, in one vectorized pass.
+
+    The integer slopes and intercepts give int16 voxels, or int32 ones if the range does not fit,
+    e.g. the Hounsfield units of a CT scan; the others give float32 voxels.
+
+    Args:
+    - raw: The stored pixels indexed as [x, y, z], in Fortran order.
+    - slopes: The rescale slope of each slice along z.
+    - intercepts: The rescale intercept of each slice along z.
+
+    Returns:
+    - voxels: The rescaled voxels, raw itself if every slope is 1 and every intercept 0.
+
+    """
+    if np.all(slopes == 1) and np.all(intercepts == 0):
+        return raw
+    dtype = rescaled_dtype(raw.dtype, slopes, intercepts, lambda: (float(raw.min()), float(raw.max())))
+    voxels = np.empty(raw.shape, dtype=dtype, order="F")
+    if np.all(slopes == 1):
+        voxels[...] = raw
+    else:
+        np.multiply(raw, slopes.astype(np.float32 if dtype == np.float32 else dtype), out=voxels, casting="unsafe")
+    np.add(voxels, intercepts.astype(dtype), out=voxels, casting="unsafe")
+    return voxels
+
+
+def _read_pixels(header: Dict, target: np.ndarray):
+    """ Reads the stored pixels of a slice straight into its part of the preallocated volume. """
+    with open(header["path"], "rb") as file:
+        file.seek(header["offset"])
+        if file.readinto(memoryview(target).cast("B")) != target.nbytes:
+            raise ValueError(f"Truncated pixel data in {header['path']}")
+
+
+def load_series(headers: List[Dict], workers: int = 8) -> Tuple[np.ndarray, Tuple[float, float, float], Tuple[float, float, float]]:
+    """
+    Decodes the slices of a series on a thread pool, straight into a preallocated volume.
+
+    Args:
+    - headers: The sorted headers of the slices, see find_series.
+    - workers: The number of threads reading the slices.
+
+    Returns:
+    - voxels: The rescaled voxels indexed as [x, y, z], in Fortran order.
+    - spacing: The (x, y, z) spacing, the z spacing being the median distance between the slices.
+    - origin: The position of the first slice.
+
+    """
+    first = headers[0]
+    columns, rows, frames = first["columns"], first["rows"], first["frames"]
+    raw = np.empty((columns, rows, len(headers) * frames), dtype=first["dtype"], order="F")
+    # the slices are contiguous in Fortran order, with the columns running fastest as in the pixel data
+    flat = raw.reshape(-1, order="F")
+    size = columns * rows * frames
+    with ThreadPoolExecutor(workers) as executor:
+        list(executor.map(lambda k: _read_pixels(headers[k], flat[k * size:(k + 1) * size]), range(len(headers))))
+    if not raw.dtype.isnative:
+        raw = raw.byteswap().view(raw.dtype.newbyteorder("="))
+    slopes = np.repeat([header["slope"] for header in headers], frames)
+    intercepts = np.repeat([header["intercept"] for header in headers], frames)
+    voxels = rescale(raw, slopes, intercepts)
+    origin = tuple(first["position"]) if first["position"] is not None else (0.0, 0.0, 0.0)
+    return voxels, (*first["spacing"], slice_spacing(headers)), origin
+
+
+def first_slices(paths: List[str], workers: int = 8) -> List[str]:
+    """
+    Keeps a single file of each DICOM series among a list of volume files, e.g. to render every series once.
+
+    Args:
+    - paths: The paths to the volume files.
+    - workers: The number of threads reading the headers.
+
+    Returns:
+    - paths: The paths, the .dcm slices of a series being replaced by the first one, in the order of the list.
+
+    """
+    dicom = [path for path in paths if path.endswith(".dcm")]
+    keep = {path for path in paths if not path.endswith(".dcm")}
+    headers = {}
+    with ThreadPoolExecutor(workers) as executor:
+        for path, header in zip(dicom, executor.map(_try_read_slice_header, dicom)):
+            if header is None or not header["uid"]:
+                keep.add(path)
+            else:
+                headers.setdefault((os.path.dirname(path), header["uid"]), []).append(header)
+    keep.update(sort_slices(series)[0]["path"] for series in headers.values())
+    return [path for path in paths if path in keep]
@@ -0,0 +1,212 @@
+import os
+import sqlite3
+import threading
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .probe import MET_TYPES, probe, read_mhd_header
+from .series import read_slice_header
+
+
+def strided_voxels(path: str, size: int) -> Optional[np.ndarray]:
+    """
+    Reads every n-th voxel of a volume along each axis, mapping the file instead of decoding it.
+
+    Only the .npy files, the uncompressed MetaImage files and the uncompressed DICOM slices are mapped,
+    the pages holding none of the read voxels are never loaded from the disk.
+
+    Args:
+    - path: The path to the volume file.
+    - size: The number of voxels to keep along the longest axis.
+
+    Returns:
+    - voxels: The subsampled voxels indexed as [x, y, z], None if the file cannot be mapped.
+
+    """
+    ext = path.split(".")[-1]
+    if ext == "npy":
+        data = np.load(path, mmap_mode="r")
+    elif ext == "mhd":
+        header = read_mhd_header(path)
+        data_file = header.get("ElementDataFile", "")
+        # a single data file, neither missing nor a list or a pattern of slice files
+        data_fields = data_file.split()
+        if (header.get("CompressedData", "False").lower() == "true" or header.get("ElementType") not in MET_TYPES
+                or int(header.get("ElementNumberOfChannels", 1)) != 1 or len(data_fields) != 1
+                or data_fields[0] == "LIST"):
+            return None
+        info = probe(path)
+        dtype = np.dtype(MET_TYPES[header["ElementType"]])
+        if header.get("BinaryDataByteOrderMSB", header.get("ElementByteOrderMSB", "False")).lower() == "true":
+            dtype = dtype.newbyteorder(">")
+        if data_file == "LOCAL":
+            raw, offset = path, header["HeaderEnd"]
+        else:
+            raw = os.path.join(os.path.dirname(path), data_file)
+            nbytes = int(np.prod(info["dims"], dtype=np.int64)) * dtype.itemsize
+            # a negative header size means that the voxels end the file
+            header_size = int(header.get("HeaderSize", 0))
+            offset = os.path.getsize(raw) - nbytes if header_size < 0 else header_size
+        data = np.memmap(raw, dtype=dtype, mode="r", offset=offset, shape=info["dims"], order="F")
+    elif ext == "dcm":
+        # a single slice rather than its whole series
+        try:
+            header = read_slice_header(path)
+        except ValueError:
+            return None
+        data = np.memmap(path, dtype=header["dtype"], mode="r", offset=header["offset"],
+                         shape=(header["columns"], header["rows"], header["frames"]), order="F")
+    else:
+        return None
+    if data.ndim != 3:
+        return None
+    stride = max(1, -(-max(data.shape) // size))
+    return np.array(data[::stride, ::stride, ::stride])
+
+
+def mip_thumbnail(voxels: np.ndarray, size: int) -> np.ndarray:
+    """
+    Computes a maximum intensity projection thumbnail of a volume, seen from above.
+
+    Args:
+    - voxels: The voxels indexed as [x, y, z], or an image indexed as [x, y].
+    - size: The number of pixels of the longest side of the thumbnail.
+
+    Returns:
+    - thumbnail: The uint8 grayscale thumbnail, indexed as [row, column] with the first row at the top.
+
+    """
+    stride = max(1, -(-max(voxels.shape) // size))
+    voxels = voxels[::stride, ::stride, ::stride] if voxels.ndim == 3 else voxels[::stride, ::stride]
+    # the bags lie on the belt along z, the projection is along the vertical y axis
+    mip = (voxels.max(axis=1) if voxels.ndim == 3 else voxels).astype(np.float32)
+    if mip.size == 0:
+        return np.zeros((1, 1), dtype=np.uint8)
+    # the brightest voxels are clipped, so that a few metal voxels do not darken everything else
+    low, high = float(mip.min()), float(np.percentile(mip, 99.5))
+    scaled = np.clip((mip - low) * (255 / (high - low)), 0, 255) if high > low else np.zeros_like(mip)
+    return np.ascontiguousarray(scaled.astype(np.uint8).T[::-1])
+
+
+def make_thumbnail(path: str, size: int = 64, reader=None) -> np.ndarray:
+    """
+    Computes the thumbnail of a volume file, from a strided read where possible.
+
+    Args:
+    - path: The path to the volume file.
+    - size: The number of pixels of the longest side of the thumbnail.
+    - reader: The Reader decoding the files that cannot be mapped, a Reader without cache if None.
+
+    Returns:
+    - thumbnail: The uint8 grayscale thumbnail, see mip_thumbnail.
+
+    """
+    voxels = strided_voxels(path, size)
+    if voxels is None:
+        if reader is None:
+            from .reader import Reader
+            reader = Reader(cache_size_mb=0, prefetch_size_mb=0)
+        volume = reader.read(path)
+        voxels = volume.tonumpy()
+    if voxels.ndim == 3 and voxels.shape[2] == 1:
+        voxels = voxels[:, :, 0]
+    return mip_thumbnail(voxels, size)
+
+
+class ThumbnailIndex:
+    """
+    A SQLite index of the thumbnails of volume files, keyed by path, modification time and size.
+
+    A thumbnail is stale, and not returned, once its file was modified. The index can be used from
+    several threads.
+    """
+
+    def __init__(self, path: str):
+        """
+        Opens or creates the index.
+
+        Args:
+        - path: The path to the SQLite file, ":memory:" for an index that is not kept.
+
+        """
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute("CREATE TABLE IF NOT EXISTS thumbnails (path TEXT PRIMARY KEY, mtime_ns INTEGER, "
+                                     "size INTEGER, width INTEGER, height INTEGER, pixels BLOB)")
+
+    @staticmethod
+    def _stamp(path: str) -> Tuple[int, int]:
+        """ Get the modification time and the size of a file, which identify its version. """
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def get(self, path: str) -> Optional[np.ndarray]:
+        """
+        Get the thumbnail of a file.
+
+        Args:
+        - path: The path to the volume file.
+
+        Returns:
+        - thumbnail: The uint8 thumbnail, None if it is missing or stale.
+
+        """
+        try:
+            mtime_ns, size = self._stamp(path)
+        except OSError:
+            return None
+        with self._lock:
+            row = self._connection.execute("SELECT mtime_ns, size, width, height, pixels FROM thumbnails WHERE path = ?",
+                                           (os.path.abspath(path),)).fetchone()
+        if row is None or (row[0], row[1]) != (mtime_ns, size):
+            return None
+        return np.frombuffer(row[4], dtype=np.uint8).reshape(row[3], row[2])
+
+    def put(self, path: str, thumbnail: np.ndarray):
+        """
+        Store the thumbnail of a file, replacing the previous one.
+
+        Args:
+        - path: The path to the volume file.
+        - thumbnail: The uint8 thumbnail indexed as [row, column].
+
+        """
+        mtime_ns, size = self._stamp(path)
+        height, width = thumbnail.shape
+        with self._lock, self._connection:
+            self._connection.execute("INSERT OR REPLACE INTO thumbnails VALUES (?, ?, ?, ?, ?, ?)",
+                                     (os.path.abspath(path), mtime_ns, size, width, height,
+                                      np.ascontiguousarray(thumbnail, dtype=np.uint8).tobytes()))
+
+    def get_or_make(self, path: str, size: int = 64, reader=None) -> np.ndarray:
+        """
+        Get the thumbnail of a file, computing and storing it if it is missing or stale.
+
+        Args:
+        - path: The path to the volume file.
+        - size: The number of pixels of the longest side of a computed thumbnail.
+        - reader: The Reader decoding the files that cannot be mapped, see make_thumbnail.
+
+        Returns:
+        - thumbnail: The uint8 thumbnail.
+
+        """
+        thumbnail = self.get(path)
+        if thumbnail is None:
+            thumbnail = make_thumbnail(path, size, reader)
+            self.put(path, thumbnail)
+        return thumbnail
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM thumbnails").fetchone()[0]
+
+    def close(self):
+        """ Close the SQLite connection. """
+        with self._lock:
+            self._connection.close()
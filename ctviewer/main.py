@@ -6,6 +6,7 @@ ROOT = str(Path(__file__).resolve().parents[1])
 sys.path.insert(0, ROOT)
 
 from PyQt6 import QtWidgets
+from vtkmodules.vtkCommonCore import vtkSMPTools
 
 from ctviewer import MainWindow
 
@@ -43,6 +44,8 @@ class CtViewer():
     
 
 if __name__ == "__main__":
+    # run the multithreaded VTK filters, e.g. the flying edges of the iso surfaces, on all the cores
+    vtkSMPTools.SetBackend("STDThread")
     app = QtWidgets.QApplication(sys.argv)
     window = CtViewer()
     app.aboutToQuit.connect(window.onClose)
@@ -59,4 +59,32 @@ class RendererCallbacks:
 
     def reset_camera(self):
         """Reset camera to default position and orientation."""
-        self.renderer.reset_camera()
\ No newline at end of file
+        self.renderer.reset_camera()
+
+    def add_callback(self, event_name, func):
+        """Add a function called on an interaction event of the renderer, without picking.
+
+        Args:
+            event_name: The name of the event, e.g. "StartInteraction".
+            func: The function to call with the event.
+
+        Returns:
+            The id of the callback, 0 if the renderer has no interactor.
+        """
+        return self.renderer.add_callback(event_name, func, enable_picking=False)
+
+    def render_time(self):
+        """Get the duration of the last render.
+
+        Returns:
+            The duration in seconds of the last render.
+        """
+        return self.renderer.renderer.GetLastRenderTimeInSeconds()
+
+    def histogram(self):
+        """Get the histogram of the displayed volume, computed once per volume load.
+
+        Returns:
+            The Histogram holding the scalar range and the counts of the voxels.
+        """
+        return self.renderer.histogram
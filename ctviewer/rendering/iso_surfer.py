@@ -1,11 +1,62 @@
-from vedo import Volume
+import itertools
+import math
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional, Tuple
 
+from vedo import Mesh, Volume
+from vtkmodules.vtkCommonDataModel import vtkImageData, vtkPolyData
+from vtkmodules.vtkFiltersCore import vtkFlyingEdges3D, vtkQuadricClustering
+
+from ctviewer.io import VolumeCache
+from ctviewer.io.pyramid import VolumePyramid
 from .callbacks import RendererCallbacks
 
+
+def extract_isosurface(dataset:vtkImageData, value:float, decimation:int=2) -> vtkPolyData:
+    """
+    Extract the isosurface of an image with flying edges, then decimate it by quadric clustering.
+
+    Parameters
+    ----------
+    dataset : vtkImageData
+        The image to contour.
+    value : float
+        The isovalue.
+    decimation : int
+        The edge length in voxels of the clustering cells, 1 or less to keep the full resolution surface.
+
+    Returns
+    -------
+    vtkPolyData
+        The triangles of the isosurface.
+    """
+    flying_edges = vtkFlyingEdges3D()
+    flying_edges.SetInputData(dataset)
+    flying_edges.SetValue(0, value)
+    flying_edges.ComputeNormalsOn()
+    flying_edges.ComputeScalarsOff()
+    flying_edges.Update()
+    surface = flying_edges.GetOutput()
+    if decimation <= 1 or not surface.GetNumberOfCells():
+        return surface
+    clustering = vtkQuadricClustering()
+    clustering.SetInputData(surface)
+    clustering.AutoAdjustNumberOfDivisionsOff()
+    clustering.SetNumberOfDivisions(*(max(math.ceil(n / decimation), 2) for n in dataset.GetDimensions()))
+    clustering.Update()
+    return clustering.GetOutput()
+
+
 class IsoSurfer():
     """
     A class representing an isosurface renderer.
 
+    The isosurface is either ray cast by the volume mapper (mode 5), or, in mesh mode, extracted
+    as a decimated mesh. The meshes are kept in a small LRU cache keyed by the volume and the
+    isovalue quantized to `ISO_LEVELS` steps of the scalar range, so that scrubbing back to a
+    previous value and exporting the current surface reuse them.
+
     Attributes:
         volume (Volume): The volume data to render.
         isovalue (float): The isovalue for the isosurface.
@@ -13,10 +64,21 @@ class IsoSurfer():
         delayed (bool): Whether to delay the rendering.
         callbacks (RendererCallbacks): The callbacks for the renderer.
         on (bool): Whether the renderer is active.
+        mesh_mode (bool): Whether the isosurface is extracted as a mesh.
+        decimation (int): The clustering cell size in voxels of the extracted meshes.
+        mesh_cache (VolumeCache): The extracted meshes, keyed by (dataset token, quantized isovalue).
+        mesh (Mesh): The displayed isosurface mesh, in mesh mode.
+        mesh_factor (int): The downsampling factor of the volume of the displayed mesh.
+        refinement (Future): The pending or last full resolution extraction.
+        on_refined (callable): Called from the worker thread when a full resolution mesh is ready to be swapped in.
 
     Methods:
         build(): Builds the isosurface renderer.
         update_isovalue(value): Updates the isovalue of the renderer.
+        get_mesh(value): Returns the cached or extracted isosurface mesh of an isovalue.
+        show_mesh(value, preview): Displays the isosurface mesh of an isovalue.
+        refine_mesh(value): Extracts the full resolution mesh of an isovalue on the worker thread.
+        swap_refined(): Displays the full resolution mesh once extracted.
         get_modules(): Returns the modules of the renderer.
         get_addons(): Returns the addons of the renderer.
         get_sliders(): Returns the sliders of the renderer.
@@ -26,34 +88,59 @@ class IsoSurfer():
         is_active(): Checks if the renderer is active.
     """
 
-    def __init__(self, volume:Volume, isovalue=None, sliderpos=0, delayed=True, callbacks:RendererCallbacks=None):
+    # the number of steps of the scalar range to which the isovalues of the meshes are rounded
+    ISO_LEVELS = 256
+    # the downsampling factor of the volume of the meshes displayed while the slider is dragged
+    PREVIEW_FACTOR = 4
+
+    def __init__(self, volume:Volume, isovalue=None, sliderpos=0, delayed=True, callbacks:RendererCallbacks=None,
+                 mesh_mode:bool=False, decimation:int=2, cache_size_mb:int=256):
         self.volume = volume
         self.isovalue = isovalue
         self.sliderpos = sliderpos
         self.delayed = delayed
         self.callbacks = callbacks
         self.on = False
+        self.mesh_mode = mesh_mode
+        self.decimation = decimation
+        self.mesh_cache = VolumeCache(cache_size_mb * 1024 ** 2)
+        # the token of each live dataset by id, with a weak reference telling whether the id still names it
+        self.dataset_tokens = {}
+        self._tokens = itertools.count()
+        self.mesh, self.mesh_factor = None, 1
+        self.preview = None
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="isosurface")
+        self.generation = 0
+        self.refinement: Optional[Future] = None
+        self.on_refined: Optional[Callable[[], None]] = None
 
     def build(self):
         """Build the isosurface renderer for the current volume.
 
         The isosurface renderer is built using a slider to control the isovalue.
-        Important : The mode should be set to 5 for isosurface rendering.
+        Important : The mode should be set to 5 for isosurface rendering, unless in mesh mode.
 
         """
         isovals = self.volume.properties.GetIsoSurfaceValues()
+        scrange = self.callbacks.histogram().range
+        delta = scrange[1] - scrange[0]
         if self.isovalue is None:
             self.isovalue = delta / 3.0 + scrange[0]
         isovals.SetValue(0, self.isovalue)
-        scrange = self.volume.scalar_range()
-        delta = scrange[1] - scrange[0]
-        delta = scrange[1] - scrange[0]
         if not delta:
             return
 
         def slider_isovalue(widget, event):
             value = widget.GetRepresentation().GetValue()
             isovals.SetValue(0, value)
+            if self.mesh_mode:
+                # a coarse mesh while dragging, the pending full resolution extraction is superseded
+                self.isovalue = value
+                self.cancel_refinement()
+                self.show_mesh(value, preview=True)
+
+        def slider_release(widget, event):
+            self.refine_mesh(widget.GetRepresentation().GetValue())
 
         self.s0 = self.callbacks.add_slider(
             slider_isovalue,
@@ -63,8 +150,10 @@ class IsoSurfer():
             pos=self.sliderpos,
             title="scalar value",
             show_value=True,
-            delayed=self.delayed,
+            delayed=self.delayed and not self.mesh_mode,
         )
+        if self.mesh_mode:
+            self.s0.AddObserver("EndInteractionEvent", slider_release)
         self.s0.name = "s0"
 
     def update_isovalue(self, value):
@@ -77,6 +166,166 @@ class IsoSurfer():
         if hasattr(self, "s0"):
             self.s0.GetRepresentation().SetValue(value)
         self.volume.properties.GetIsoSurfaceValues().SetValue(0, value)
+        if self.mesh_mode and self.on:
+            self.show_mesh(value, preview=True)
+            self.refine_mesh(value)
+
+    def quantize(self, value:float) -> Tuple[int, float]:
+        """Round an isovalue to a step of the scalar range of the volume.
+
+        Args:
+            value (float): The isovalue.
+
+        Returns:
+            tuple: The index of the nearest of the ISO_LEVELS steps and the isovalue of this step.
+        """
+        vmin, vmax = self.callbacks.histogram().range
+        step = (vmax - vmin) / self.ISO_LEVELS or 1.0
+        level = int(round((value - vmin) / step))
+        return level, vmin + level * step
+
+    def dataset_token(self, dataset:vtkImageData) -> int:
+        """Get a token naming an image as long as it is alive. Unlike its id, a later image never gets it.
+
+        Args:
+            dataset (vtkImageData): The image.
+
+        Returns:
+            int: The token of the image.
+        """
+        entry = self.dataset_tokens.get(id(dataset))
+        if entry is None or entry[0]() is not dataset:
+            # the id of a freed image may be reused by this one
+            self.dataset_tokens = {key: value for key, value in self.dataset_tokens.items() if value[0]() is not None}
+            entry = (weakref.ref(dataset), next(self._tokens))
+            self.dataset_tokens[id(dataset)] = entry
+        return entry[1]
+
+    def mesh_key(self, level:int, factor:int=1) -> tuple:
+        """Get the cache key of a mesh of the current volume.
+
+        Args:
+            level (int): The quantized isovalue.
+            factor (int): The downsampling factor of the volume the mesh is extracted from.
+
+        Returns:
+            tuple: The (dataset token, dataset modification time, level, factor) key.
+        """
+        dataset = self.volume.dataset
+        return self.dataset_token(dataset), dataset.GetMTime(), level, factor
+
+    def preview_dataset(self) -> vtkImageData:
+        """Get the current volume downsampled by PREVIEW_FACTOR, built once per volume.
+
+        Returns:
+            vtkImageData: The downsampled image, with the world bounds of the volume.
+        """
+        dataset = self.volume.dataset
+        key = (self.dataset_token(dataset), dataset.GetMTime())
+        if self.preview is None or self.preview[0] != key:
+            pyramid = VolumePyramid(self.volume, factors=(self.PREVIEW_FACTOR,))
+            self.preview = (key, pyramid.levels[0][1].dataset)
+        return self.preview[1]
+
+    def get_mesh(self, value:float=None, factor:int=1) -> vtkPolyData:
+        """Get the isosurface mesh of an isovalue, extracting it unless it is cached.
+
+        The surface is extracted at the quantized isovalue, so that the cached mesh of a key
+        does not depend on the first value that produced it.
+
+        Args:
+            value (float): The isovalue, the current one if None.
+            factor (int): 1 for the full resolution mesh, PREVIEW_FACTOR for the coarse one.
+
+        Returns:
+            vtkPolyData: The decimated isosurface.
+        """
+        level, value = self.quantize(self.isovalue if value is None else value)
+        key = self.mesh_key(level, factor)
+        surface = self.mesh_cache.get(key)
+        if surface is None:
+            if factor == 1:
+                surface = extract_isosurface(self.volume.dataset, value, self.decimation)
+            else:
+                surface = extract_isosurface(self.preview_dataset(), value, 1)
+            self.mesh_cache.put(key, surface, surface.GetActualMemorySize() * 1024)
+        return surface
+
+    def show_mesh(self, value:float=None, preview:bool=False):
+        """Display the isosurface mesh of an isovalue, colored as the volume at this value.
+
+        Args:
+            value (float): The isovalue, the current one if None.
+            preview (bool): Display the coarse mesh, unless the full resolution one is cached.
+        """
+        value = self.isovalue if value is None else value
+        factor = 1
+        if preview and self.mesh_key(self.quantize(value)[0]) not in self.mesh_cache:
+            factor = self.PREVIEW_FACTOR
+        surface = self.get_mesh(value, factor)
+        if self.mesh is None:
+            self.mesh = Mesh(surface).phong()
+            self.mesh.name = "IsoMesh"
+        else:
+            self.mesh._update(surface)
+        self.mesh_factor = factor
+        self.mesh.color(self.volume.properties.GetRGBTransferFunction().GetColor(value))
+
+    def cancel_refinement(self):
+        """Supersede the pending full resolution extraction."""
+        self.generation += 1
+        if self.refinement is not None:
+            self.refinement.cancel()
+
+    def refine_mesh(self, value:float=None) -> Optional[Future]:
+        """Extract the full resolution mesh of an isovalue on the worker thread, superseding the pending one.
+
+        The displayed mesh is replaced at once if the full resolution mesh is cached, otherwise
+        on_refined is called once it is extracted and `swap_refined` displays it.
+
+        Args:
+            value (float): The isovalue, the current one if None.
+
+        Returns:
+            Future: The extraction, resolved to True if its mesh is ready to be swapped in, None if it was cached.
+        """
+        value = self.isovalue if value is None else value
+        self.cancel_refinement()
+        level, quantized = self.quantize(value)
+        key = self.mesh_key(level)
+        if key in self.mesh_cache:
+            self.show_mesh(value)
+            return None
+        # a shallow copy, so that the worker does not update the pipeline of the displayed image
+        dataset = vtkImageData()
+        dataset.ShallowCopy(self.volume.dataset)
+        self.refinement = self.executor.submit(self._refine, self.generation, key, dataset, quantized)
+        return self.refinement
+
+    def _refine(self, generation:int, key:tuple, dataset:vtkImageData, value:float) -> bool:
+        """Extract and cache a full resolution mesh on the worker thread, unless superseded."""
+        if generation != self.generation:
+            return False
+        surface = extract_isosurface(dataset, value, self.decimation)
+        self.mesh_cache.put(key, surface, surface.GetActualMemorySize() * 1024)
+        if generation != self.generation:
+            return False
+        if self.on_refined is not None:
+            self.on_refined()
+        return True
+
+    def swap_refined(self) -> bool:
+        """Display the full resolution mesh of the current isovalue in place of the coarse one, once extracted.
+
+        Returns:
+            bool: True if the displayed mesh was replaced.
+        """
+        if not self.on or self.mesh_factor == 1:
+            return False
+        if self.mesh_key(self.quantize(self.isovalue)[0]) not in self.mesh_cache:
+            return False
+        self.show_mesh()
+        return True
 
     def check_volume(self):
         """Check if the volume is valid."""
@@ -103,13 +352,20 @@ class IsoSurfer():
     def activate(self):
         """Activate the renderer."""
         if not self.check_volume(): return
-        self.volume.mode(5)
-        self.volume.alpha(1)
+        if self.mesh_mode:
+            self.volume.off()
+        else:
+            self.volume.mode(5)
+            self.volume.alpha(1)
         if hasattr(self, "s0") and not self.on:
             for s in self.get_sliders():
                 s.on()
         elif not hasattr(self, "s0"):
             self.build()
+        if self.mesh_mode:
+            self.show_mesh(preview=True)
+            self.callbacks.add(self.mesh)
+            self.refine_mesh()
         self.on = True
     
     def deactivate(self):
@@ -117,6 +373,10 @@ class IsoSurfer():
         if self.on:
             for s in self.get_sliders():
                 s.off()
+            if self.mesh_mode:
+                self.cancel_refinement()
+                self.callbacks.remove(self.mesh)
+                self.volume.on()
             self.on = False
 
     def is_active(self):
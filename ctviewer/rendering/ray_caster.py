@@ -1,6 +1,7 @@
 from typing import Tuple
 
-from vedo import Volume, pyplot
+from vedo import Volume, pyplot, colors, utils
+from vedo import vtkclasses as vtki
 
 from .callbacks import RendererCallbacks
 
@@ -8,7 +9,11 @@ class RayCaster():
     """
     Generate a rendering window with ray casting for the input Volume.
     """
-    def __init__(self, volume:Volume, ogb, alpha, callbacks:RendererCallbacks):
+    # bounds of the factor applied to the sample distances during the interaction
+    LOD_MAX_FACTOR = 8.0
+    MAX_IMAGE_SAMPLE_DISTANCE = 4.0
+
+    def __init__(self, volume:Volume, ogb, alpha, callbacks:RendererCallbacks, lod_frame_time:float=0.05):
         """
         Initialize the ray caster with the input volume and callbacks object.
 
@@ -23,6 +28,8 @@ class RayCaster():
             The alpha value for the volume.
         callbacks : RendererCallbacks
             The callbacks object to which the ray caster will be attached.
+        lod_frame_time : float
+            The target frame time in seconds while the camera moves, 0 to always render at full quality.
         """
         self.volume = volume
         self.ogb = ogb
@@ -31,6 +38,9 @@ class RayCaster():
         self.alphasliders_mode_0 = [0.1, 0.4, 1.0]
         self.alphasliders_mode_1 = [0.75, 0.75, 0.9]
         self.on = False
+        self.lod_frame_time = lod_frame_time
+        # the level of detail factor is kept between the interactions, so that it starts from the last fit
+        self.lod_factor, self.lod_active, self.full_quality = 1.0, False, None
     
     def build(self, volume_mode):
         """
@@ -71,19 +81,116 @@ class RayCaster():
             w.GetSliderRepresentation().GetSliderProperty().SetOpacity(0.8)
             w.GetSliderRepresentation().GetTubeProperty().SetOpacity(0.2)
         
-        # CornerHistogram -> vtki.new("XYPlotActor")
-        self.hist = pyplot.CornerHistogram(self.volume, logscale=1, 
-                                    c=(0.7, 0.7, 0.7), bg=(0.7, 0.7, 0.7), 
-                                    pos=(0.76, 0.065), nmax=3.1415e06)
+        # CornerHistogram -> vtki.new("XYPlotActor"), plotted from the histogram cached at the volume load
+        self.hist = self.corner_histogram(c=(0.7, 0.7, 0.7), bg=(0.7, 0.7, 0.7), pos=(0.76, 0.065))
         self.hist.GetPosition2Coordinate().SetValue(0.197, 0.20, 0)
         self.hist.GetXAxisActor2D().SetFontFactor(0.7)
         self.hist.GetProperty().SetOpacity(0.5)
         self.setOTF()
 
+        self.callbacks.add_callback("StartInteraction", self.start_interaction)
+        self.callbacks.add_callback("Interaction", self.interaction)
+        self.callbacks.add_callback("EndInteraction", self.end_interaction)
+
+    def corner_histogram(self, bins:int=20, c=(0.7, 0.7, 0.7), bg=(0.7, 0.7, 0.7), pos=(0.76, 0.065), s:float=0.175):
+        """
+        Build the log scale corner histogram of the volume, as `pyplot.CornerHistogram` does,
+        from the cached histogram rather than from a scan of the voxels.
+
+        Parameters
+        ----------
+
+        bins : int
+            The number of bins.
+        c : color
+            The color of the plot.
+        bg : color
+            The color of the axes and labels.
+        pos : tuple
+            The position of the bottom left corner, as fractions of the rendering window.
+        s : float
+            The size of the plot, as a fraction of the rendering window.
+        """
+        log_counts, edges = self.callbacks.histogram().log_counts(bins)
+        points = list(zip((edges[:-1] + edges[1:]) / 2, log_counts))
+        cplot = pyplot.CornerPlot(points, pos, s, "", c, bg, True, False)
+        cplot.SetNumberOfYLabels(2)
+        cplot.SetNumberOfXLabels(3)
+        tprop = vtki.vtkTextProperty()
+        tprop.SetColor(colors.get_color(bg))
+        tprop.SetFontFamily(vtki.VTK_FONT_FILE)
+        tprop.SetFontFile(utils.get_font_path("Calco"))
+        cplot.SetAxisTitleTextProperty(tprop)
+        cplot.GetXAxisActor2D().SetLabelTextProperty(tprop)
+        cplot.GetXAxisActor2D().SetTitleTextProperty(tprop)
+        cplot.GetXAxisActor2D().SetFontFactor(0.55)
+        cplot.GetYAxisActor2D().SetLabelFactor(0.0)
+        cplot.GetYAxisActor2D().LabelVisibilityOff()
+        return cplot
+
+    def start_interaction(self, event=None):
+        """ Lower the sample density while the camera moves. """
+        if not self.on or self.lod_frame_time <= 0 or self.lod_active:
+            return
+        mapper = self.volume.mapper
+        self.full_quality = (mapper.GetAutoAdjustSampleDistances(), mapper.GetSampleDistance(),
+                             mapper.GetImageSampleDistance() if hasattr(mapper, "GetImageSampleDistance") else None)
+        # a negative sample distance lets the mapper derive it from the spacing, half a voxel
+        self.lod_sample_distance = self.full_quality[1] if self.full_quality[1] > 0 else min(self.volume.spacing()) / 2
+        mapper.AutoAdjustSampleDistancesOff()
+        self.lod_active = True
+        self.apply_lod()
+
+    def interaction(self, event=None):
+        """ Adapt the level of detail to the duration of the last frame. """
+        if self.lod_active:
+            self.adapt_lod(self.callbacks.render_time())
+
+    def end_interaction(self, event=None):
+        """ Restore the full quality and render it once the camera stops. """
+        if not self.lod_active:
+            return
+        mapper = self.volume.mapper
+        auto_adjust, sample_distance, image_sample_distance = self.full_quality
+        mapper.SetAutoAdjustSampleDistances(auto_adjust)
+        mapper.SetSampleDistance(sample_distance)
+        if image_sample_distance is not None:
+            mapper.SetImageSampleDistance(image_sample_distance)
+        self.lod_active = False
+        self.callbacks.render()
+
+    def adapt_lod(self, frame_time:float):
+        """
+        Scale the level of detail factor so that the next frames take about the target frame time.
+
+        Parameters
+        ----------
+
+        frame_time : float
+            The duration in seconds of the last frame.
+        """
+        if frame_time <= 0:
+            return
+        ratio = frame_time / self.lod_frame_time
+        # the cost of a frame is about inversely proportional to the factor, with a dead band against oscillations
+        if 0.7 < ratio < 1.3:
+            return
+        self.lod_factor = min(max(self.lod_factor * ratio, 1.0), self.LOD_MAX_FACTOR)
+        if self.lod_active:
+            self.apply_lod()
+
+    def apply_lod(self):
+        """ Set the sample distances of the volume mapper from the level of detail factor. """
+        mapper = self.volume.mapper
+        mapper.SetSampleDistance(self.lod_sample_distance * self.lod_factor)
+        if self.full_quality[2] is not None:
+            # the image sample distance divides the number of rays by its square
+            mapper.SetImageSampleDistance(min(self.full_quality[2] * self.lod_factor ** 0.5, self.MAX_IMAGE_SAMPLE_DISTANCE))
+
     def setOTF(self):
         """Set the opacity transfer function."""
         self.opacityTransferFunction.RemoveAllPoints()
-        self.smin, self.smax = self.volume.dataset.GetScalarRange()
+        self.smin, self.smax = self.callbacks.histogram().range
         self.opacityTransferFunction.AddPoint(self.smin, 0.0)
         self.opacityTransferFunction.AddPoint(self.smin + (self.smax - self.smin) * 0.1, 0.0)
         self.opacityTransferFunction.AddPoint(self.ogb[0][0], self.alphaslider0)
@@ -170,6 +277,7 @@ class RayCaster():
 
     def deactivate(self):
         """ Deactivate the ray caster."""
+        self.end_interaction()
         if self.on:
             for s in self.get_sliders():
                 s.off()
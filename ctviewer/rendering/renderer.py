@@ -1,9 +1,17 @@
+import time
+from contextlib import contextmanager
+from functools import wraps
 from typing import Tuple, List, Dict
 
 import vedo
-from vedo import Volume, Image, Plotter, Box, Text3D, Flagpost, np, addons
+from vedo import Volume, Image, Plotter, Text3D, Flagpost, np, addons
+from vtkmodules.vtkCommonCore import vtkPoints, vtkStringArray
+from vtkmodules.vtkCommonDataModel import vtkPolyData, vtkCellArray
+from vtkmodules.util.numpy_support import numpy_to_vtk, numpy_to_vtkIdTypeArray
+from vtkmodules.vtkRenderingLabel import vtkPointSetToLabelHierarchy, vtkLabelPlacementMapper, vtkFreeTypeLabelRenderStrategy
 
 from ctviewer.io import Reader
+from ctviewer.utils import Histogram
 from .callbacks import RendererCallbacks
 from .ray_caster import RayCaster
 from .iso_surfer import IsoSurfer
@@ -11,13 +19,30 @@ from .image_viewer import ImageViewer
 from .slicer import Slicer
 
 
+def single_render(method):
+    """ Decorate a Renderer method so that all the renders it triggers are merged into one, see `Renderer.render_batch`. """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.render_batch():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
 class Renderer(Plotter):
     """
     Generate Volume rendering using ray casting.
     """
 
+    # the corner pairs of the 12 edges of a box, the corners being numbered by their (x, y, z) bits
+    BOX_EDGES = np.array([(0, 1), (2, 3), (4, 5), (6, 7), (0, 2), (1, 3), (4, 6), (5, 7), (0, 4), (1, 5), (2, 6), (3, 7)])
+    # the mask color of the labels matching no mask class, e.g. the TDR objects with an unknown description
+    THREAT_COLOR = "red"
+
     def __init__(self, ogb:List[int], alpha:List[Tuple[int]], isovalue:bool=None, 
-                 delayed:bool=False, sliderpos:int=4, mask_classes:List[Tuple[int, str, int, str]]=None, **kwargs):
+                 delayed:bool=False, sliderpos:int=4, mask_classes:List[Tuple[int, str, int, str]]=None,
+                 cache_size_mb:int=1024, prefetch_size_mb:int=1024, disk_cache_dir:str=None,
+                 disk_cache_size_mb:int=10240, pyramid_min_voxels:int=256**3, lod_frame_time:float=0.05,
+                 iso_mesh:bool=False, iso_decimation:int=2, iso_cache_size_mb:int=256, **kwargs):
         """ 
         Initialize the renderer with the given parameters.
         
@@ -35,6 +60,25 @@ class Renderer(Plotter):
             The position of the slider
         mask_classes : list
             The list of classes and their flags, alpha values, and colors names to use for the mask 
+        cache_size_mb : int
+            The memory budget in megabytes of the reader's decoded-volume cache
+        prefetch_size_mb : int
+            The memory budget in megabytes of the volumes prefetched by the reader
+        disk_cache_dir : str
+            The directory of the reader's persistent decoded-volume cache, None or empty to disable it
+        disk_cache_size_mb : int
+            The disk budget in megabytes of the persistent cache
+        pyramid_min_voxels : int
+            The number of voxels from which the volumes are displayed progressively from downsampled levels,
+            0 to always display the full resolution at once
+        lod_frame_time : float
+            The target frame time in seconds of the ray caster while the camera moves, 0 to disable the level of detail
+        iso_mesh : bool
+            Extract the iso surface as a mesh instead of ray casting it
+        iso_decimation : int
+            The clustering cell size in voxels of the iso surface meshes, 1 to keep the full resolution
+        iso_cache_size_mb : int
+            The memory budget in megabytes of the cached iso surface meshes
         """
 
         super().__init__(**kwargs)
@@ -44,24 +88,95 @@ class Renderer(Plotter):
 
         self.mask_alpha = [val[2] for val in mask_classes] if mask_classes is not None else 0.5
         self.mask_flags = {val[0]: val[3] for val in mask_classes} if mask_classes is not None else None
+        self.mask_colors = {val[0]: val[1] for val in mask_classes} if mask_classes is not None else {}
+        # the class of every label of the displayed mask, and the classes hidden by the user
+        self.mask_label_classes, self.hidden_classes = [0], set()
+
+        # the number of frames rendered, and the state of the render batches
+        self.render_count, self.batch_depth, self.pending_render, self.pending_show = 0, 0, False, None
+        # the datasets displayed when no volume or mask is loaded, shared by every clean_view and delete_mask
+        self.empty_volume = Volume(np.zeros((1, 1, 1))).dataset
+        self.empty_mask = Volume(np.zeros((1, 1, 1), dtype=np.uint8)).dataset
 
-        self.volume = Volume(np.zeros((1, 1, 1))).color(self.ogb).alpha(self.alpha).origin((0, 0, 0))
-        self.mask_ = Volume(np.zeros((1, 1, 1))).color("red").alpha([0]+[1]*(len(self.mask_classes)-1)).origin((0, 0, 0))
+        self.volume = Volume(self.empty_volume).color(self.ogb).alpha(self.alpha).origin((0, 0, 0))
+        # the mask is a label map: its voxels are looked up without interpolation between labels
+        self.mask_ = Volume(self.empty_mask).interpolation(0).origin((0, 0, 0))
+        self.mask_.properties.ShadeOff()
+        self.update_mask_lut()
         self.image = Image(np.zeros((1, 1)), channels=1).enhance().cmap("hot")
 
         self.add([self.volume, self.mask_])
 
         # init variables
         self.bboxes, self.fss, self.tdr_poses = [], [], []
+        # the (base, top, text) of the displayed flags, to rebuild them as 3D flagposts for the export
+        self.flags = []
+        self.pyramid_min_voxels = pyramid_min_voxels
+        # the finer levels of the displayed volume waiting for `refine_volume`, and the time-to-display of each level
+        self.pending_levels, self.level_timings, self.display_start = [], [], 0.0
+        # the scalar range and histogram of the displayed volume, shared by the rendering modes
+        self.histogram = Histogram(self.volume.tonumpy())
 
         # Create a reader object
-        self.reader = Reader()
+        self.reader = Reader(cache_size_mb=cache_size_mb, prefetch_size_mb=prefetch_size_mb,
+                             disk_cache_dir=disk_cache_dir, disk_cache_size_mb=disk_cache_size_mb)
         self.callbacks = RendererCallbacks(self)
-        self.ray_caster = RayCaster(self.volume, self.ogb, self.alpha, self.callbacks)
-        self.iso_surfer = IsoSurfer(self.volume, isovalue, sliderpos, delayed, self.callbacks)
+        self.ray_caster = RayCaster(self.volume, self.ogb, self.alpha, self.callbacks, lod_frame_time)
+        self.iso_surfer = IsoSurfer(self.volume, isovalue, sliderpos, delayed, self.callbacks,
+                                    iso_mesh, iso_decimation, iso_cache_size_mb)
         self.slicer = Slicer(self.volume, self.ogb, self.callbacks)
         self.image_viewer = ImageViewer(self.image, self.callbacks)
 
+    @contextmanager
+    def render_batch(self):
+        """
+        Merge the renders requested within the context into a single frame, drawn when the outermost batch exits.
+
+        The `show` calls of the batch are merged too, the last arguments winning, and the frame is then drawn
+        by `show`. Every user action is run in a batch by the `single_render` decorator, so that it costs one frame.
+        """
+        self.batch_depth += 1
+        try:
+            yield self
+        finally:
+            self.batch_depth -= 1
+            if self.batch_depth == 0:
+                pending_render, pending_show = self.pending_render, self.pending_show
+                self.pending_render, self.pending_show = False, None
+                if pending_show is not None:
+                    self.show(*pending_show[0], **pending_show[1])
+                elif pending_render:
+                    self.render()
+
+    def render(self, resetcam:bool=False):
+        """
+        Render the scene, or only request a render when within a `render_batch`.
+        
+        Parameters
+        ----------
+        resetcam : bool
+            Reset the camera before rendering
+        """
+        if self.batch_depth:
+            self.pending_render = True
+            if resetcam:
+                self.renderer.ResetCamera()
+            return self
+        self.render_count += 1
+        return super().render(resetcam)
+
+    def show(self, *args, **kwargs):
+        """
+        Show the scene like `Plotter.show`, deferred to the end of the `render_batch` if within one.
+        """
+        if self.batch_depth:
+            objects, options = self.pending_show or ((), {})
+            self.pending_show = (objects + args, {**options, **kwargs})
+            return self
+        self.render_count += 1
+        return super().show(*args, **kwargs)
+
+    @single_render
     def ray_cast_mode(self, volume_mode:int=1):
         """
         Initialize a ray cast with the given parameters.
@@ -85,6 +200,7 @@ class Renderer(Plotter):
                 self.refresh_axes()
             self.render()
 
+    @single_render
     def iso_surface_mode(self):
         """ 
         Initialize an iso surface with the given parameters.
@@ -95,6 +211,7 @@ class Renderer(Plotter):
         self.iso_surfer.activate()
         self.render()
 
+    @single_render
     def slider_mode(self, clamp:bool=True):
         """
         Initialize a 3d slider with the given parameters.
@@ -106,6 +223,7 @@ class Renderer(Plotter):
         self.slicer.activate(clamp)
         self.render()
     
+    @single_render
     def image_viewer_mode(self):
         """
         Initialize an image viewer with the given parameters.
@@ -116,10 +234,12 @@ class Renderer(Plotter):
         self.image_viewer.activate()
         self.render()
 
+    @single_render
     def quit_current_mode(self):
         """
         Quit the current mode.
         """
+        self.finish_refinement()
         if self.ray_caster.is_active():
             self.ray_caster.deactivate()
         elif self.iso_surfer.is_active():
@@ -130,27 +250,45 @@ class Renderer(Plotter):
             self.image_viewer.deactivate()
         self.render()
 
+    @single_render
     def clean_view(self):
         """
         Delete the loaded masks, volume, flags, bounding boxes and axes.
         """
         self.quit_current_mode()
         self.remove_flags()
-        self.mask_._update(Volume(np.zeros((1, 1, 1))).dataset)
-        self.volume._update(Volume(np.zeros((1, 1, 1))).dataset)
+        self.clear_volume(self.mask_, self.empty_mask)
+        self.clear_volume(self.volume, self.empty_volume)
         self.delete_current_axes()
         self.render()
     
+    @single_render
     def delete_mask(self):
         """
         Delete the loaded mask.
         """
         self.remove_flags()
-        self.mask_._update(Volume(np.zeros((1, 1, 1))).dataset)
+        self.clear_volume(self.mask_, self.empty_mask)
         if not self.ray_caster.is_active() and not self.iso_surfer.is_active() and not self.slicer.is_active() and not self.image_viewer.is_active():
             self.delete_current_axes()
         self.render()
 
+    @staticmethod
+    def clear_volume(volume:Volume, empty):
+        """
+        Display an empty placeholder dataset in a volume actor, unless it already displays it.
+        
+        Parameters
+        ----------
+        volume : Volume
+            The volume actor
+        empty : vtkImageData
+            The placeholder dataset
+        """
+        if volume.dataset is not empty:
+            volume._update(empty)
+
+    @single_render
     def switch_axes(self):
         """
         Switch between different axes.
@@ -200,6 +338,7 @@ class Renderer(Plotter):
         self.add_axes(self.axes)
         self.render()
         
+    @single_render
     def change_background(self, bg, bg2):
         """
         Change the background of the plot.
@@ -230,6 +369,10 @@ class Renderer(Plotter):
     def add_flags(self, volume_properties:Dict, offset:Tuple[int]=(0, 0, 60)):
         """
         Read the flags from a TDR file and add them to the plot.
+
+        All the bounding boxes and flag poles are drawn by a single line actor, colored per label
+        by the colors of the mask classes, and all the flag texts by a single label mapper, so that
+        the number of actors does not grow with the number of objects.
         
         Parameters
         ----------
@@ -239,25 +382,96 @@ class Renderer(Plotter):
             The offset to apply to the flags
         
         """
-        self.fss = []
-        self.bboxes = []
-        for pos, flag_pos, label in zip(volume_properties["poses"], volume_properties["flag_poses"], volume_properties["labels"]):
-            self.bboxes.append(Box(pos=pos, c="black", alpha=0.9).wireframe().lw(2).lighting("off"))
-            label = label if isinstance(label, str) else self.mask_flags.get(label)
-            fs = Flagpost(base=flag_pos, top=flag_pos + np.array(offset), txt=label, s=0.7, c="gray", bc="k9", alpha=1, lw=3, font="SmartCouric")
-            self.fss.append(fs)
+        self.fss, self.bboxes, self.flags = [], [], []
+        poses, labels = volume_properties["poses"], volume_properties["labels"]
+        if len(poses):
+            bounds = np.array([np.ravel(pos) for pos in poses], dtype=float)
+            if bounds.shape[1] == 3:
+                # a position rather than bounds, a unit box as vedo.Box draws it
+                bounds = np.repeat(bounds, 2, axis=1) + np.tile([-0.5, 0.5], 3)
+            bits = (np.arange(8)[:, None] >> np.arange(3)) & 1
+            corners = bounds[:, [0, 2, 4]][:, None, :] + bits * (bounds[:, [1, 3, 5]] - bounds[:, [0, 2, 4]])[:, None, :]
+            bases = np.array(volume_properties["flag_poses"], dtype=float).reshape(-1, 3)
+            tops = bases + np.array(offset)
+            # the 8 corners of every box then the base and top of every pole, and the segments joining them
+            points = vtkPoints()
+            points.SetData(numpy_to_vtk(np.vstack([corners.reshape(-1, 3), bases, tops]), deep=True))
+            edges = (self.BOX_EDGES + 8 * np.arange(len(bounds))[:, None, None]).reshape(-1, 2)
+            poles = 8 * len(bounds) + np.column_stack([np.arange(len(bases)), len(bases) + np.arange(len(bases))])
+            segments = np.vstack([edges, poles]).astype(np.int64)
+            cells = vtkCellArray()
+            cells.SetData(numpy_to_vtkIdTypeArray(np.arange(0, segments.size + 1, 2, dtype=np.int64), deep=True),
+                          numpy_to_vtkIdTypeArray(segments.ravel(), deep=True))
+            poly = vtkPolyData()
+            poly.SetPoints(points)
+            poly.SetLines(cells)
+
+            class_colors = {label: vedo.get_color("black" if isinstance(label, str) else self.mask_colors.get(label, "black"))
+                            for label in set(labels)}
+            box_colors = np.array([class_colors[label] for label in labels]).reshape(-1, 3)
+            colors = np.vstack([np.repeat(box_colors, len(self.BOX_EDGES), axis=0), np.tile(vedo.get_color("gray"), (len(bases), 1))])
+            lines = vedo.Mesh(poly).lw(2).lighting("off")
+            lines.cellcolors = np.hstack([colors * 255, np.full((len(colors), 1), 255)]).astype(np.uint8)
+            self.bboxes.append(lines)
+
+            texts = [str(label if isinstance(label, str) else self.mask_flags.get(label)) for label in labels]
+            self.flags = list(zip(bases, tops, texts))
+            self.fss.append(self.flag_labels(tops, texts))
         
         self.add([self.fss, self.bboxes])
         self.render()
+
+    @staticmethod
+    def flag_labels(positions:np.ndarray, texts:List[str]) -> vedo.Actor2D:
+        """
+        Build a single actor drawing texts at 3D positions.
+
+        Parameters
+        ----------
+        positions : np.ndarray
+            The (n, 3) positions of the texts
+        texts : list
+            The n texts
+        """
+        points, names = vtkPoints(), vtkStringArray()
+        names.SetName("labels")
+        for position, text in zip(positions, texts):
+            points.InsertNextPoint(*position)
+            names.InsertNextValue(text)
+        poly = vtkPolyData()
+        poly.SetPoints(points)
+        poly.GetPointData().AddArray(names)
+        hierarchy = vtkPointSetToLabelHierarchy()
+        hierarchy.SetInputData(poly)
+        hierarchy.SetLabelArrayName("labels")
+        text_property = hierarchy.GetTextProperty()
+        text_property.SetColor(vedo.get_color("k"))
+        text_property.SetBackgroundColor(vedo.get_color("k9"))
+        text_property.SetBackgroundOpacity(1)
+        text_property.SetFontSize(14)
+        text_property.BoldOff()
+        text_property.ItalicOff()
+        text_property.ShadowOff()
+        text_property.SetJustificationToCentered()
+        # all the texts are drawn by one strategy, none being hidden when they overlap
+        mapper = vtkLabelPlacementMapper()
+        mapper.SetInputConnection(hierarchy.GetOutputPort())
+        mapper.SetRenderStrategy(vtkFreeTypeLabelRenderStrategy())
+        mapper.PlaceAllLabelsOn()
+        actor = vedo.Actor2D()
+        actor.PickableOff()
+        actor.SetMapper(mapper)
+        return actor
             
     def remove_flags(self):
         """
         Remove the flags from the current plot.
         """
         self.remove([self.fss, self.bboxes])
-        self.fss, self.bboxes = [], []
+        self.fss, self.bboxes, self.flags = [], [], []
         self.render()
 
+    @single_render
     def update_volume(self, volume_path):
         """
         Update the volume with the given path when the user selects a new volume.
@@ -269,6 +483,21 @@ class Renderer(Plotter):
         """
         self.reader.reset_properties()
         vol, volume_properties = self.reader(volume_path)
+        self.display_volume(vol, volume_properties)
+
+    @single_render
+    def display_volume(self, vol, volume_properties:Dict):
+        """
+        Display a volume that was already decoded by the reader.
+        Used by background loaders to hand the decoded volume to the render thread.
+        
+        Parameters
+        ----------
+        vol : Volume or Image
+            The decoded volume, mask or projection
+        volume_properties : dict
+            The properties returned by the reader along with the volume
+        """
         if volume_properties["is_proj"]:
             self.image._update(vol.dataset)
             self.clean_view()
@@ -282,21 +511,121 @@ class Renderer(Plotter):
             self.add([self.volume, self.mask_])
         if volume_properties["is_mask"]:
             self.remove_flags()
-            self.mask_._update(vol.dataset).alpha([0]+[1]*(len(self.mask_classes)-1)) # keep the background transparent
+            self.mask_._update(vol.dataset)
+            self.set_mask_labels(vol, volume_properties)
             self.add_flags(volume_properties)
             if not self.at_least_one_mode_active():
                 self.show(viewup='z')
         else:
-            self.volume._update(vol.dataset)
+            self.display_start, self.level_timings = time.perf_counter(), []
+            self.histogram = volume_properties.get("histogram") or Histogram(vol.tonumpy(), max_samples=Histogram.MAX_SAMPLES)
+            pyramid = volume_properties.get("pyramid")
+            if pyramid is not None and (self.ray_caster.is_active() or not self.at_least_one_mode_active()):
+                # show the coarsest level now, the finer ones are swapped in by refine_volume
+                self.pending_levels = list(pyramid.levels)
+                factor, level = self.pending_levels.pop(0)
+            else:
+                self.pending_levels = []
+                factor, level = 1, vol
+            self.volume._update(level.dataset)
         if not self.at_least_one_mode_active():
             self.ray_cast_mode(1)
             self.show(viewup='z')
         self.refresh_axes()
         self.render()
+        if not volume_properties["is_mask"] and not volume_properties["is_proj"]:
+            self.level_timings.append((factor, time.perf_counter() - self.display_start))
+
+    def set_mask_labels(self, vol:Volume, volume_properties:Dict):
+        """
+        Map the labels of a mask to the mask classes and build its lookup tables.
+
+        The voxels of the class masks hold the ids of the mask classes. The voxels of the TDR masks
+        hold the index + 1 of their object, of the class whose flag name is the object description.
+        
+        Parameters
+        ----------
+        vol : Volume
+            The decoded mask
+        volume_properties : dict
+            The properties returned by the reader along with the mask
+        """
+        labels = volume_properties.get("labels", [])
+        if labels and all(isinstance(label, str) for label in labels):
+            classes = {flag: class_id for class_id, flag in self.mask_flags.items()}
+            self.mask_label_classes = [0] + [classes.get(label) for label in labels]
+        else:
+            self.mask_label_classes = list(range(int(vol.dataset.GetScalarRange()[1]) + 1))
+        self.update_mask_lut()
+
+    def update_mask_lut(self):
+        """
+        Build the color and opacity lookup tables of the mask from the mask classes.
+
+        Each label gets the color and alpha of its class, the alpha being 0 for the hidden classes.
+        The transfer functions are flat around every label and only change halfway between labels.
+        """
+        mask_alpha = {val[0]: val[2] for val in self.mask_classes} if self.mask_classes is not None else {}
+        ctf = self.mask_.properties.GetRGBTransferFunction()
+        otf = self.mask_.properties.GetScalarOpacity()
+        ctf.RemoveAllPoints()
+        otf.RemoveAllPoints()
+        for label, class_id in enumerate(self.mask_label_classes):
+            color = self.mask_colors.get(class_id, self.THREAT_COLOR)
+            alpha = 0 if label == 0 or class_id in self.hidden_classes else mask_alpha.get(class_id, 1)
+            # a plateau around each label, so that the lookup of a label is never blended with the next one
+            for x in (label - 0.45, label + 0.45):
+                ctf.AddRGBPoint(x, *vedo.get_color(color))
+                otf.AddPoint(x, alpha)
+
+    @single_render
+    def set_mask_class_visibility(self, class_id:int, visible:bool):
+        """
+        Show or hide the voxels of a mask class, by editing the lookup tables of the mask only.
+        
+        Parameters
+        ----------
+        class_id : int
+            The id of the mask class
+        visible : bool
+            Show the class if True, hide it otherwise
+        """
+        if visible:
+            self.hidden_classes.discard(class_id)
+        else:
+            self.hidden_classes.add(class_id)
+        self.update_mask_lut()
+        self.render()
+
+    def refine_volume(self) -> bool:
+        """
+        Swap in the next finer level of the displayed volume.
+        
+        Returns
+        -------
+        bool
+            True if finer levels remain to be displayed
+        """
+        if not self.pending_levels:
+            return False
+        factor, level = self.pending_levels.pop(0)
+        self.volume._update(level.dataset)
+        self.render()
+        self.level_timings.append((factor, time.perf_counter() - self.display_start))
+        return bool(self.pending_levels)
+
+    def finish_refinement(self):
+        """ Display the full resolution volume at once, skipping the remaining levels. """
+        if self.pending_levels:
+            factor, level = self.pending_levels[-1]
+            self.pending_levels = []
+            self.volume._update(level.dataset)
+            self.level_timings.append((factor, time.perf_counter() - self.display_start))
 
     def at_least_one_mode_active(self):
         return self.ray_caster.is_active() or self.iso_surfer.is_active() or self.slicer.is_active() or self.image_viewer.is_active()
     
+    @single_render
     def update_user_config(self, user_config:Dict):
         """
         Update the user configuration with the given parameters.
@@ -308,10 +637,12 @@ class Renderer(Plotter):
         """
         self.ogb, self.alpha, self.isovalue = user_config['ogb'], user_config['alpha'], user_config['isovalue']
         self.iso_surfer.update_isovalue(self.isovalue)
+        self.mask_classes = user_config['mask_classes']
         self.mask_alpha = [val[2] for val in user_config['mask_classes']]
         self.mask_flags = {val[0]: val[3] for val in user_config['mask_classes']}
+        self.mask_colors = {val[0]: val[1] for val in user_config['mask_classes']}
         self.volume.color(self.ogb).alpha(self.alpha)
-        self.mask_.color("red").alpha([0]+self.mask_alpha[1:])
+        self.update_mask_lut()
         if hasattr(self.ray_caster, 'opacityTransferFunction'):
             self.ray_caster.setOTF()
         self.render()
@@ -330,8 +661,13 @@ class Renderer(Plotter):
         mask_array[mask_array > 0] = 1
         mask.modified()
         mesh_mask = mask.isosurface().decimate(0.5).color("red").alpha(1)
+        # the iso surface currently displayed, from the mesh cache of the iso surfer
+        mesh_iso = self.iso_surfer.mesh.clone() if self.iso_surfer.mesh_mode and self.iso_surfer.is_active() else None
+        # the batched flag labels are 2D, the export gets 3D flagposts
+        flagposts = [Flagpost(base=base, top=top, txt=text, s=0.7, c="gray", bc="k9", alpha=1, lw=3, font="SmartCouric")
+                     for base, top, text in self.flags]
         txt = Text3D("Auxilia Web CTViewer", font='Bongas', s=30, c='black', depth=0.05)
-        plt.show(mesh_mask, self.bboxes, self.fss, txt, txt.box(padding=20), axes=1, viewup='z', zoom=1.2)
+        plt.show(mesh_mask, mesh_iso, self.bboxes, flagposts, txt, txt.box(padding=20), axes=1, viewup='z', zoom=1.2)
         import os
         if not os.path.exists('export'):
             os.makedirs('export')
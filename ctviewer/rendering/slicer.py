@@ -2,6 +2,7 @@ from typing import List
 
 import vedo
 from vedo import Volume, np
+from vtkmodules.vtkRenderingCore import vtkImageSlice, vtkImageSliceMapper
 
 from . import RendererCallbacks
 
@@ -40,74 +41,30 @@ class Slicer():
     def build(self):
         """ Build the slicer with the input volume. Mode 1 by default. """
         self.dims = self.volume.dimensions()
-        self.data = self.volume.pointdata[0]
-        self.rmin, self.rmax = self.volume.scalar_range()
-
         if np.sum(self.callbacks.background()) < 1.5:
             self.cx, self.cy, self.cz = "lr", "lg", "lb"
         self.box = self.volume.box().alpha(0.2)
         self.callbacks.add(self.box)
 
-        if self.clamp:
-            hdata, edg = np.histogram(self.data, bins=20)
-            logdata = np.log(hdata + 1)
-            # mean of the logscale plot
-            meanlog = np.sum(np.multiply(edg[:-1], logdata)) / np.sum(logdata)
-            self.rmax = min(self.rmax, meanlog + (meanlog - self.rmin) * 0.9)
-            self.rmin = max(self.rmin, meanlog - (self.rmax - meanlog) * 0.9)
         self.cmap_slicer = self.slider_cmap
-        self.current_i = None
-        self.current_j = int(self.dims[1] / 1.5)
-        self.current_k = None
-        self.xslice = None
-        self.yslice = None
-        self.zslice = None
-        self.yslice = self.volume.yslice(
-            self.current_j).lighting("", self.la, self.ld, 0)
-        self.yslice.name = "YSlice"
-        self.yslice.cmap(self.cmap_slicer, vmin=self.rmin, vmax=self.rmax)
-        self.callbacks.add(self.yslice)
+        self.update_range()
+        # one persistent slice actor per axis, the sliders only move their slice index
+        self.xslice, self.yslice, self.zslice = (self.make_slice(axis) for axis in range(3))
+        self.current_i, self.current_j, self.current_k = None, None, None
+        self.set_slice(1, int(self.dims[1] / 1.5))
+        self.callbacks.add([self.xslice, self.yslice, self.zslice])
 
         def slider_function_x(widget, event):
-            i = int(self.xslider.value)
-            if i == self.current_i:
-                return
-            self.current_i = i
-            self.xslice = self.volume.xslice(i).lighting("", self.la, self.ld, 0)
-            self.xslice.cmap(self.cmap_slicer, vmin=self.rmin, vmax=self.rmax)
-            self.xslice.name = "XSlice"
-            self.callbacks.remove("XSlice")  # Removes the old one
-            if 0 < i < self.dims[0]:
-                self.callbacks.add(self.xslice)
-            self.callbacks.render()
+            if self.set_slice(0, int(self.xslider.value)):
+                self.callbacks.render()
 
         def slider_function_y(widget, event):
-            j = int(self.yslider.value)
-            if j == self.current_j:
-                return
-            self.current_j = j
-            self.yslice = self.volume.yslice(
-                j).lighting("", self.la, self.ld, 0)
-            self.yslice.cmap(self.cmap_slicer, vmin=self.rmin, vmax=self.rmax)
-            self.yslice.name = "YSlice"
-            self.callbacks.remove("YSlice")
-            if 0 < j < self.dims[1]:
-                self.callbacks.add(self.yslice)
-            self.callbacks.render()
+            if self.set_slice(1, int(self.yslider.value)):
+                self.callbacks.render()
 
         def slider_function_z(widget, event):
-            k = int(self.zslider.value)
-            if k == self.current_k:
-                return
-            self.current_k = k
-            self.zslice = self.volume.zslice(
-                k).lighting("", self.la, self.ld, 0)
-            self.zslice.cmap(self.cmap_slicer, vmin=self.rmin, vmax=self.rmax)
-            self.zslice.name = "ZSlice"
-            self.callbacks.remove("ZSlice")
-            if 0 < k < self.dims[2]:
-                self.callbacks.add(self.zslice)
-            self.callbacks.render()
+            if self.set_slice(2, int(self.zslider.value)):
+                self.callbacks.render()
         # 3d sliders attached to the axes bounds
         bs = self.box.bounds()
         self.xslider = self.callbacks.add_slider3d(
@@ -144,6 +101,98 @@ class Slicer():
             show_value=False,
         )
     
+    def update_range(self):
+        """ Set the range of the lookup table from the histogram of the volume, clamped if enabled. """
+        histogram = self.callbacks.histogram()
+        self.rmin, self.rmax = histogram.range
+        if self.clamp:
+            hdata, edg = histogram.counts(bins=20)
+            logdata = np.log(hdata + 1)
+            # mean of the logscale plot
+            meanlog = np.sum(np.multiply(edg[:-1], logdata)) / np.sum(logdata)
+            self.rmax = min(self.rmax, meanlog + (meanlog - self.rmin) * 0.9)
+            self.rmin = max(self.rmin, meanlog - (self.rmax - meanlog) * 0.9)
+        self.cmap_slicer.SetRange(self.rmin, self.rmax)
+
+    def refresh(self):
+        """
+        Fit the built slicer to the dataset of the volume, which the renderer swaps when a new volume is loaded.
+        The mappers are re-pointed to the dataset, and the dims, the color range, the box and the sliders are updated.
+        """
+        self.dims = self.volume.dimensions()
+        self.update_range()
+        for image_slice in (self.xslice, self.yslice, self.zslice):
+            image_slice.GetMapper().SetInputData(self.volume.dataset)
+        self.box = self.volume.box().alpha(0.2)
+        bs = self.box.bounds()
+        ends = (((bs[1], bs[2], bs[4]), (bs[0], bs[2], bs[4])),
+                ((bs[1], bs[3], bs[4]), (bs[1], bs[2], bs[4])),
+                ((bs[0], bs[2], bs[5]), (bs[0], bs[2], bs[4])))
+        values = (0, int(self.dims[1] / 1.5), self.dims[2])
+        for axis, slider in enumerate((self.xslider, self.yslider, self.zslider)):
+            # the sliders store their second position as the first point of the representation
+            rep = slider.GetRepresentation()
+            rep.GetPoint1Coordinate().SetValue(ends[axis][0])
+            rep.GetPoint2Coordinate().SetValue(ends[axis][1])
+            rep.SetMaximumValue(self.dims[axis])
+            rep.SetValue(values[axis])
+        self.current_i, self.current_j, self.current_k = None, None, None
+        for axis, value in enumerate(values):
+            self.set_slice(axis, value)
+
+    def make_slice(self, axis:int) -> vtkImageSlice:
+        """
+        Create the slice actor of an axis, hidden until its slice index is set.
+
+        Parameters
+        ----------
+        axis : int
+            0, 1 or 2 for the slice normal to x, y or z.
+        """
+        mapper = vtkImageSliceMapper()
+        mapper.SetInputData(self.volume.dataset)
+        mapper.SetOrientation(axis)
+        image_slice = vtkImageSlice()
+        image_slice.SetMapper(mapper)
+        image_property = image_slice.GetProperty()
+        image_property.SetLookupTable(self.cmap_slicer)
+        image_property.UseLookupTableScalarRangeOn()
+        image_property.SetAmbient(self.la)
+        image_property.SetDiffuse(self.ld)
+        image_slice.VisibilityOff()
+        return image_slice
+
+    def set_slice(self, axis:int, index:int) -> bool:
+        """
+        Move the slice of an axis to a voxel index, in place. The slice is hidden on the bounds of the axis.
+
+        Parameters
+        ----------
+        axis : int
+            0, 1 or 2 for the slice normal to x, y or z.
+        index : int
+            The voxel index of the slice along the axis.
+
+        Returns
+        -------
+        bool
+            True if the slice moved.
+        """
+        current = ("current_i", "current_j", "current_k")[axis]
+        if index == getattr(self, current):
+            return False
+        setattr(self, current, index)
+        image_slice = (self.xslice, self.yslice, self.zslice)[axis]
+        mapper = image_slice.GetMapper()
+        if mapper.GetInput() is not self.volume.dataset:
+            # the volume was swapped since the last move
+            mapper.SetInputData(self.volume.dataset)
+        visible = bool(0 < index < self.dims[axis])
+        if visible:
+            mapper.SetSliceNumber(index)
+        image_slice.SetVisibility(visible)
+        return True
+
     def check_volume(self):
         """Check if the volume is valid."""
         if not hasattr(self.volume, "properties"): return False
@@ -172,7 +221,7 @@ class Slicer():
     def activate(self, clamp=True, mode:int = 0):
         """
         Activate the slicer with the input volume.
-        If the slicer is already active, the sliders will be turned on again.
+        If the slicer was already built, it is refreshed to the current volume and the sliders are turned on again.
         If clamp is set to True, the scalar range will be clamped to reduce the effect of tails in color mapping.
 
         Parameters
@@ -185,6 +234,7 @@ class Slicer():
         self.volume.mode(1)
         self.clamp = clamp if clamp is not None else self.clamp
         if hasattr(self, "yslider") and not self.on:
+            self.refresh()
             for s in self.get_sliders():
                 s.on()
             self.callbacks.add(self.get_addons())
@@ -1,5 +1,6 @@
-from .cc_3d import connected_components_3d
+from .cc_3d import connected_components_3d, streaming_connected_components_3d
 from .configs import ConfigManager
+from .histogram import Histogram
 from .helpers import SHORCUTS_TEXT, ABOUT_TEXT
 
-__all__ = ['connected_components_3d', 'ConfigManager', 'SHORCUTS_TEXT', 'ABOUT_TEXT']
\ No newline at end of file
+__all__ = ['connected_components_3d', 'streaming_connected_components_3d', 'ConfigManager', 'Histogram', 'SHORCUTS_TEXT', 'ABOUT_TEXT']
\ No newline at end of file
@@ -1,7 +1,66 @@
 from vedo import Volume, np
 import cc3d
 
-def connected_components_3d(volume:Volume, connectivity=26, reshape_factor:float=4):
+def _axis_slice(axis:int, start=None, stop=None, step=None):
+    """ Build an index selecting a slice along a single axis of a 3D array. """
+    index = [slice(None)] * 3
+    index[axis] = slice(start, stop, step)
+    return tuple(index)
+
+def max_pool_3d(vol:np.ndarray, factor:int) -> np.ndarray:
+    """
+    Downsample a label volume by taking the maximum over blocks of factor^3 voxels.
+
+    A coarse cell is background only if its whole block is background, so that no object
+    is lost by the downsampling. The pooling is separable and works on strided views, so
+    the only allocations are the (smaller) pooled arrays.
+
+    Parameters
+    ----------
+    vol : np.ndarray
+        The 3D label volume.
+    factor : int
+        The size of the blocks along each axis. The last block of an axis may be smaller.
+
+    Returns
+    -------
+    pooled : np.ndarray
+        The pooled volume, of shape ceil(vol.shape / factor).
+    """
+    pooled = vol
+    for axis in range(3):
+        out = pooled[_axis_slice(axis, 0, None, factor)].copy(order='K')
+        for offset in range(1, factor):
+            part = pooled[_axis_slice(axis, offset, None, factor)]
+            target = out[_axis_slice(axis, 0, part.shape[axis])]
+            np.maximum(target, part, out=target)
+        pooled = out
+    return pooled
+
+def dilate_3d(vol:np.ndarray) -> np.ndarray:
+    """
+    Dilate a label volume with a 2x2x2 maximum filter, i.e. by one voxel towards the origin.
+
+    Two objects separated by a single background voxel become adjacent, which is how a
+    dilation by 2*reshape_factor at full resolution behaves once downsampled by reshape_factor.
+
+    Parameters
+    ----------
+    vol : np.ndarray
+        The 3D label volume.
+
+    Returns
+    -------
+    dilated : np.ndarray
+        The dilated volume, with the same shape as the input.
+    """
+    dilated = vol.copy(order='K')
+    for axis in range(3):
+        target = dilated[_axis_slice(axis, None, -1)]
+        np.maximum(target, dilated[_axis_slice(axis, 1)], out=target)
+    return dilated
+
+def connected_components_3d(volume:Volume, connectivity=26, reshape_factor:float=4, downsample_first:bool=False):
     """
     Compute connected components in 3D image.
     
@@ -14,6 +73,12 @@ def connected_components_3d(volume:Volume, connectivity=26, reshape_factor:float
         Only 4,8 (2D) and 26, 18, and 6 (3D) are allowed
     reshape_factor : float, optional
         The factor to reshape the volume.
+    downsample_first : bool, optional
+        Downsample the volume with a label-preserving max pooling before closing the gaps
+        between the parts of the objects, so that the morphology runs on the coarse grid
+        (reshape_factor^3 times fewer voxels). The bounding boxes are those of the objects rounded
+        out to the coarse cells, so they match the default mode within one coarse cell. The input
+        volume is left untouched in this mode.
     
     Returns
     -------
@@ -28,22 +93,209 @@ def connected_components_3d(volume:Volume, connectivity=26, reshape_factor:float
                 The list of class labels of the connected components
     """
     volume_properties = {"spacing": (1, 1, 1), "origin": (0, 0, 0), "is_proj": False, "is_mask": True, "poses": [], "flag_poses": [], "labels": []}
-    volume.dilate((2*reshape_factor, 2*reshape_factor, 2*reshape_factor)).erode((reshape_factor, reshape_factor, reshape_factor))
-    vol = volume.tonumpy()[::reshape_factor, ::reshape_factor, ::reshape_factor]
-    labels_out, N = cc3d.connected_components(vol, connectivity=connectivity, return_N=True)
+    if downsample_first:
+        vol = max_pool_3d(volume.tonumpy(), reshape_factor)
+        labels_out, N = cc3d.connected_components(dilate_3d(vol), connectivity=connectivity, return_N=True)
+        # measure the components on the pooled cells only, without the cells added by the dilation
+        labels_out *= vol != 0
+        # drop the components made only of dilated cells and renumber the others
+        present = np.unique(labels_out)
+        present = present[present != 0]
+        remap = np.zeros(N + 1, dtype=labels_out.dtype)
+        remap[present] = np.arange(1, len(present) + 1, dtype=labels_out.dtype)
+        labels_out, N = remap[labels_out], len(present)
+    else:
+        volume.dilate((2*reshape_factor, 2*reshape_factor, 2*reshape_factor)).erode((reshape_factor, reshape_factor, reshape_factor))
+        vol = volume.tonumpy()[::reshape_factor, ::reshape_factor, ::reshape_factor]
+        labels_out, N = cc3d.connected_components(vol, connectivity=connectivity, return_N=True)
     stats = cc3d.statistics(labels_out)
     print("Number of objects in the volume:", N)
-    for centroid, bounding_boxe, each_label in zip(stats['centroids'][1:], stats['bounding_boxes'][1:], cc3d.each(labels_out, binary=True, in_place=True)):
-        image = each_label[1]
-        class_label = np.unique(image*vol)
-        volume_properties["labels"].append(class_label[1])
-        pos = np.array([bounding_boxe[0].start, bounding_boxe[0].stop, bounding_boxe[1].start, bounding_boxe[1].stop, bounding_boxe[2].start, bounding_boxe[2].stop])
-        pos = pos*reshape_factor - reshape_factor
-        volume_properties["poses"].append(pos)
-        # add the z length of the bounding box to the centroid
-        centroid = centroid * reshape_factor - reshape_factor
-        base = np.array([centroid[0], centroid[1], centroid[2]+((pos[-1]-pos[-2])/2)]).astype(int)
-        volume_properties["flag_poses"].append(base)
-    
+    if N == 0:
+        return volume_properties
+
+    # class of each component: the most frequent class among its voxels,
+    # from a single bincount over the (component id, class) pairs
+    classes = vol.astype(np.intp, copy=False)
+    n_classes = int(classes.max()) + 1
+    pair_counts = np.bincount((labels_out.astype(np.intp) * n_classes + classes).ravel(), minlength=(N + 1) * n_classes)
+    class_labels = pair_counts.reshape(N + 1, n_classes)[1:, 1:].argmax(axis=1) + 1
+
+    bounding_boxes = np.array([[axis.start, axis.stop] for bounding_boxe in stats['bounding_boxes'][1:] for axis in bounding_boxe]).reshape(N, 6)
+    centroids = stats['centroids'][1:]
+    if downsample_first:
+        # map the coarse cells to the voxels they cover
+        poses = np.minimum(bounding_boxes * reshape_factor, np.repeat(volume.dimensions(), 2))
+        centroids = (centroids + 0.5) * reshape_factor
+    else:
+        poses = bounding_boxes * reshape_factor - reshape_factor
+        centroids = centroids * reshape_factor - reshape_factor
+    return _fill_properties(volume_properties, poses, centroids, class_labels)
+
+def _fill_properties(volume_properties:dict, poses:np.ndarray, centroids:np.ndarray, class_labels:np.ndarray) -> dict:
+    """ Store the bounding boxes, the flag positions and the classes of the components in the volume properties. """
+    # add the z length of the bounding box to the centroid
+    centroids[:, 2] += (poses[:, 5] - poses[:, 4]) / 2
+
+    volume_properties["labels"] = [int(class_label) for class_label in class_labels]
+    volume_properties["poses"] = list(poses)
+    volume_properties["flag_poses"] = list(centroids.astype(int))
     return volume_properties
-    
\ No newline at end of file
+
+def _coarse_slabs(source, reshape_factor:int, slab_size:int):
+    """
+    Yield the max pooled slabs of a mask streamed along z, with the number of planes they cover
+    and the (x, y) dimensions of the mask.
+
+    The incoming slabs are regrouped so that every pooled slab but the last one covers a multiple
+    of reshape_factor planes, which keeps the coarse grid aligned with the one of the whole volume.
+    """
+    slab_size = max(slab_size // reshape_factor, 1) * reshape_factor
+    if isinstance(source, np.ndarray):
+        array = source
+        source = (array[:, :, z:z + slab_size] for z in range(0, array.shape[2], slab_size))
+    pending, n_pending = [], 0
+    for slab in source:
+        pending.append(slab)
+        n_pending += slab.shape[2]
+        if n_pending < slab_size:
+            continue
+        buffer = np.concatenate(pending, axis=2) if len(pending) > 1 else pending[0]
+        cut = n_pending - n_pending % reshape_factor
+        yield max_pool_3d(buffer[:, :, :cut], reshape_factor), cut, buffer.shape[:2]
+        pending = [buffer[:, :, cut:]] if cut < n_pending else []
+        n_pending -= cut
+    if n_pending:
+        yield max_pool_3d(np.concatenate(pending, axis=2), reshape_factor), n_pending, pending[0].shape[:2]
+
+def streaming_connected_components_3d(source, connectivity=26, reshape_factor:int=4, slab_size:int=64):
+    """
+    Compute connected components in a 3D mask streamed in slabs along z.
+
+    Only a few slabs of the mask are in memory at a time, so that masks larger than the RAM
+    can be processed from a memory-mapped file. Each slab is max pooled and closed on the coarse
+    grid, labelled on its own, and the labels are merged across the slab boundaries with a
+    union-find. The result is the one of `connected_components_3d` with `downsample_first=True`.
+
+    Parameters
+    ----------
+    source : np.ndarray or iterable of np.ndarray
+        The mask as an (x, y, z) array, e.g. a memory-mapped .npy file, or an iterable of
+        consecutive (x, y, dz) slabs along z.
+    connectivity : int, optional
+        The connectivity of the connected components.
+        Only 26, 18, and 6 are allowed
+    reshape_factor : int, optional
+        The factor to reshape the volume.
+    slab_size : int, optional
+        The number of z planes read at a time, rounded to a multiple of reshape_factor.
+
+    Returns
+    -------
+    volume_properties : dict
+        The dictionary containing the properties of the connected components,
+        as returned by `connected_components_3d`.
+    """
+    volume_properties = {"spacing": (1, 1, 1), "origin": (0, 0, 0), "is_proj": False, "is_mask": True, "poses": [], "flag_poses": [], "labels": []}
+    parent = [0]  # union-find forest over the global labels, 0 is the background
+
+    def find(label):
+        while parent[label] != label:
+            parent[label] = parent[parent[label]]
+            label = parent[label]
+        return label
+
+    boxes, sums, counts, class_counts = [], [], [], []
+    offset, z0, depth = 0, 0, 0
+    previous_plane = previous_labels = None
+
+    def label_slab(pooled, next_plane):
+        nonlocal offset, z0, previous_plane, previous_labels
+        # the dilation of the last plane needs the first plane of the next slab
+        extended = pooled if next_plane is None else np.concatenate([pooled, next_plane], axis=2)
+        dilated = np.asfortranarray(dilate_3d(extended)[:, :, :pooled.shape[2]])
+        labels_out, N = cc3d.connected_components(dilated, connectivity=connectivity, return_N=True)
+        labels_out = labels_out.astype(np.int64)
+        global_labels = np.where(labels_out > 0, labels_out + offset, 0)
+        parent.extend(range(offset + 1, offset + N + 1))
+
+        if previous_plane is not None:
+            # label the two planes around the boundary and merge the slab labels they connect
+            boundary = cc3d.connected_components(np.stack([previous_plane, dilated[:, :, 0]], axis=2), connectivity=connectivity)
+            boundary_labels = np.stack([previous_labels, global_labels[:, :, 0]], axis=2)
+            pairs = np.unique(np.stack([boundary[boundary > 0], boundary_labels[boundary > 0]], axis=1), axis=0)
+            for (component, label), (previous_component, previous_label) in zip(pairs[1:], pairs[:-1]):
+                if component == previous_component:
+                    root, other = find(int(label)), find(int(previous_label))
+                    parent[max(root, other)] = min(root, other)
+
+        # measure the components on the pooled cells only, without the cells added by the dilation
+        labels_out *= pooled != 0
+        stats = cc3d.statistics(labels_out, no_slice_conversion=True)
+        slab_counts = np.zeros(N + 1, dtype=np.int64)
+        slab_counts[:len(stats['voxel_counts'])] = stats['voxel_counts']
+        slab_boxes = np.zeros((N + 1, 6), dtype=np.int64)
+        slab_boxes[:len(stats['bounding_boxes'])] = stats['bounding_boxes']
+        slab_centroids = np.zeros((N + 1, 3))
+        slab_centroids[:len(stats['centroids'])] = np.nan_to_num(stats['centroids'])
+        slab_boxes[:, 1::2] += 1
+        slab_boxes[:, 4:] += z0
+        slab_centroids[:, 2] += z0
+        boxes.append(slab_boxes[1:])
+        sums.append(slab_centroids[1:] * slab_counts[1:, None])
+        counts.append(slab_counts[1:])
+
+        classes = pooled.astype(np.intp)
+        n_classes = int(classes.max()) + 1
+        pair_counts = np.bincount((labels_out * n_classes + classes).ravel(), minlength=(N + 1) * n_classes).reshape(N + 1, n_classes)
+        label_ids, class_ids = np.nonzero(pair_counts[1:, 1:])
+        class_counts.append(np.stack([label_ids + offset + 1, class_ids + 1, pair_counts[1:, 1:][label_ids, class_ids]], axis=1))
+
+        previous_plane, previous_labels = dilated[:, :, -1], global_labels[:, :, -1]
+        offset += N
+        z0 += pooled.shape[2]
+
+    previous = None
+    for pooled, planes, shape in _coarse_slabs(source, reshape_factor, slab_size):
+        if previous is not None:
+            label_slab(previous, pooled[:, :, :1])
+        previous = pooled
+        depth += planes
+    if previous is not None:
+        label_slab(previous, None)
+        # the pooled slabs round x and y up to a multiple of reshape_factor
+        dimensions = (*shape, depth)
+    if offset == 0:
+        print("Number of objects in the volume:", 0)
+        return volume_properties
+
+    # gather the statistics of the slab labels on the root of their component
+    roots = np.array([find(label) for label in range(1, offset + 1)])
+    boxes, sums, counts = np.concatenate(boxes), np.concatenate(sums), np.concatenate(counts)
+    merged_counts = np.zeros(offset + 1, dtype=np.int64)
+    np.add.at(merged_counts, roots, counts)
+    merged_sums = np.zeros((offset + 1, 3))
+    np.add.at(merged_sums, roots, sums)
+    merged_boxes = np.zeros((offset + 1, 6), dtype=np.int64)
+    merged_boxes[:, 0::2] = np.iinfo(np.int64).max
+    np.minimum.at(merged_boxes[:, 0::2], roots[counts > 0], boxes[counts > 0, 0::2])
+    np.maximum.at(merged_boxes[:, 1::2], roots[counts > 0], boxes[counts > 0, 1::2])
+
+    # drop the components made only of dilated cells, the roots are in the order of first appearance
+    components = np.flatnonzero(merged_counts)
+    print("Number of objects in the volume:", len(components))
+    if len(components) == 0:
+        return volume_properties
+
+    # class of each component: the most frequent class among its voxels, the smallest one on ties
+    class_counts = np.concatenate(class_counts)
+    keys, inverse = np.unique(np.stack([roots[class_counts[:, 0] - 1], class_counts[:, 1]], axis=1), axis=0, return_inverse=True)
+    totals = np.bincount(inverse.ravel(), weights=class_counts[:, 2])
+    order = np.lexsort((keys[:, 1], -totals, keys[:, 0]))
+    first = order[np.r_[True, keys[order[1:], 0] != keys[order[:-1], 0]]]
+    class_labels = keys[first, 1]
+
+    bounding_boxes = merged_boxes[components]
+    centroids = merged_sums[components] / merged_counts[components, None]
+    poses = np.minimum(bounding_boxes * reshape_factor, np.repeat(dimensions, 2))
+    centroids = (centroids + 0.5) * reshape_factor
+    return _fill_properties(volume_properties, poses, centroids, class_labels)
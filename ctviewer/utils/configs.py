@@ -18,6 +18,7 @@ class ConfigManager:
         save_user_config: Save the updated user configuration.
         reset_user_config: Reset the user configuration to default values.
         get_user_config: Get the current user configuration.
+        get_renderer_config: Get the arguments of the renderer from the user configuration.
     """
 
     def __init__(self, config_file=ROOT / 'config.json'):
@@ -54,4 +55,28 @@ class ConfigManager:
         Returns:
             dict: The current user configuration settings.
         """
-        return self.config['user']
\ No newline at end of file
+        return self.config['user']
+
+    def get_renderer_config(self):
+        """Get the arguments of the renderer from the current user configuration.
+
+        Returns:
+            dict: The keyword arguments of `Renderer`, without the Plotter ones.
+        """
+        user_config = self.get_user_config()
+        ogb_cmap, alpha_weights, colors = user_config['ogb_cmap'], user_config['alpha_weights'], user_config['colors']
+        return {
+            'ogb': [(ogb_cmap[0], colors[0]), (ogb_cmap[1], colors[1]), (ogb_cmap[2], colors[2])],
+            'alpha': [(0, 1), (ogb_cmap[0], alpha_weights[0]), (ogb_cmap[1], alpha_weights[1]), (ogb_cmap[2], alpha_weights[2])],
+            'mask_classes': user_config.get('mask_classes'),
+            'isovalue': user_config.get('isovalue', 1350),
+            'cache_size_mb': user_config.get('cache_size_mb', 1024),
+            'prefetch_size_mb': user_config.get('prefetch_size_mb', 1024),
+            'disk_cache_dir': user_config.get('disk_cache_dir', ""),
+            'disk_cache_size_mb': user_config.get('disk_cache_size_mb', 10240),
+            'pyramid_min_voxels': user_config.get('pyramid_min_voxels', 256**3),
+            'lod_frame_time': user_config.get('lod_frame_time', 0.05),
+            'iso_mesh': user_config.get('iso_mesh', False),
+            'iso_decimation': user_config.get('iso_decimation', 2),
+            'iso_cache_size_mb': user_config.get('iso_cache_size_mb', 256),
+        }
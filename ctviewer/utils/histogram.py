@@ -0,0 +1,173 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple
+
+import numpy as np
+
+
+class Histogram:
+    """
+    Scalar range and histogram of a volume, computed once and rebinned on demand.
+
+    For integer voxels of at most 16 bits the exact count of every value is gathered in a single
+    pass (a bincount per chunk), from which the range and any binning derive exactly. Other voxels
+    get a fine histogram of `FINE_BINS` bins over their range, from a min/max pass and a histogram
+    pass. The chunks are processed on a thread pool.
+
+    With `max_samples`, larger volumes are counted from a random subsample of voxels drawn with a
+    fixed seed, so that the same volume always gives the same counts, while the range is still exact.
+    By the Dvoretzky-Kiefer-Wolfowitz inequality the cumulative fractions of the subsample are then
+    within `error_bound()` of those of the whole volume.
+
+    Attributes
+    ----------
+    range : tuple
+        The (min, max) scalar range of the voxels.
+    size : int
+        The number of voxels.
+    samples : int
+        The number of counted voxels, the size unless the volume was subsampled.
+    """
+
+    FINE_BINS = 4096
+    # the subsample size of the histograms computed on the render thread
+    MAX_SAMPLES = 2**22
+
+    def __init__(self, data:np.ndarray, workers:int=None, chunk_size:int=2**22, max_samples:int=None, seed:int=0):
+        """
+        Compute the range and the histogram of the voxels.
+
+        Parameters
+        ----------
+        data : np.ndarray
+            The voxels, in any memory order.
+        workers : int, optional
+            The number of threads, the number of CPUs if None.
+        chunk_size : int, optional
+            The number of voxels processed at a time by a thread.
+        max_samples : int, optional
+            The number of voxels above which the counts come from a random subsample of this size.
+        seed : int, optional
+            The seed of the subsample.
+        """
+        flat = data.reshape(-1, order='A') # a view for C and Fortran ordered arrays
+        self.size = flat.size
+        sample = flat
+        if max_samples and flat.size > max_samples:
+            # sorted indices, so that the gather walks the voxels in memory order
+            sample = flat[np.sort(np.random.default_rng(seed).integers(0, flat.size, max_samples))]
+        self.samples = sample.size
+
+        def split(array):
+            return [array[i:i + chunk_size] for i in range(0, max(array.size, 1), chunk_size)]
+
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+            is_small_integer = flat.dtype.kind in "biu" and flat.dtype.itemsize <= 2
+            if sample is flat and is_small_integer:
+                bounds = None # derived from the counts
+            else:
+                bounds = list(executor.map(lambda chunk: (chunk.min(), chunk.max()), split(flat)))
+                bounds = (float(min(b[0] for b in bounds)), float(max(b[1] for b in bounds))) if flat.size else (0.0, 0.0)
+            if is_small_integer:
+                # count every value, the signed values being shifted to start at 0
+                offset = int(np.iinfo(flat.dtype).min) if flat.dtype.kind == "i" else 0
+                unsigned = np.dtype(f"u{flat.dtype.itemsize}")
+
+                def count(chunk):
+                    values = chunk.view(unsigned)
+                    if offset:
+                        values = values ^ unsigned.type(-offset)
+                    return np.bincount(values, minlength=2 ** (8 * unsigned.itemsize))
+
+                value_counts = sum(executor.map(count, split(sample)))
+                if bounds is None:
+                    present = np.flatnonzero(value_counts)
+                    bounds = (float(present[0] + offset), float(present[-1] + offset)) if len(present) else (float(offset),) * 2
+                self.fine_counts = value_counts[int(bounds[0]) - offset:int(bounds[1]) - offset + 1]
+                self.fine_edges = None
+            else:
+                vrange = bounds if bounds[1] > bounds[0] else (bounds[0] - 0.5, bounds[1] + 0.5)
+                self.fine_edges = np.linspace(vrange[0], vrange[1], self.FINE_BINS + 1)
+                self.fine_counts = sum(executor.map(lambda chunk: np.histogram(chunk, bins=self.fine_edges)[0], split(sample)))
+        self.range = bounds
+
+    @property
+    def nbytes(self) -> int:
+        """The memory size in bytes of the counts and of the bin edges."""
+        return self.fine_counts.nbytes + (self.fine_edges.nbytes if self.fine_edges is not None else 0)
+
+    def error_bound(self, confidence:float=0.99) -> float:
+        """
+        Get the bound on the error of the cumulative voxel fractions due to the subsample.
+
+        The fraction of the voxels in any bin is then within twice this bound of its exact value.
+
+        Parameters
+        ----------
+        confidence : float, optional
+            The probability with which the bound holds.
+
+        Returns
+        -------
+        float
+            The Dvoretzky-Kiefer-Wolfowitz bound sqrt(ln(2 / (1 - confidence)) / (2 * samples)), 0 without subsample.
+        """
+        if self.samples >= self.size:
+            return 0.0
+        return float(np.sqrt(np.log(2 / (1 - confidence)) / (2 * self.samples)))
+
+    def counts(self, bins:int=20) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the histogram of the voxels in bins of equal width over their range.
+
+        The counts are those of `np.histogram(data, bins)` for the integer voxels of at most 16 bits.
+        For the other voxels the fine bins are assigned to the bin holding their centre. The counts of
+        a subsample are scaled to the number of voxels.
+
+        Parameters
+        ----------
+        bins : int, optional
+            The number of bins.
+
+        Returns
+        -------
+        counts : np.ndarray
+            The number of voxels in each bin.
+        edges : np.ndarray
+            The bins + 1 edges of the bins.
+        """
+        vmin, vmax = self.range
+        if vmax == vmin:
+            vmin, vmax = vmin - 0.5, vmax + 0.5
+        edges = np.linspace(vmin, vmax, bins + 1)
+        if self.fine_edges is None:
+            values = np.arange(len(self.fine_counts)) + self.range[0]
+        else:
+            values = (self.fine_edges[:-1] + self.fine_edges[1:]) / 2
+        # same bin assignment as np.histogram, the last edge being included in the last bin
+        index = np.clip(((values - vmin) * (bins / (vmax - vmin))).astype(np.intp), 0, bins - 1)
+        index -= values < edges[index]
+        index += (values >= edges[index + 1]) & (index < bins - 1)
+        counts = np.bincount(index, weights=self.fine_counts, minlength=bins)
+        if self.samples < self.size:
+            counts = np.rint(counts * (self.size / self.samples))
+        return counts.astype(np.int64), edges
+
+    def log_counts(self, bins:int=20) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the base 10 logarithm of the histogram, as displayed by the corner histograms.
+
+        Parameters
+        ----------
+        bins : int, optional
+            The number of bins.
+
+        Returns
+        -------
+        log_counts : np.ndarray
+            The log10(count + 1) of each bin.
+        edges : np.ndarray
+            The bins + 1 edges of the bins.
+        """
+        counts, edges = self.counts(bins)
+        return np.log10(counts + 1), edges
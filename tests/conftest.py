@@ -15,9 +15,10 @@ from pyDICOS import CT, DcsLongString, Filename, ErrorLog
 from pydicos import CTLoader
 
 from ctviewer.rendering import RendererCallbacks, IsoSurfer, RayCaster, Slicer, Renderer
-from ctviewer.utils import ConfigManager
+from ctviewer.utils import ConfigManager, Histogram
 from ctviewer.io import Reader
 from tdr_utils import get_tdr_data_output_template, get_pto_data, set_alarm_decision
+from dicom_utils import write_dicom_slice
 
 @pytest.fixture
 def mock_reader():
@@ -118,9 +119,11 @@ def mock_object():
     return MagicMock()
 
 @pytest.fixture
-def mock_callbacks():
+def mock_callbacks(temp_volume_data):
     """ Create a mock callbacks object """
-    return MagicMock(spec=RendererCallbacks)
+    mock = MagicMock(spec=RendererCallbacks)
+    mock.histogram.return_value = Histogram(temp_volume_data.tonumpy())
+    return mock
 
 @pytest.fixture
 def mock_volume():
@@ -240,3 +243,24 @@ def temp_tdr_file_path(tmp_path, temp_dcs_file_path, mask_data):
     tdr = loader.generate_tdr(tdr_dict)
     tdr.write(str(temp_tdr_file))
     return str(temp_tdr_file)
+
+@pytest.fixture
+def temp_dcm_series_path(tmp_path, volume_data):
+    """
+    Create a folder of per-slice DICOM files for testing, written in a shuffled order, with a slice of another series
+
+    Args:
+        tmp_path (Path): Temporary directory path
+        volume_data (np.ndarray): Volume data whose z slices are written to the DICOM files
+
+    Returns:
+        str: The path to a slice of the series
+    """
+    folder = tmp_path / "series"
+    folder.mkdir()
+    order = np.random.default_rng(0).permutation(volume_data.shape[2])
+    for n, z in enumerate(order):
+        write_dicom_slice(str(folder / f"IM{n:04d}.dcm"), volume_data[:, :, z], "1.2.3.4", (-10, -20, 100 + 2.5 * z),
+                          instance=z + 1, pixel_spacing=(0.7, 0.5), intercept=-1024)
+    write_dicom_slice(str(folder / "scout.dcm"), volume_data[:, :, 0], "1.2.3.5", (0, 0, 0))
+    return str(folder / "IM0000.dcm")
@@ -0,0 +1,68 @@
+import struct
+
+import numpy as np
+
+EXPLICIT_VR_LITTLE_ENDIAN = "1.2.840.10008.1.2.1"
+CT_IMAGE_STORAGE = "1.2.840.10008.5.1.4.1.1.2"
+
+
+def data_element(group, element, vr, value):
+    """
+    Encode a data element in the explicit VR little endian transfer syntax.
+
+    Args:
+        group (int): The group of the tag.
+        element (int): The element of the tag.
+        vr (str): The value representation.
+        value (str | int | bytes): The value, a string for the text VRs, an int for US, bytes otherwise.
+
+    Returns:
+        bytes: The encoded element.
+    """
+    if vr == "US":
+        value = struct.pack("<H", value)
+    elif isinstance(value, str):
+        value = value.encode("latin-1")
+    if len(value) % 2:
+        value += b"\x00" if vr in ("UI", "OB") else b" "
+    if vr in ("OB", "OW", "UN"):
+        return struct.pack("<HH2sHI", group, element, vr.encode(), 0, len(value)) + value
+    return struct.pack("<HH2sH", group, element, vr.encode(), len(value)) + value
+
+
+def write_dicom_slice(path, pixels, series_uid, position, instance=1, pixel_spacing=(1.0, 1.0), slope=1, intercept=0):
+    """
+    Write a minimal uncompressed CT slice, as a scanner writes one file per slice.
+
+    Args:
+        path (str): The path to the DICOM file.
+        pixels (np.ndarray): The uint16 or int16 pixels of the slice, indexed as [x, y].
+        series_uid (str): The SeriesInstanceUID of the slice.
+        position (tuple): The ImagePositionPatient of the slice.
+        instance (int): The InstanceNumber of the slice.
+        pixel_spacing (tuple): The (row, column) PixelSpacing, i.e. the (y, x) spacing.
+        slope (float): The RescaleSlope.
+        intercept (float): The RescaleIntercept.
+    """
+    columns, rows = pixels.shape
+    elements = [
+        data_element(0x0002, 0x0010, "UI", EXPLICIT_VR_LITTLE_ENDIAN),
+        data_element(0x0008, 0x0016, "UI", CT_IMAGE_STORAGE),
+        data_element(0x0008, 0x0060, "CS", "CT"),
+        data_element(0x0020, 0x000E, "UI", series_uid),
+        data_element(0x0020, 0x0013, "IS", str(instance)),
+        data_element(0x0020, 0x0032, "DS", "\\".join(f"{p:g}" for p in position)),
+        data_element(0x0020, 0x0037, "DS", "1\\0\\0\\0\\1\\0"),
+        data_element(0x0028, 0x0002, "US", 1),
+        data_element(0x0028, 0x0010, "US", rows),
+        data_element(0x0028, 0x0011, "US", columns),
+        data_element(0x0028, 0x0030, "DS", "\\".join(f"{s:g}" for s in pixel_spacing)),
+        data_element(0x0028, 0x0100, "US", 16),
+        data_element(0x0028, 0x0103, "US", int(pixels.dtype == np.int16)),
+        data_element(0x0028, 0x1052, "DS", f"{intercept:g}"),
+        data_element(0x0028, 0x1053, "DS", f"{slope:g}"),
+        # the rows of the pixel data are stored one after the other, the columns running fastest
+        data_element(0x7FE0, 0x0010, "OW", np.ascontiguousarray(pixels.T).astype("<u2" if pixels.dtype == np.uint16 else "<i2").tobytes()),
+    ]
+    with open(path, "wb") as file:
+        file.write(b"\x00" * 128 + b"DICM" + b"".join(elements))
@@ -0,0 +1,41 @@
+import pytest
+
+from ctviewer.io import Reader
+from ctviewer.gui.volume_loader import VolumeLoader
+from ctviewer.gui.prefetcher import Prefetcher
+
+@pytest.fixture
+def prefetcher(qtbot):
+    """ Create a Prefetcher instance for testing. """
+    prefetcher = Prefetcher(VolumeLoader(Reader()))
+    yield prefetcher
+    prefetcher.cancel()
+    prefetcher.loader.wait()
+
+def test_prefetch(qtbot, prefetcher, temp_mhd_path, temp_npy_path):
+    """ Test that the neighbouring volumes are decoded into the prefetch cache. """
+    prefetcher.prefetch([temp_mhd_path, temp_npy_path])
+    prefetcher.loader.wait()
+    assert len(prefetcher.loader.reader.prefetch_cache) == 2
+
+def test_prefetch_hit_rate(qtbot, prefetcher, temp_mhd_path):
+    """ Test that loading a prefetched volume counts as a hit. """
+    prefetcher.prefetch([temp_mhd_path])
+    prefetcher.loader.wait()
+    with qtbot.waitSignal(prefetcher.loader.loaded, timeout=10000):
+        prefetcher.loader.load(temp_mhd_path)
+    assert prefetcher.hit_rate() == 1.0
+
+def test_cancel(qtbot, prefetcher, temp_mhd_path):
+    """ Test that cancelled prefetch requests are dropped. """
+    prefetcher.prefetch([temp_mhd_path])
+    prefetcher.cancel()
+    prefetcher.loader.wait()
+    assert len(prefetcher.loader.reader.prefetch_cache) <= 1
+
+def test_prefetch_failed(qtbot, prefetcher, tmp_path):
+    """ Test that decoding errors are reported through the failed signal. """
+    path = str(tmp_path / "missing.mhd")
+    with qtbot.waitSignal(prefetcher.failed, timeout=10000) as blocker:
+        prefetcher.prefetch([path])
+    assert blocker.args[0] == path
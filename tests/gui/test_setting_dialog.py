@@ -1,3 +1,4 @@
+import os
 import pytest
 from PyQt6 import QtCore
 from pytestqt.plugin import QtBot
@@ -66,6 +67,7 @@ def test_getters(dialog):
     assert dialog.get_ogb_cmap() == config['ogb_cmap']
     assert dialog.get_alpha_weights() == config['alpha_weights']
     assert dialog.get_exts() == tuple(config['exts'])
+    assert dialog.get_thumbnail_settings() == (os.path.expanduser(config['thumbnail_index']) or None, config['thumbnail_size'])
     assert dialog.get_mask_classes() == config['mask_classes']
     assert dialog.get_user_config() == config
     assert dialog.get_config_manager() == dialog.config_manager
@@ -74,5 +76,15 @@ def test_getters(dialog):
     assert dialog.get_current_config() == {
         'ogb': dialog.ogb,
         'alpha': dialog.alpha,
-        'mask_classes': dialog.get_mask_classes()
+        'mask_classes': dialog.get_mask_classes(),
+        'isovalue': dialog.isovalue,
+        'cache_size_mb': config.get('cache_size_mb', 1024),
+        'prefetch_size_mb': config.get('prefetch_size_mb', 1024),
+        'disk_cache_dir': config.get('disk_cache_dir', ""),
+        'disk_cache_size_mb': config.get('disk_cache_size_mb', 10240),
+        'pyramid_min_voxels': config.get('pyramid_min_voxels', 256**3),
+        'lod_frame_time': config.get('lod_frame_time', 0.05),
+        'iso_mesh': config.get('iso_mesh', False),
+        'iso_decimation': config.get('iso_decimation', 2),
+        'iso_cache_size_mb': config.get('iso_cache_size_mb', 256),
     }
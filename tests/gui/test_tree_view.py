@@ -75,4 +75,69 @@ def test_set_folder(qtbot, tmp_path, tree_view_components):
     # Test setting the folder
     tree_view.set_folder(str(temp_folder))
     assert tree_view.data_path == str(temp_folder)
-    # assert tree_view.fileSystemModel.rootPath() == new_folder # TODO: This assertion fails because the root path is not updated.
\ No newline at end of file
+    # assert tree_view.fileSystemModel.rootPath() == new_folder # TODO: This assertion fails because the root path is not updated.
+def test_neighbour_files(qtbot, tmp_path, tree_view_components):
+    """ Test that the neighbouring volume files follow the model ordering. """
+    tree_view, _ = tree_view_components
+    for name in ["a.mhd", "b.mhd", "c.mhd", "d.mhd", "e.txt"]:
+        (tmp_path / name).write_text("")
+    tree_view.set_folder(str(tmp_path))
+    root_index = tree_view.fileSystemModel.index(str(tmp_path))
+    qtbot.waitUntil(lambda: tree_view.fileSystemModel.rowCount(root_index) == 4, timeout=5000)
+    tree_view.fileSystemModel.sort(0)
+    index = tree_view.fileSystemModel.index(str(tmp_path / "b.mhd"))
+    neighbours = tree_view.neighbour_files(index, 2, 1)
+    assert neighbours == [str(tmp_path / "c.mhd"), str(tmp_path / "a.mhd"), str(tmp_path / "d.mhd")]
+
+def test_thumbnails(qtbot, main_window, tmp_path, temp_mhd_path):
+    """ Test that the volume files are decorated with their thumbnail once it is computed. """
+    from ctviewer.gui.thumbnailer import Thumbnailer
+    window, layout = main_window
+    thumbnailer = Thumbnailer(str(tmp_path / "thumbnails.sqlite"), 16)
+    tree_view = TreeView(window, layout, ["mhd"], lambda x: x, thumbnailer=thumbnailer)
+    model = tree_view.fileSystemModel
+    index = model.index(temp_mhd_path)
+    with qtbot.waitSignal(thumbnailer.ready, timeout=10000):
+        model.data(index, Qt.ItemDataRole.DecorationRole)
+    assert not model.data(index, Qt.ItemDataRole.DecorationRole).isNull()
+    assert thumbnailer.index.get(temp_mhd_path) is not None
+    thumbnailer.wait()
+
+def test_thumbnail_failed(qtbot, tmp_path):
+    """ Test that the thumbnailing errors are reported through the failed signal. """
+    from ctviewer.gui.thumbnailer import Thumbnailer
+    thumbnailer = Thumbnailer(str(tmp_path / "thumbnails.sqlite"), 16)
+    path = str(tmp_path / "missing.mhd")
+    with qtbot.waitSignal(thumbnailer.failed, timeout=10000) as blocker:
+        assert thumbnailer.icon(path) is None
+    assert blocker.args[0] == path
+    assert thumbnailer.icon(path) is None
+    thumbnailer.wait()
+
+def test_click_latency(qtbot, tmp_path, tree_view_components):
+    """ Test that a click loads the volume file without resetting the view, and that its latency is recorded. """
+    tree_view, _ = tree_view_components
+    (tmp_path / "a.mhd").write_text("")
+    tree_view.set_folder(str(tmp_path))
+    index = tree_view.fileSystemModel.index(str(tmp_path / "a.mhd"))
+    root_index = tree_view.rootIndex()
+    tree_view.refreshTreeView = lambda: pytest.fail("the view was refreshed on a click")
+    tree_view.treeItemClicked(index)
+    assert tree_view.rootIndex() == root_index
+    assert tree_view.volumeDisplayed(str(tmp_path / "b.mhd")) is None
+    assert tree_view.volumeDisplayed(str(tmp_path / "a.mhd")) >= 0
+    assert len(tree_view.click_latencies) == 1
+
+def test_reload_tree_view(qtbot, tmp_path, tree_view_components):
+    """ Test that reloading lists the current folder again in a new model. """
+    tree_view, _ = tree_view_components
+    (tmp_path / "a.mhd").write_text("")
+    tree_view.set_folder(str(tmp_path))
+    model = tree_view.fileSystemModel
+    (tmp_path / "b.mhd").write_text("")
+    tree_view.reloadTreeView()
+    assert tree_view.fileSystemModel is not model
+    assert tree_view.model() is tree_view.fileSystemModel
+    assert tree_view.fileSystemModel.filePath(tree_view.rootIndex()) == str(tmp_path)
+    root_index = tree_view.rootIndex()
+    qtbot.waitUntil(lambda: tree_view.fileSystemModel.rowCount(root_index) == 2, timeout=5000)
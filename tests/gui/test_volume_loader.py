@@ -0,0 +1,77 @@
+import pytest
+from vedo import Volume
+
+from ctviewer.io import Reader
+from ctviewer.gui.volume_loader import VolumeLoader
+
+@pytest.fixture
+def loader(qtbot):
+    """ Create a VolumeLoader instance for testing. """
+    loader = VolumeLoader(Reader())
+    yield loader
+    loader.cancel()
+    loader.wait()
+
+def test_load(qtbot, loader, temp_mhd_path):
+    """ Test that a volume is decoded in the background and handed back. """
+    with qtbot.waitSignal(loader.loaded, timeout=10000) as blocker:
+        loader.load(temp_mhd_path)
+    path, volume, properties = blocker.args
+    assert path == temp_mhd_path
+    assert isinstance(volume, Volume)
+    assert properties["is_mask"] is False
+    assert not loader.is_loading()
+
+def test_load_supersedes(qtbot, loader, temp_mhd_path, temp_npy_path):
+    """ Test that only the latest load request is delivered. """
+    paths = []
+    loader.loaded.connect(lambda path, volume, properties: paths.append(path))
+    loader.load(temp_mhd_path)
+    with qtbot.waitSignal(loader.loaded, timeout=10000):
+        loader.load(temp_npy_path)
+    loader.wait()
+    qtbot.wait(50)
+    assert paths == [temp_npy_path]
+
+def test_load_failed(qtbot, loader, tmp_path):
+    """ Test that decoding errors are reported through the failed signal. """
+    with qtbot.waitSignal(loader.failed, timeout=10000) as blocker:
+        loader.load(str(tmp_path / "missing.mhd"))
+    assert blocker.args[0] == str(tmp_path / "missing.mhd")
+
+def test_cancel(qtbot, loader, temp_mhd_path):
+    """ Test that a cancelled load is not delivered. """
+    paths = []
+    loader.loaded.connect(lambda path, volume, properties: paths.append(path))
+    loader.load(temp_mhd_path)
+    loader.cancel()
+    loader.wait()
+    qtbot.wait(50)
+    assert paths == []
+    assert not loader.is_loading()
+
+def test_load_histogram_cached(qtbot, loader, temp_mhd_path):
+    """ Test that reloading a cached volume reuses its histogram. """
+    histograms = []
+    for _ in range(2):
+        with qtbot.waitSignal(loader.loaded, timeout=10000) as blocker:
+            loader.load(temp_mhd_path)
+        histograms.append(blocker.args[2]["histogram"])
+    assert histograms[1] is histograms[0]
+    assert "histogram" not in loader.reader.properties
+
+def test_load_pyramid(qtbot, temp_mhd_path):
+    """ Test that large volumes are handed over with their downsampled levels, built once per cached volume. """
+    loader = VolumeLoader(Reader(), pyramid_min_voxels=1)
+    with qtbot.waitSignal(loader.loaded, timeout=10000) as blocker:
+        loader.load(temp_mhd_path)
+    _, volume, properties = blocker.args
+    assert properties["pyramid"].levels[-1][1] is volume
+    assert "pyramid" not in loader.reader.properties
+    with qtbot.waitSignal(loader.loaded, timeout=10000) as blocker:
+        loader.load(temp_mhd_path)
+    assert blocker.args[2]["pyramid"] is properties["pyramid"]
+    # the downsampled levels and the histogram are charged to the cache budget
+    reader = loader.reader
+    assert reader.cache.nbytes == reader.get_nbytes(volume) + properties["pyramid"].nbytes + properties["histogram"].nbytes
+    assert properties["histogram"].range == tuple(volume.scalar_range())
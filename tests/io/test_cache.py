@@ -0,0 +1,58 @@
+import os
+from ctviewer.io import VolumeCache
+
+def test_make_key(temp_npy_path):
+    """ Test that the key changes when the file is modified. """
+    key = VolumeCache.make_key(temp_npy_path)
+    assert key[0] == os.path.abspath(temp_npy_path)
+    stat = os.stat(temp_npy_path)
+    os.utime(temp_npy_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert VolumeCache.make_key(temp_npy_path) != key
+
+def test_get_put():
+    """ Test the hit and miss counters. """
+    cache = VolumeCache(100)
+    assert cache.get("a") is None
+    assert cache.put("a", 1, 10)
+    assert cache.get("a") == 1
+    assert cache.stats() == {"hits": 1, "misses": 1, "evictions": 0, "entries": 1, "nbytes": 10, "max_bytes": 100}
+
+def test_lru_eviction():
+    """ Test that the least recently used entries are evicted first. """
+    cache = VolumeCache(100)
+    cache.put("a", 1, 40)
+    cache.put("b", 2, 40)
+    cache.get("a")
+    cache.put("c", 3, 40)
+    assert "a" in cache and "c" in cache
+    assert "b" not in cache
+    assert cache.evictions == 1
+    assert cache.nbytes == 80
+
+def test_charge():
+    """ Test that charging an entry grows its size and evicts the least recently used entries. """
+    cache = VolumeCache(100)
+    cache.put("a", 1, 40)
+    cache.put("b", 2, 40)
+    assert cache.charge("a", 30) is True
+    assert "b" not in cache and cache.nbytes == 70
+    assert cache.charge("b", 10) is False
+    assert cache.charge("a", 40) is False
+    assert len(cache) == 0 and cache.nbytes == 0
+
+def test_oversized_entry():
+    """ Test that entries larger than the budget are not cached. """
+    cache = VolumeCache(100)
+    cache.put("a", 1, 40)
+    assert not cache.put("b", 2, 200)
+    assert "b" not in cache and "a" in cache
+
+def test_pop_and_clear():
+    """ Test removing entries. """
+    cache = VolumeCache(100)
+    cache.put("a", 1, 40)
+    assert cache.pop("a") == 1
+    assert cache.pop("a") is None
+    cache.put("b", 2, 40)
+    cache.clear()
+    assert len(cache) == 0 and cache.nbytes == 0
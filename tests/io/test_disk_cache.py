@@ -0,0 +1,99 @@
+import gc
+import os
+import shutil
+import weakref
+import numpy as np
+from ctviewer.io import DiskCache, Reader
+from ctviewer.io.disk_cache import _flush_open_caches, main
+
+def test_digest(tmp_path, temp_mhd_path):
+    """ Test that the content hash covers the data file of a MetaImage header and is memoized. """
+    cache = DiskCache(str(tmp_path / "cache"), 10 ** 8)
+    assert len(DiskCache.content_files(temp_mhd_path)) == 2
+    digest = cache.digest(temp_mhd_path)
+    assert len(cache._index) == 1
+    # a copy has the same content, hence the same entry
+    copy_dir = tmp_path / "copy"
+    copy_dir.mkdir()
+    for path in DiskCache.content_files(temp_mhd_path):
+        shutil.copy(path, copy_dir)
+    assert cache.digest(str(copy_dir / os.path.basename(temp_mhd_path))) == digest
+    cache.flush()
+    assert DiskCache(str(tmp_path / "cache"), 10 ** 8)._index == cache._index
+
+def test_index_writes(tmp_path, temp_mhd_path, temp_npy_path):
+    """ Test that the memoized hashes are written in batches and that those of deleted or modified files are dropped. """
+    cache = DiskCache(str(tmp_path / "cache"), 10 ** 8)
+    cache.digest(temp_mhd_path)
+    index_path = tmp_path / "cache" / DiskCache.INDEX
+    written = index_path.stat().st_mtime_ns
+    cache.digest(temp_npy_path)
+    assert index_path.stat().st_mtime_ns == written and len(cache._index) == 2
+    cache.flush()
+    assert len(DiskCache(str(tmp_path / "cache"), 10 ** 8)._index) == 2
+    os.remove(temp_npy_path)
+    with open(temp_mhd_path, "a") as f:
+        f.write("\n")
+    assert DiskCache(str(tmp_path / "cache"), 10 ** 8)._index == {}
+
+def test_flush_at_exit(tmp_path, temp_mhd_path, temp_npy_path):
+    """ Test that the open caches are flushed by the exit handler, which does not keep them alive. """
+    cache = DiskCache(str(tmp_path / "cache"), 10 ** 8)
+    cache.INDEX_WRITE_INTERVAL = 3600
+    cache.digest(temp_mhd_path)
+    cache.digest(temp_npy_path)
+    _flush_open_caches()
+    assert len(DiskCache(str(tmp_path / "cache"), 10 ** 8)._index) == 2
+    ref = weakref.ref(cache)
+    del cache
+    gc.collect()
+    assert ref() is None
+
+def test_read_through(tmp_path, temp_mask_path):
+    """ Test that a second reader maps the decoded copy instead of decoding the file. """
+    cache_dir = str(tmp_path / "cache")
+    reader = Reader(disk_cache_dir=cache_dir)
+    volume, properties = reader(temp_mask_path)
+    assert reader.disk_cache.misses == 1 and len(reader.disk_cache.entries()) == 1
+
+    other = Reader(disk_cache_dir=cache_dir)
+    other.read = None  # a hit never decodes
+    cached_volume, cached_properties = other(temp_mask_path)
+    assert other.disk_cache.hits == 1
+    assert np.array_equal(cached_volume.tonumpy(), volume.tonumpy())
+    assert np.array_equal(cached_volume.spacing(), volume.spacing())
+    assert cached_properties["labels"] == properties["labels"]
+    assert all(np.array_equal(a, b) for a, b in zip(cached_properties["poses"], properties["poses"]))
+    assert cached_properties["spacing"] == properties["spacing"]
+
+def test_npy_not_cached(tmp_path, temp_npy_path):
+    """ Test that .npy files, already memory-mapped, are not copied to the disk cache. """
+    reader = Reader(disk_cache_dir=str(tmp_path / "cache"))
+    reader(temp_npy_path)
+    assert reader.disk_cache.entries() == []
+
+def test_eviction(tmp_path, temp_mhd_path, temp_mask_path):
+    """ Test that the least recently used entries are evicted to respect the budget. """
+    reader = Reader(cache_size_mb=0, disk_cache_dir=str(tmp_path / "cache"))
+    reader(temp_mhd_path)
+    reader.disk_cache.max_bytes = reader.disk_cache.nbytes() + 1
+    reader.reset_properties()
+    reader(temp_mask_path)
+    entries = reader.disk_cache.entries()
+    assert len(entries) == 1
+    assert entries[0][2] == reader.disk_cache.digest(temp_mask_path)
+
+def test_eviction_locked_entry(tmp_path, temp_mhd_path, monkeypatch):
+    """ Test that an entry that cannot be deleted, e.g. mapped on Windows, does not fail the eviction. """
+    cache = DiskCache(str(tmp_path / "cache"), 0)
+    (tmp_path / "cache" / "locked.npy").write_bytes(b"0" * 16)
+    def unlink(path):
+        raise PermissionError(path)
+    monkeypatch.setattr(os, "unlink", unlink)
+    assert cache.evict() == 1
+
+def test_warm(tmp_path, temp_mhd_path, temp_mask_path):
+    """ Test warming the cache for a folder from the command line. """
+    cache_dir = str(tmp_path / "cache")
+    assert main(["--warm", os.path.dirname(temp_mhd_path), "--cache-dir", cache_dir]) == 0
+    assert len(DiskCache(cache_dir, 10 ** 9).entries()) == 2
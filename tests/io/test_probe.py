@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from ctviewer.io import Reader
+from ctviewer.io.dicom import read_tags
+
+def test_probe_npy(temp_npy_path, volume_data):
+    """ Test probing the header of a .npy file. """
+    info = Reader.probe(temp_npy_path)
+    assert info["dims"] == volume_data.shape
+    assert info["dtype"] == "uint16"
+    assert info["nbytes"] == volume_data.nbytes
+    assert info["is_mask"] is False and info["is_proj"] is False and info["is_tdr"] is False
+
+def test_probe_mhd(temp_mhd_path, temp_mask_path):
+    """ Test probing the header of .mhd volumes and masks. """
+    info = Reader.probe(temp_mhd_path)
+    volume, _ = Reader()(temp_mhd_path)
+    assert info["dims"] == tuple(volume.dimensions())
+    assert info["spacing"] == tuple(volume.spacing())
+    assert info["dtype"] == volume.tonumpy().dtype.name
+    assert info["is_mask"] is False
+    assert Reader.probe(temp_mask_path)["is_mask"] is True
+
+def test_probe_dcs(temp_dcs_file_path, volume_data):
+    """ Test probing the tags of a DICOS CT file. """
+    info = Reader.probe(temp_dcs_file_path)
+    assert info["modality"] == "CT"
+    assert info["dims"] == volume_data.shape
+    assert info["dtype"] == "uint16"
+    assert info["is_tdr"] is False and info["is_proj"] is False
+
+def test_probe_tdr(temp_tdr_file_path):
+    """ Test probing a TDR file, whose dims are those of the rasterized PTOs. """
+    info = Reader.probe(temp_tdr_file_path)
+    volume, _ = Reader()(temp_tdr_file_path)
+    assert info["modality"] == "TDR"
+    assert info["is_tdr"] is True and info["is_mask"] is True
+    assert info["dims"] == tuple(volume.dimensions())
+    assert info["nbytes"] == volume.tonumpy().nbytes
+
+def test_read_tags_stops_at_pixel_data(temp_dcs_file_path):
+    """ Test that the tag walker does not read the pixel data. """
+    tags = read_tags(temp_dcs_file_path)
+    assert tags[(0x0008, 0x0060)] == "CT"
+    assert (0x7FE0, 0x0010) not in tags
+
+def test_probe_invalid(tmp_path):
+    """ Test that unsupported and invalid files raise a ValueError. """
+    with pytest.raises(ValueError):
+        Reader.probe(str(tmp_path / "volume.raw"))
+    (tmp_path / "volume.dcs").write_bytes(b"\0" * 256)
+    with pytest.raises(ValueError):
+        Reader.probe(str(tmp_path / "volume.dcs"))
+
+def test_prefetch_too_large(temp_npy_path):
+    """ Test that volumes larger than the prefetch budget are not decoded. """
+    reader = Reader(prefetch_size_mb=0)
+    assert reader.prefetch(temp_npy_path) is False
+    assert len(reader.prefetch_cache) == 0
+
+def test_probe_dicom_series(temp_dcm_series_path):
+    """ Test that probing a .dcm slice gives the metadata of its assembled series. """
+    info = Reader.probe(temp_dcm_series_path)
+    volume, properties = Reader()(temp_dcm_series_path)
+    assert info["dims"] == tuple(volume.dimensions())
+    assert info["spacing"] == tuple(properties["spacing"])
+    assert info["is_proj"] is properties["is_proj"] is False
+    assert info["nbytes"] >= volume.tonumpy().nbytes
+    scout = Reader.probe(temp_dcm_series_path.replace("IM0000", "scout"))
+    assert scout["dims"] == (50, 50, 1) and scout["is_proj"] is False
@@ -0,0 +1,36 @@
+import itertools
+import numpy as np
+from vedo import Volume
+from ctviewer.io.pyramid import VolumePyramid, mean_pool_3d
+
+def test_mean_pool_3d():
+    """ Test the threaded 2x2x2 block average on odd dimensions. """
+    data = np.random.default_rng(0).integers(0, 4000, (21, 16, 13), dtype=np.uint16)
+    pooled = mean_pool_3d(data, workers=3, chunk=4)
+    assert pooled.shape == (11, 8, 7) and pooled.dtype == data.dtype and pooled.flags.f_contiguous
+    sums, counts = np.zeros(pooled.shape), np.zeros(pooled.shape)
+    for i, j, k in itertools.product(range(2), repeat=3):
+        block = data[i::2, j::2, k::2].astype(float)
+        sums[:block.shape[0], :block.shape[1], :block.shape[2]] += block
+        counts[:block.shape[0], :block.shape[1], :block.shape[2]] += 1
+    assert np.array_equal(pooled, np.rint(sums / counts))
+
+def test_volume_pyramid(volume_data):
+    """ Test that the levels go from the coarsest to the full resolution with the same bounds. """
+    volume = Volume(volume_data).spacing((0.5, 0.5, 2))
+    pyramid = VolumePyramid(volume)
+    assert [factor for factor, _ in pyramid.levels] == [8, 4, 2, 1]
+    assert pyramid.levels[-1][1] is volume
+    assert tuple(pyramid.levels[0][1].dimensions()) == (7, 7, 7)
+    assert np.allclose(pyramid.levels[0][1].spacing(), (4, 4, 16))
+    assert np.allclose(pyramid.levels[2][1].center(), volume.center())
+    assert sorted(pyramid.build_times) == [2, 4, 8]
+
+def test_volume_pyramid_needed(volume_data):
+    """ Test that only large intensity volumes get a pyramid. """
+    properties = {"is_mask": False, "is_proj": False}
+    volume = Volume(volume_data)
+    assert VolumePyramid.needed(volume, properties, volume_data.size)
+    assert not VolumePyramid.needed(volume, properties, volume_data.size + 1)
+    assert not VolumePyramid.needed(volume, properties, 0)
+    assert not VolumePyramid.needed(volume, {"is_mask": True, "is_proj": False}, 1)
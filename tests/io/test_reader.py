@@ -1,5 +1,6 @@
 import numpy as np
 from vedo import Volume
+from ctviewer.io import Reader
 
 def test_initialization(mock_reader):
     """ Test the initialization of the Reader object. """
@@ -77,3 +78,94 @@ def test_reset_properties(mock_reader):
         "flag_poses": [],
         "labels": []
     }
+
+def test_read_cached(mock_reader, temp_mhd_path):
+    """ Test that reading the same unchanged file twice is served from the cache """
+    volume, properties = mock_reader(temp_mhd_path)
+    mock_reader.reset_properties()
+    cached_volume, cached_properties = mock_reader(temp_mhd_path)
+    assert cached_volume is volume
+    assert cached_properties is not properties
+    assert np.array_equal(cached_properties["spacing"], properties["spacing"])
+    assert mock_reader.cache.hits == 1
+    assert mock_reader.cache.misses == 1
+
+def test_read_cached_derived(mock_reader, temp_mhd_path, temp_npy_path):
+    """ Test that the data derived from a volume is kept with its cache entry, and not shared with other volumes """
+    mock_reader(temp_mhd_path)
+    mock_reader.derived["histogram"] = derived = object()
+    mock_reader(temp_npy_path)
+    assert mock_reader.derived == {}
+    mock_reader(temp_mhd_path)
+    assert mock_reader.derived["histogram"] is derived
+
+def test_read_cache_disabled(temp_mhd_path):
+    """ Test that a zero budget disables the cache """
+    reader = Reader(cache_size_mb=0)
+    volume, _ = reader(temp_mhd_path)
+    assert reader(temp_mhd_path)[0] is not volume
+    assert len(reader.cache) == 0
+
+def test_prefetch(mock_reader, temp_mhd_path, temp_npy_path):
+    """ Test that a prefetched volume is served without decoding it again """
+    mock_reader(temp_npy_path)
+    properties = mock_reader.properties
+    assert mock_reader.prefetch(temp_mhd_path) is True
+    assert mock_reader.prefetch(temp_mhd_path) is False
+    assert mock_reader.properties is properties
+    volume, _ = mock_reader(temp_mhd_path)
+    assert mock_reader.prefetch_cache.hits == 1
+    assert mock_reader.prefetch_cache.hit_rate() == 0.5
+    assert len(mock_reader.prefetch_cache) == 0
+    assert mock_reader(temp_mhd_path)[0] is volume
+
+def test_array_to_volume(volume_data):
+    """ Test that Fortran-ordered arrays are shared with VTK without a copy """
+    fortran_data = np.asfortranarray(volume_data)
+    volume = Reader.array_to_volume(fortran_data)
+    assert np.shares_memory(volume.tonumpy(), fortran_data)
+    assert np.array_equal(volume.tonumpy(), volume_data)
+    volume = Reader.array_to_volume(volume_data)
+    assert not np.shares_memory(volume.tonumpy(), volume_data)
+    assert np.array_equal(volume.tonumpy(), volume_data)
+
+def test_read_npy_fortran(mock_reader, tmp_path, volume_data):
+    """ Test reading a memory-mapped .npy file saved in Fortran order """
+    path = str(tmp_path / "fortran_volume.npy")
+    np.save(path, np.asfortranarray(volume_data))
+    volume, _ = mock_reader(path)
+    assert np.array_equal(volume.tonumpy(), volume_data)
+
+def test_read_tdr_label_ids(mock_reader):
+    """ Test that each PTO is rasterized with its own label id """
+    metadata_dict = {
+        "PTOs": [
+            {"Base": {"x": 0, "y": 0, "z": 0}, "Extent": {"x": 2, "y": 2, "z": 2}, "Bitmap": np.ones((2, 2, 2), dtype=np.uint8)},
+            {"Base": {"x": 4, "y": 4, "z": 4}, "Extent": {"x": 2, "y": 2, "z": 2}, "Bitmap": np.eye(2)[None].repeat(2, axis=0)},
+        ]
+    }
+    mask = mock_reader.Read_TDR_data(metadata_dict)
+    assert mask.shape == (6, 6, 6)
+    assert mask.dtype == np.uint8
+    assert np.all(mask[0:2, 0:2, 0:2] == 1)
+    assert np.array_equal(mask[4:6, 4:6, 4:6], 2 * np.eye(2)[None].repeat(2, axis=0))
+    assert np.count_nonzero(mask) == 8 + 4
+    assert mock_reader.properties["labels"] == ["Threat", "Threat"]
+    assert np.array_equal(mock_reader.properties["poses"][1], [4, 6, 4, 6, 4, 6])
+    assert np.array_equal(mock_reader.properties["flag_poses"][1], [5, 5, 6])
+
+def test_read_tdr_many_ptos(mock_reader):
+    """ Test that more than 255 PTOs keep distinct label ids """
+    PTOs = [{"Base": {"x": 0, "y": 0, "z": i}, "Extent": {"x": 1, "y": 1, "z": 1}, "Bitmap": np.ones((1, 1, 1), dtype=np.bool_)} for i in range(300)]
+    mask = mock_reader.Read_TDR_data({"PTOs": PTOs})
+    assert mask.dtype == np.uint16
+    assert np.array_equal(mask[:, 0, 0], np.arange(1, 301))
+
+def test_read_mask_label_map(mock_reader, tmp_path, mask_data):
+    """ Test that the class masks are cast to uint8 labels """
+    path = str(tmp_path / "mask16.mhd")
+    Volume(mask_data.astype(np.int16)).write(path)
+    volume, properties = mock_reader(path)
+    assert properties["is_mask"] == True
+    assert volume.tonumpy().dtype == np.uint8
+    np.testing.assert_array_equal(volume.tonumpy(), mask_data)
@@ -0,0 +1,19 @@
+import os
+
+from ctviewer.io.scanner import FolderScanner, find_volumes
+
+def make_tree(root):
+    """ Create a folder tree with volume files of several extensions and other files. """
+    for path in ("a/scan.nii.gz", "a/b/scan.mhd", "a/b/scan.zraw", "c/scan.dcm", "notes.txt", "scan.nii"):
+        os.makedirs(os.path.dirname(root / path), exist_ok=True)
+        (root / path).write_bytes(b"")
+
+def test_scan(tmp_path):
+    """ Test that a single walk finds the volume files of every extension, compound ones included. """
+    make_tree(tmp_path)
+    expected = [str(tmp_path / p) for p in ("a/b/scan.mhd", "a/scan.nii.gz", "c/scan.dcm")]
+    assert find_volumes(str(tmp_path), ["dcm", "nii.gz", "mhd"]) == expected
+    scanner = FolderScanner(["dcs"])
+    assert scanner.scan(str(tmp_path)) == []
+    assert scanner.has_volumes(str(tmp_path)) is False
+    assert FolderScanner(["mhd"]).has_volumes(str(tmp_path)) is True
@@ -0,0 +1,92 @@
+import os
+
+import numpy as np
+from ctviewer.io import Reader
+from ctviewer.io import series as series_module
+from ctviewer.io.series import find_series, first_slices, load_series, rescale
+
+def test_find_series(temp_dcm_series_path):
+    """ Test that the slices of the series are grouped by UID and sorted by position. """
+    headers = find_series(temp_dcm_series_path)
+    assert len(headers) == 50
+    assert [header["position"][2] for header in headers] == [100 + 2.5 * z for z in range(50)]
+
+def test_find_series_memoized(temp_dcm_series_path, monkeypatch):
+    """ Test that finding a series again only reads the headers of the requested slice and of the modified slices. """
+    find_series(temp_dcm_series_path)
+    read_paths = []
+    read_slice_header = series_module.read_slice_header
+    monkeypatch.setattr(series_module, "read_slice_header", lambda path: read_paths.append(path) or read_slice_header(path))
+    other = temp_dcm_series_path.replace("IM0000", "IM0007")
+    assert len(find_series(other)) == 50
+    assert read_paths == [other]
+    stat = os.stat(temp_dcm_series_path)
+    os.utime(temp_dcm_series_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    read_paths.clear()
+    assert len(find_series(other)) == 50
+    assert sorted(read_paths) == sorted([other, temp_dcm_series_path])
+
+def test_load_series(temp_dcm_series_path, volume_data):
+    """ Test that the slices are stacked in position order and rescaled. """
+    voxels, spacing, origin = load_series(find_series(temp_dcm_series_path), workers=4)
+    assert voxels.dtype == np.int16 and voxels.flags.f_contiguous
+    assert np.array_equal(voxels, volume_data.astype(np.int16) - 1024)
+    assert spacing == (0.5, 0.7, 2.5)
+    assert origin == (-10, -20, 100)
+
+def test_rescale():
+    """ Test that the rescaled voxels get the narrowest type holding them. """
+    raw = np.asfortranarray(np.arange(24, dtype=np.uint16).reshape(2, 3, 4) * 2000)
+    assert rescale(raw, np.ones(4), np.zeros(4)) is raw
+    assert rescale(raw, np.ones(4), np.full(4, -1024.0)).dtype == np.int32
+    scaled = rescale(raw, np.array([1, 2, 1, 1]), np.full(4, -1.0))
+    assert np.array_equal(scaled[:, :, 1], raw[:, :, 1].astype(np.int64) * 2 - 1)
+    assert rescale(raw, np.full(4, 0.5), np.zeros(4)).dtype == np.float32
+
+def test_read_series(temp_dcm_series_path, volume_data):
+    """ Test that every slice of a series opens the same cached volume. """
+    reader = Reader()
+    volume, properties = reader(temp_dcm_series_path)
+    assert volume.dimensions().tolist() == [50, 50, 50]
+    assert np.array_equal(volume.tonumpy(), volume_data.astype(np.int16) - 1024)
+    assert tuple(properties["spacing"]) == (0.5, 0.7, 2.5)
+    other = temp_dcm_series_path.replace("IM0000", "IM0007")
+    assert reader(other)[0] is volume
+    assert reader.prefetch(other) is False
+
+def test_first_slices(temp_dcm_series_path, temp_npy_path):
+    """ Test that a series is listed once, by its first slice. """
+    folder = os.path.dirname(temp_dcm_series_path)
+    paths = sorted(os.path.join(folder, name) for name in os.listdir(folder)) + [temp_npy_path]
+    kept = first_slices(paths)
+    first = find_series(temp_dcm_series_path)[0]["path"]
+    assert kept == sorted([first, os.path.join(folder, "scout.dcm")]) + [temp_npy_path]
+
+def test_series_disk_cache(tmp_path, temp_dcm_series_path, volume_data):
+    """ Test that a series is served from the disk cache by any of its slices, until one of its slices is modified. """
+    Reader(disk_cache_dir=str(tmp_path / "cache"))(temp_dcm_series_path)
+    other = temp_dcm_series_path.replace("IM0000", "IM0007")
+    reader = Reader(disk_cache_dir=str(tmp_path / "cache"))
+    volume, _ = reader(other)
+    assert reader.disk_cache.hits == 1
+    assert np.array_equal(volume.tonumpy(), volume_data.astype(np.int16) - 1024)
+    last = reader.series_files[reader.series_paths[other]][-1]
+    with open(last, "r+b") as file:
+        # the last pixel of the slice
+        file.seek(-2, os.SEEK_END)
+        pixel = file.read(2)
+        file.seek(-2, os.SEEK_END)
+        file.write(b"\x00\x00" if pixel != b"\x00\x00" else b"\x01\x00")
+    reader = Reader(disk_cache_dir=str(tmp_path / "cache"))
+    volume, _ = reader(other)
+    assert reader.disk_cache.hits == 0 and reader.disk_cache.misses == 1
+    assert not np.array_equal(volume.tonumpy(), volume_data.astype(np.int16) - 1024)
+
+def test_series_cache_key(temp_dcm_series_path):
+    """ Test that modifying any slice of a series invalidates its cached volume. """
+    reader = Reader()
+    volume, _ = reader(temp_dcm_series_path)
+    last = reader.series_files[reader.series_paths[temp_dcm_series_path]][-1]
+    stat = os.stat(last)
+    os.utime(last, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert reader(temp_dcm_series_path)[0] is not volume
@@ -0,0 +1,48 @@
+import os
+
+import numpy as np
+import vedo
+from vtkmodules.vtkIOImage import vtkMetaImageWriter
+from ctviewer.io import Reader
+from ctviewer.io.thumbnails import ThumbnailIndex, make_thumbnail, mip_thumbnail, strided_voxels
+
+def test_strided_voxels(tmp_path, temp_npy_path, temp_mhd_path, volume_data):
+    """ Test that the mapped .npy and raw .mhd files give every n-th voxel, and that compressed files are not mapped. """
+    assert np.array_equal(strided_voxels(temp_npy_path, 10), volume_data[::5, ::5, ::5])
+    data = np.random.default_rng(0).integers(0, 1000, (50, 40, 30)).astype(np.uint16)
+    writer = vtkMetaImageWriter()
+    writer.SetInputData(vedo.Volume(data).dataset)
+    writer.SetFileName(str(tmp_path / "raw.mhd"))
+    writer.SetCompression(False)
+    writer.Write()
+    assert np.array_equal(strided_voxels(str(tmp_path / "raw.mhd"), 10), data[::5, ::5, ::5])
+    assert strided_voxels(temp_mhd_path, 10) is None
+    for data_file in ("", "LIST"):
+        (tmp_path / "broken.mhd").write_text(f"NDims = 3\nDimSize = 50 40 30\nElementType = MET_USHORT\nElementDataFile = {data_file}\n")
+        assert strided_voxels(str(tmp_path / "broken.mhd"), 10) is None
+    (tmp_path / "missing.mhd").write_text("NDims = 3\nDimSize = 50 40 30\nElementType = MET_USHORT\n")
+    assert strided_voxels(str(tmp_path / "missing.mhd"), 10) is None
+
+def test_make_thumbnail(temp_mhd_path, temp_dcs_file_path):
+    """ Test that the strided and the decoded reads give the same thumbnail. """
+    expected = mip_thumbnail(Reader()(temp_mhd_path)[0].tonumpy(), 16)
+    assert np.array_equal(make_thumbnail(temp_mhd_path, 16), expected)
+    thumbnail = make_thumbnail(temp_dcs_file_path, 16)
+    assert thumbnail.dtype == np.uint8 and max(thumbnail.shape) <= 16
+
+def test_thumbnail_index(tmp_path, temp_npy_path, volume_data):
+    """ Test that the index returns the stored thumbnails until their file is modified. """
+    index = ThumbnailIndex(str(tmp_path / "index" / "thumbnails.sqlite"))
+    assert index.get(temp_npy_path) is None
+    thumbnail = index.get_or_make(temp_npy_path, 16)
+    assert np.array_equal(index.get(temp_npy_path), thumbnail)
+    assert len(index) == 1
+    stat = os.stat(temp_npy_path)
+    os.utime(temp_npy_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert index.get(temp_npy_path) is None
+    index.close()
+
+def test_dicom_slice_thumbnail(temp_dcm_series_path):
+    """ Test that the thumbnail of a DICOM slice is made from that slice only. """
+    thumbnail = make_thumbnail(temp_dcm_series_path, 16)
+    assert thumbnail.shape == (13, 13)
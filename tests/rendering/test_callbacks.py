@@ -46,3 +46,18 @@ def test_clear(renderer_callbacks, mock_object):
     """ Test if the clear method clears the renderer """
     renderer_callbacks.clear()
     mock_object.clear.assert_called_once()
+
+def test_add_callback(renderer_callbacks, mock_object):
+    """ Test if the add_callback method registers an event callback without picking """
+    func = lambda event: None
+    renderer_callbacks.add_callback("StartInteraction", func)
+    mock_object.add_callback.assert_called_once_with("StartInteraction", func, enable_picking=False)
+
+def test_render_time(renderer_callbacks, mock_object):
+    """ Test if the render_time method returns the duration of the last render """
+    mock_object.renderer.GetLastRenderTimeInSeconds.return_value = 0.04
+    assert renderer_callbacks.render_time() == 0.04
+
+def test_histogram(renderer_callbacks, mock_object):
+    """ Test if the histogram method returns the cached histogram of the renderer """
+    assert renderer_callbacks.histogram() is mock_object.histogram
@@ -1,12 +1,19 @@
+import gc
+import time
 import pytest
+from vtkmodules.vtkCommonDataModel import vtkImageData
 from unittest.mock import MagicMock
 from ctviewer.rendering.callbacks import RendererCallbacks
 from ctviewer.rendering import IsoSurfer
+from ctviewer.rendering.iso_surfer import extract_isosurface
+from ctviewer.utils import Histogram
 
 @pytest.fixture
-def mock_callbacks():
+def mock_callbacks(temp_volume_data):
     """ Create a mock callbacks object """
-    return MagicMock(spec=RendererCallbacks)
+    mock = MagicMock(spec=RendererCallbacks)
+    mock.histogram.return_value = Histogram(temp_volume_data.tonumpy())
+    return mock
 
 @pytest.fixture
 def iso_surfer(temp_volume_data, mock_callbacks):
@@ -68,3 +75,68 @@ def test_check_volume(iso_surfer):
     assert iso_surfer.check_volume() is True
     iso_surfer.volume = None
     assert iso_surfer.check_volume() is False
+
+def test_extract_isosurface(temp_volume_data):
+    """ Test that the extracted isosurface is decimated by the clustering """
+    full = extract_isosurface(temp_volume_data.dataset, 100, decimation=1)
+    decimated = extract_isosurface(temp_volume_data.dataset, 100, decimation=4)
+    assert full.GetNumberOfCells() > 0
+    assert 0 < decimated.GetNumberOfCells() < full.GetNumberOfCells()
+
+def test_mesh_mode(temp_volume_data, mock_callbacks):
+    """ Test that the mesh mode displays cached meshes instead of ray casting the isosurface """
+    iso_surfer = IsoSurfer(volume=temp_volume_data, isovalue=100, callbacks=mock_callbacks, mesh_mode=True)
+    iso_surfer.activate()
+    assert iso_surfer.on is True
+    assert not temp_volume_data.actor.GetVisibility()
+    mock_callbacks.add.assert_called_with(iso_surfer.mesh)
+    assert iso_surfer.refinement.result(timeout=30) is True
+    assert iso_surfer.swap_refined() is True
+    first = iso_surfer.mesh.dataset
+    iso_surfer.update_isovalue(200)
+    iso_surfer.refinement.result(timeout=30)
+    iso_surfer.swap_refined()
+    assert iso_surfer.mesh.dataset is not first
+    # scrubbing back to the first value reuses its mesh at once
+    iso_surfer.update_isovalue(100)
+    assert iso_surfer.mesh.dataset is first
+    assert iso_surfer.get_mesh(100) is first
+    iso_surfer.deactivate()
+    mock_callbacks.remove.assert_called_with(iso_surfer.mesh)
+    assert temp_volume_data.actor.GetVisibility()
+
+def test_progressive_mesh(temp_volume_data, mock_callbacks):
+    """ Test that a coarse mesh is displayed first and that only the latest isovalue is refined """
+    iso_surfer = IsoSurfer(volume=temp_volume_data, isovalue=100, callbacks=mock_callbacks, mesh_mode=True)
+    refined = []
+    iso_surfer.on_refined = lambda: refined.append(iso_surfer.generation)
+    iso_surfer.activate()
+    assert iso_surfer.mesh_factor == IsoSurfer.PREVIEW_FACTOR
+    iso_surfer.refinement.result(timeout=30)
+    assert iso_surfer.swap_refined() is True
+    assert iso_surfer.mesh_factor == 1
+    assert iso_surfer.swap_refined() is False
+    # superseded extractions are dropped, the last one is swapped in
+    iso_surfer.executor.submit(time.sleep, 0.2)
+    superseded = iso_surfer.refine_mesh(150)
+    iso_surfer.isovalue = 250
+    iso_surfer.show_mesh(250, preview=True)
+    latest = iso_surfer.refine_mesh(250)
+    assert superseded.cancelled()
+    assert latest.result(timeout=30) is True
+    assert refined == [iso_surfer.generation - 2, iso_surfer.generation]
+    assert iso_surfer.swap_refined() is True
+    assert iso_surfer.mesh_factor == 1
+    assert iso_surfer.mesh.dataset is iso_surfer.get_mesh(250)
+
+def test_dataset_token(iso_surfer):
+    """ Test that the datasets keep their token while alive, and that a freed dataset does not pass its token on """
+    dataset = vtkImageData()
+    token = iso_surfer.dataset_token(dataset)
+    assert iso_surfer.dataset_token(dataset) == token
+    assert iso_surfer.dataset_token(iso_surfer.volume.dataset) != token
+    del dataset
+    gc.collect()
+    tokens = {iso_surfer.dataset_token(vtkImageData()) for _ in range(10)}
+    assert token not in tokens and len(tokens) == 10
+    assert len(iso_surfer.dataset_tokens) <= 2
@@ -70,3 +70,34 @@ def test_deactivate(ray_caster):
 def test_check_volume(ray_caster):
     """ Test the check_volume method of the RayCaster object. """
     assert ray_caster.check_volume() is True
+
+def test_level_of_detail(ray_caster, mock_callbacks):
+    """ Test that the sample distance is lowered during the interaction and restored afterwards. """
+    ray_caster.activate(volume_mode=1)
+    assert mock_callbacks.add_callback.call_count == 3
+    mapper = ray_caster.volume.mapper
+    full_quality = mapper.GetAutoAdjustSampleDistances(), mapper.GetSampleDistance()
+    ray_caster.start_interaction()
+    assert ray_caster.lod_active and not mapper.GetAutoAdjustSampleDistances()
+    # frames four times slower than the target: the factor grows by as much, within its bounds
+    ray_caster.adapt_lod(4 * ray_caster.lod_frame_time)
+    assert ray_caster.lod_factor == 4
+    assert mapper.GetSampleDistance() == ray_caster.lod_sample_distance * 4
+    ray_caster.adapt_lod(100 * ray_caster.lod_frame_time)
+    assert ray_caster.lod_factor == RayCaster.LOD_MAX_FACTOR
+    # frames close to the target leave the factor unchanged, fast frames lower it
+    ray_caster.adapt_lod(ray_caster.lod_frame_time)
+    assert ray_caster.lod_factor == RayCaster.LOD_MAX_FACTOR
+    ray_caster.adapt_lod(0.25 * ray_caster.lod_frame_time)
+    assert ray_caster.lod_factor == 2
+    ray_caster.end_interaction()
+    assert not ray_caster.lod_active
+    assert (mapper.GetAutoAdjustSampleDistances(), mapper.GetSampleDistance()) == full_quality
+    mock_callbacks.render.assert_called()
+
+def test_level_of_detail_disabled(temp_volume_data, ogb, alpha, mock_callbacks):
+    """ Test that a null target frame time keeps the full quality. """
+    ray_caster = RayCaster(volume=temp_volume_data, ogb=ogb, alpha=alpha, callbacks=mock_callbacks, lod_frame_time=0)
+    ray_caster.activate(volume_mode=1)
+    ray_caster.start_interaction()
+    assert not ray_caster.lod_active
@@ -1,6 +1,10 @@
 from unittest.mock import patch
+import numpy as np
 import vedo
+from vedo import Volume
 from ctviewer.io import Reader
+from ctviewer.io.pyramid import VolumePyramid
+from ctviewer.rendering import Renderer
 from ctviewer.rendering.callbacks import RendererCallbacks
 from ctviewer.rendering.ray_caster import RayCaster
 from ctviewer.rendering.iso_surfer import IsoSurfer
@@ -139,8 +143,64 @@ def test_add_flags(mock_renderer):
         "labels": ["Label1", "Label2"]
     }
     mock_renderer.add_flags(volume_properties)
-    assert len(mock_renderer.fss) == 2
-    assert len(mock_renderer.bboxes) == 2
+    # a single actor for all the boxes and poles, and one for all the texts
+    assert len(mock_renderer.fss) == 1
+    assert len(mock_renderer.bboxes) == 1
+    assert mock_renderer.bboxes[0].dataset.GetNumberOfCells() == 2 * 12 + 2
+    assert mock_renderer.fss[0].GetMapper().GetInputAlgorithm().GetInput().GetNumberOfPoints() == 2
+    assert [text for _, _, text in mock_renderer.flags] == ["Label1", "Label2"]
+
+def test_add_flags_colors(mock_renderer):
+    """ Test that the boxes of the mask classes take the color of their class. """
+    mock_renderer.mask_colors = {1: "red", 2: "blue"}
+    mock_renderer.mask_flags = {1: "Gun", 2: "Knife"}
+    volume_properties = {
+        "poses": [(0, 10, 0, 10, 0, 10), (20, 30, 20, 30, 20, 30)],
+        "flag_poses": [(5, 5, 10), (25, 25, 30)],
+        "labels": [1, 2]
+    }
+    mock_renderer.add_flags(volume_properties)
+    colors = mock_renderer.bboxes[0].cellcolors
+    assert tuple(colors[0][:3]) == tuple(int(c * 255) for c in vedo.get_color("red"))
+    assert tuple(colors[12][:3]) == tuple(int(c * 255) for c in vedo.get_color("blue"))
+    assert [text for _, _, text in mock_renderer.flags] == ["Gun", "Knife"]
+    assert tuple(mock_renderer.bboxes[0].bounds()) == (0, 30, 0, 30, 0, 90)
+
+def test_mask_lut(mock_renderer, mask_classes):
+    """ Test that the mask labels take the color and alpha of their class, without blending into the next label. """
+    mask = Volume(np.array([[[0, 1], [2, 3]]] * 2, dtype=np.uint8))
+    mock_renderer.set_mask_labels(mask, {"is_mask": True, "labels": []})
+    ctf = mock_renderer.mask_.properties.GetRGBTransferFunction()
+    otf = mock_renderer.mask_.properties.GetScalarOpacity()
+    assert mock_renderer.mask_.properties.GetInterpolationType() == 0
+    assert mock_renderer.mask_label_classes == [0, 1, 2, 3]
+    for class_id, color, alpha, _ in mask_classes[1:4]:
+        np.testing.assert_allclose(ctf.GetColor(class_id + 0.4), vedo.get_color(color))
+        assert otf.GetValue(class_id + 0.4) == alpha
+    assert otf.GetValue(0.4) == 0
+
+def test_mask_lut_tdr(mock_renderer, mask_classes):
+    """ Test that the TDR objects take the class of their description, the threat color otherwise. """
+    mask = Volume(np.array([[[0, 1], [2, 0]]] * 2, dtype=np.uint8))
+    mock_renderer.set_mask_labels(mask, {"is_mask": True, "labels": [mask_classes[2][3], "Unknown"]})
+    assert mock_renderer.mask_label_classes == [0, mask_classes[2][0], None]
+    ctf = mock_renderer.mask_.properties.GetRGBTransferFunction()
+    np.testing.assert_allclose(ctf.GetColor(1), vedo.get_color(mask_classes[2][1]))
+    np.testing.assert_allclose(ctf.GetColor(2), vedo.get_color(Renderer.THREAT_COLOR))
+
+def test_set_mask_class_visibility(mock_renderer):
+    """ Test that hiding a class only edits the opacity lookup of the mask. """
+    mask = Volume(np.array([[[0, 1], [2, 3]]] * 2, dtype=np.uint8))
+    mock_renderer.mask_._update(mask.dataset)
+    mock_renderer.set_mask_labels(mask, {"is_mask": True, "labels": []})
+    mtime = mock_renderer.mask_.dataset.GetMTime()
+    otf = mock_renderer.mask_.properties.GetScalarOpacity()
+    mock_renderer.set_mask_class_visibility(2, False)
+    assert otf.GetValue(2) == 0
+    assert otf.GetValue(1) > 0
+    mock_renderer.set_mask_class_visibility(2, True)
+    assert otf.GetValue(2) > 0
+    assert mock_renderer.mask_.dataset.GetMTime() == mtime
 
 def test_remove_flags(mock_renderer):
     """ Test the remove_flags method of the Renderer class. """
@@ -170,3 +230,45 @@ def test_onClose(mock_renderer):
         mock_remove.assert_any_call(mock_renderer.mask_)
         mock_close.assert_called_once()
 
+
+def test_display_volume_pyramid(mock_renderer, volume_data):
+    """ Test that a volume pyramid is displayed from the coarsest level to the full resolution. """
+    volume = Volume(volume_data)
+    properties = {"is_proj": False, "is_mask": False, "pyramid": VolumePyramid(volume)}
+    mock_renderer.display_volume(volume, properties)
+    assert tuple(mock_renderer.volume.dimensions()) == (7, 7, 7)
+    assert mock_renderer.refine_volume() is True
+    assert mock_renderer.refine_volume() is True
+    assert mock_renderer.refine_volume() is False
+    assert tuple(mock_renderer.volume.dimensions()) == volume_data.shape
+    assert [factor for factor, _ in mock_renderer.level_timings] == [8, 4, 2, 1]
+    # the histogram is that of the full resolution volume, not of the coarse level displayed first
+    assert mock_renderer.histogram.range == (volume_data.min(), volume_data.max())
+    # switching mode skips the remaining levels
+    mock_renderer.display_volume(volume, properties)
+    mock_renderer.quit_current_mode()
+    assert mock_renderer.pending_levels == []
+    assert tuple(mock_renderer.volume.dimensions()) == volume_data.shape
+
+def test_single_render(mock_renderer, temp_mhd_path, temp_mask_path):
+    """ Test that switching volumes and cleaning the view cost one frame each. """
+    for path in (temp_mhd_path, temp_mask_path, temp_mhd_path):
+        count = mock_renderer.render_count
+        mock_renderer.update_volume(path)
+        assert mock_renderer.render_count == count + 1
+    for action in (mock_renderer.delete_mask, mock_renderer.clean_view, mock_renderer.switch_axes):
+        count = mock_renderer.render_count
+        action()
+        assert mock_renderer.render_count == count + 1
+    assert mock_renderer.batch_depth == 0
+
+def test_clean_view_placeholders(mock_renderer, temp_mhd_path):
+    """ Test that the cleaned volume and mask display the placeholders created once. """
+    mock_renderer.update_volume(temp_mhd_path)
+    mock_renderer.clean_view()
+    assert mock_renderer.volume.dataset is mock_renderer.empty_volume
+    assert mock_renderer.mask_.dataset is mock_renderer.empty_mask
+    mock_renderer.clean_view()
+    mock_renderer.delete_mask()
+    assert mock_renderer.volume.dataset is mock_renderer.empty_volume
+    assert mock_renderer.mask_.dataset is mock_renderer.empty_mask
@@ -2,12 +2,15 @@ import pytest
 from unittest.mock import MagicMock
 from ctviewer.rendering.callbacks import RendererCallbacks
 from ctviewer.rendering import Slicer
+from ctviewer.utils import Histogram
+from vedo import Volume, np
 
 @pytest.fixture
-def mock_callbacks():
+def mock_callbacks(temp_volume_data):
     """ Create a mock callbacks object """
     mock = MagicMock(spec=RendererCallbacks)
     mock.background.return_value = [0, 0, 0]  # Simulate a dark background
+    mock.histogram.return_value = Histogram(temp_volume_data.tonumpy())
     return mock
 
 @pytest.fixture
@@ -74,3 +77,31 @@ def test_slider_functions(slicer, mock_callbacks):
     assert int(slicer.xslider.value) == 1
     assert int(slicer.yslider.value) == 1
     assert int(slicer.zslider.value) == 1
+
+def test_set_slice(slicer):
+    """ Test that the slices move in place and are hidden on the bounds of their axis. """
+    slicer.build()
+    xslice = slicer.xslice
+    assert slicer.set_slice(0, 10) is True
+    assert slicer.xslice is xslice
+    assert slicer.xslice.GetMapper().GetSliceNumber() == 10
+    assert slicer.xslice.GetVisibility()
+    assert slicer.set_slice(0, 10) is False
+    assert slicer.set_slice(0, 0) is True
+    assert not slicer.xslice.GetVisibility()
+
+def test_activate_swapped_volume(slicer, mock_callbacks):
+    """ Test that reactivating the slicer after the volume dataset was swapped re-points the slices and refits the sliders. """
+    slicer.volume = Volume(slicer.volume.tonumpy().copy())
+    slicer.activate()
+    slicer.deactivate()
+    data = np.random.default_rng(0).integers(0, 1000, (20, 30, 40)).astype(np.uint16)
+    slicer.volume._update(Volume(data).dataset)
+    mock_callbacks.histogram.return_value = Histogram(data)
+    slicer.activate()
+    assert tuple(slicer.dims) == (20, 30, 40)
+    for image_slice in slicer.get_addons()[:3]:
+        assert image_slice.GetMapper().GetInput() is slicer.volume.dataset
+    assert slicer.yslice.GetMapper().GetSliceNumber() == 20
+    slicer.zslider.GetRepresentation().SetMaximumValue.assert_called_with(40)
+    assert slicer.rmax <= 999
@@ -0,0 +1,29 @@
+# tests/test_batch.py
+import csv
+import os
+import vedo
+from ctviewer.batch import run, snapshot_path
+from ctviewer.utils import ConfigManager
+
+def test_snapshot_path():
+    """ Test that the snapshots mirror the folder tree, without the volume extension. """
+    exts = ["nii.gz", "mhd"]
+    assert snapshot_path("/data/bag1/scan.nii.gz", "/data", "/out", "mip", exts) == os.path.join("/out", "bag1", "scan_mip.png")
+    assert snapshot_path("/data/scan.v2.mhd", "/data", "/out", "iso", exts) == os.path.join("/out", "scan.v2_iso.png")
+
+def test_run(tmp_path, volume_data, mask_data):
+    """ Test that every volume of a folder gets its snapshots and its timing row, the masks being skipped. """
+    (tmp_path / "scans" / "bag").mkdir(parents=True)
+    vedo.write(vedo.Volume(volume_data), str(tmp_path / "scans" / "bag" / "volume.mhd"))
+    vedo.write(vedo.Volume(mask_data), str(tmp_path / "scans" / "mask.mhd"))
+    config = {**ConfigManager().get_renderer_config(), "cache_size_mb": 0, "prefetch_size_mb": 0}
+    csv_path = str(tmp_path / "timings.csv")
+    rendered, failed = run(str(tmp_path / "scans"), str(tmp_path / "out"), ["mip", "iso"], 1, (64, 64), config, ["mhd"], csv_path)
+    assert (rendered, failed) == (1, 0)
+    assert (tmp_path / "out" / "bag" / "volume_mip.png").stat().st_size > 0
+    assert (tmp_path / "out" / "bag" / "volume_iso.png").stat().st_size > 0
+    with open(csv_path) as f:
+        rows = {os.path.basename(row["path"]): row for row in csv.DictReader(f)}
+    assert rows["volume.mhd"]["status"] == "ok"
+    assert float(rows["volume.mhd"]["mip_s"]) > 0
+    assert rows["mask.mhd"]["status"] == "skipped"
@@ -1,4 +1,6 @@
-from ctviewer.utils import connected_components_3d
+import numpy as np
+from vedo import Volume
+from ctviewer.utils import connected_components_3d, streaming_connected_components_3d
 
 def test_connected_components_3d(temp_mask_data):
     """ Test the connected_components_3d function. """
@@ -17,3 +19,84 @@ def test_connected_components_3d(temp_mask_data):
     assert len(volume_properties["labels"]) == 2
     assert volume_properties["labels"][0] == 1
     assert volume_properties["labels"][1] == 2
+
+def test_connected_components_3d_classes():
+    """ Test the class label, bounding box and flag position of each component. """
+    mask = np.zeros((64, 64, 64), dtype=np.uint8)
+    mask[8:16, 8:16, 8:16] = 3
+    mask[40:48, 8:16, 8:16] = 7
+    mask[8:16, 40:48, 40:56] = 3
+    volume_properties = connected_components_3d(Volume(mask), connectivity=26, reshape_factor=4)
+    assert sorted(volume_properties["labels"]) == [3, 3, 7]
+    for pos, flag_pos in zip(volume_properties["poses"], volume_properties["flag_poses"]):
+        assert len(pos) == 6 and len(flag_pos) == 3
+        assert pos[0] <= flag_pos[0] <= pos[1] and pos[2] <= flag_pos[1] <= pos[3]
+
+def test_connected_components_3d_empty():
+    """ Test that an empty mask has no component. """
+    volume_properties = connected_components_3d(Volume(np.zeros((16, 16, 16), dtype=np.uint8)))
+    assert volume_properties["poses"] == []
+    assert volume_properties["labels"] == []
+
+def test_connected_components_3d_downsample_first():
+    """ Test that the coarse grid morphology finds the same components as the full resolution one. """
+    mask = np.zeros((64, 64, 64), dtype=np.uint8)
+    mask[8:16, 8:16, 8:16] = 3
+    mask[20:28, 8:16, 8:16] = 3  # 4 voxels apart from the first part, bridged by the closing
+    mask[44:52, 8:16, 8:16] = 7
+    mask[8:16, 40:48, 40:56] = 3
+    expected = connected_components_3d(Volume(mask), connectivity=26, reshape_factor=4)
+    volume = Volume(mask)
+    volume_properties = connected_components_3d(volume, connectivity=26, reshape_factor=4, downsample_first=True)
+    assert np.array_equal(volume.tonumpy(), mask)
+    assert len(volume_properties["labels"]) == len(expected["labels"]) == 3
+    order, expected_order = np.argsort([p[0] + p[2] for p in volume_properties["poses"]]), np.argsort([p[0] + p[2] for p in expected["poses"]])
+    for i, j in zip(order, expected_order):
+        assert volume_properties["labels"][i] == expected["labels"][j]
+        assert np.abs(np.asarray(volume_properties["poses"][i]) - expected["poses"][j]).max() <= 4
+
+def test_connected_components_3d_downsample_first_bounds():
+    """ Test that the coarse grid bounding box holds the object and exceeds it by less than a coarse cell. """
+    rng = np.random.default_rng(1)
+    for _ in range(10):
+        mask = np.zeros((64, 64, 64), dtype=np.uint8)
+        corner, extent = rng.integers(2, 40, 3), rng.integers(3, 20, 3)
+        mask[corner[0]:corner[0] + extent[0], corner[1]:corner[1] + extent[1], corner[2]:corner[2] + extent[2]] = 1
+        pos = np.asarray(connected_components_3d(Volume(mask), reshape_factor=4, downsample_first=True)["poses"][0])
+        box = np.stack([corner, corner + extent], axis=1).ravel()
+        assert np.all(pos[0::2] <= box[0::2]) and np.all(pos[1::2] >= box[1::2])
+        assert np.abs(pos - box).max() < 4
+
+def test_streaming_connected_components_3d(tmp_path):
+    """ Test that the slab-wise labelling matches the labelling of the whole mask. """
+    rng = np.random.default_rng(0)
+    mask = np.zeros((48, 40, 90), dtype=np.uint8)
+    for _ in range(20):
+        corner, extent = rng.integers(0, [32, 24, 70]), rng.integers(3, 16, 3)
+        mask[corner[0]:corner[0] + extent[0], corner[1]:corner[1] + extent[1], corner[2]:corner[2] + extent[2]] = rng.integers(1, 8)
+    expected = connected_components_3d(Volume(mask), connectivity=26, reshape_factor=4, downsample_first=True)
+    np.save(tmp_path / "mask.npy", mask)
+    sources = [mask, np.load(tmp_path / "mask.npy", mmap_mode='r'), (mask[:, :, z:z + 7] for z in range(0, mask.shape[2], 7))]
+    for source, slab_size in zip(sources, (8, 13, 64)):
+        volume_properties = streaming_connected_components_3d(source, connectivity=26, reshape_factor=4, slab_size=slab_size)
+        assert volume_properties["labels"] == expected["labels"]
+        assert np.array_equal(volume_properties["poses"], expected["poses"])
+        assert np.array_equal(volume_properties["flag_poses"], expected["flag_poses"])
+
+def test_streaming_connected_components_3d_unaligned():
+    """ Test that the boxes of the components on the edges of a mask whose dims are not multiples of reshape_factor stay inside it. """
+    mask = np.zeros((50, 37, 30), dtype=np.uint8)
+    mask[40:50, 30:37, 20:30] = 2
+    mask[2:9, 3:11, 0:7] = 5
+    expected = connected_components_3d(Volume(mask), connectivity=26, reshape_factor=4, downsample_first=True)
+    volume_properties = streaming_connected_components_3d(mask, connectivity=26, reshape_factor=4, slab_size=8)
+    assert volume_properties["labels"] == expected["labels"]
+    assert np.array_equal(volume_properties["poses"], expected["poses"])
+    assert np.array_equal(volume_properties["flag_poses"], expected["flag_poses"])
+    assert np.max(volume_properties["poses"], axis=0)[1::2].tolist() == [50, 37, 30]
+
+def test_streaming_connected_components_3d_empty():
+    """ Test that an empty mask has no component. """
+    volume_properties = streaming_connected_components_3d(np.zeros((16, 16, 16), dtype=np.uint8))
+    assert volume_properties["poses"] == []
+    assert volume_properties["labels"] == []
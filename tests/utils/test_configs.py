@@ -61,4 +61,13 @@ def test_reset_user_config(config_manager: ConfigManager):
 def test_get_user_config(config_manager: ConfigManager):
     """ Test if the user config is retrieved correctly """
     user_config = config_manager.get_user_config()
-    assert user_config == {"key": "user_value"}
\ No newline at end of file
+    assert user_config == {"key": "user_value"}
+
+def test_get_renderer_config():
+    """ Test that the renderer arguments are built from the user config """
+    renderer_config = ConfigManager().get_renderer_config()
+    user_config = ConfigManager().get_user_config()
+    assert renderer_config['ogb'][0] == (user_config['ogb_cmap'][0], user_config['colors'][0])
+    assert renderer_config['alpha'][0] == (0, 1)
+    assert renderer_config['mask_classes'] == user_config['mask_classes']
+    assert 'exts' not in renderer_config
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from ctviewer.utils import Histogram
+
+@pytest.mark.parametrize("dtype", [np.uint8, np.int8, np.uint16, np.int16])
+def test_histogram_integers(dtype):
+    """ Test that the integer histograms match np.histogram for any number of bins. """
+    data = np.random.default_rng(0).normal(100, 50, (40, 30, 20)).astype(dtype)
+    histogram = Histogram(np.asfortranarray(data), workers=2, chunk_size=5000)
+    assert histogram.range == (data.min(), data.max())
+    assert histogram.size == data.size
+    for bins in (7, 20, 200):
+        counts, edges = histogram.counts(bins)
+        expected_counts, expected_edges = np.histogram(data, bins=bins)
+        np.testing.assert_array_equal(counts, expected_counts)
+        np.testing.assert_allclose(edges, expected_edges)
+
+def test_histogram_floats():
+    """ Test that the float histograms keep the total count and follow np.histogram up to the fine bins. """
+    data = np.random.default_rng(0).normal(0, 1, (40, 30, 20)).astype(np.float32)
+    histogram = Histogram(data, chunk_size=5000)
+    assert histogram.range == (data.min(), data.max())
+    counts, _ = histogram.counts(20)
+    expected, _ = np.histogram(data, bins=20)
+    assert counts.sum() == data.size
+    assert np.abs(counts - expected).sum() < data.size * 0.01
+
+def test_histogram_constant():
+    """ Test the histogram of a volume holding a single value. """
+    histogram = Histogram(np.full((4, 4, 4), 7, dtype=np.uint16))
+    assert histogram.range == (7, 7)
+    counts, edges = histogram.counts(20)
+    np.testing.assert_array_equal(counts, np.histogram(np.full(64, 7), bins=20)[0])
+    log_counts, _ = histogram.log_counts(20)
+    np.testing.assert_allclose(log_counts, np.log10(counts + 1))
+
+def test_histogram_subsample():
+    """ Test that a subsampled histogram keeps the exact range, the error bound and the same counts for the same volume. """
+    data = np.random.default_rng(0).gamma(2, 100, (64, 64, 64)).astype(np.uint16)
+    histogram = Histogram(data, max_samples=50000)
+    assert histogram.samples == 50000
+    assert histogram.range == (data.min(), data.max())
+    counts, _ = histogram.counts(20)
+    expected, _ = np.histogram(data, bins=20)
+    assert np.abs(counts - expected).max() / data.size <= 2 * histogram.error_bound()
+    np.testing.assert_array_equal(counts, Histogram(data, max_samples=50000).counts(20)[0])
+    assert Histogram(data).error_bound() == 0.0